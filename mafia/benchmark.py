@@ -0,0 +1,301 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from mafia.clock import VirtualClock
+from mafia.gameregistry import GameRegistry
+from mafia.gamestate import GameState
+from mafia.outbox import ChannelOutbox
+from mafia.simulation import GameSimulation
+from mafia.transport import MemoryTransport
+from mafia.misc.utils import Alignment
+from mafia.eventlog import EventLogger
+
+
+class Benchmark:
+    """
+    Measure of an engine operation, run on a game frozen in a state
+    """
+
+    def __init__(self, name: str, state, operation_factory, reusable: bool = True):
+        """
+        Initializer
+        :param name: name of the benchmark
+        :param state: GameState state of the measured game
+        :param operation_factory: function (registry, simulation) returning the operation to measure, a function
+            or a coroutine function without parameters
+        :param reusable: True if the operation can be run several times on the same game, a new game is prepared
+            for each run otherwise
+        """
+        self.name = name
+        self.state = state
+        self.operation_factory = operation_factory
+        self.reusable = reusable
+
+
+def _on_message(registry, simulation):
+    # Night chat of a town player: routed to the engine but not relayed
+    sender = simulation.engine.get_players_by_alignment(Alignment.TOWN)[0]
+    message = simulation.create_player_message(sender, "Message de nuit")
+
+    async def operation():
+        await registry.manage_message(message)
+    return operation
+
+
+def _manage_command(registry, simulation):
+    engine = simulation.engine
+    voter = engine.players[0]
+    messages = [simulation.create_player_message(voter, "-vote {}".format(player.get_house().get_id()))
+                for player in engine.players[1:3]]
+    commands = engine._cmd_manager
+    state = {"index": 0}
+
+    def operation():
+        # Alternate between two targets to update the tally on each vote
+        state["index"] ^= 1
+        commands.manage_command(messages[state["index"]], voter)
+    return operation
+
+
+def _vote_everyone(engine):
+    # Each player votes for the next one: no player reaches the trial threshold
+    for i, player in enumerate(engine.players):
+        player.set_vote_id(engine.players[(i + 1) % len(engine.players)].get_house().get_id())
+
+
+def _get_current_votes(registry, simulation):
+    _vote_everyone(simulation.engine)
+    return simulation.engine.get_current_votes
+
+
+def _check_votes_for_trial(registry, simulation):
+    _vote_everyone(simulation.engine)
+    return simulation.engine.check_votes_for_trial
+
+
+def _send_message_everyone(registry, simulation):
+    engine = simulation.engine
+    return lambda: engine.send_message_everyone("Message de la partie")
+
+
+def _player_send_message_to_players(registry, simulation):
+    engine = simulation.engine
+    message = simulation.create_player_message(engine.players[0], "Message de jour")
+    return lambda: engine.player_send_message_to_players(message, engine.players)
+
+
+def _configure_players(registry, simulation):
+    return simulation.engine.configure_players
+
+
+BENCHMARKS = [
+    Benchmark("on_message", GameState.state_night, _on_message),
+    Benchmark("manage_command", GameState.state_day_vote, _manage_command),
+    Benchmark("get_current_votes", GameState.state_day_vote, _get_current_votes),
+    Benchmark("check_votes_for_trial", GameState.state_day_vote, _check_votes_for_trial),
+    Benchmark("send_message_everyone", GameState.state_day_vote, _send_message_everyone),
+    Benchmark("player_send_message_to_players", GameState.state_day_vote, _player_send_message_to_players),
+    Benchmark("configure_players", GameState.state_players_nicknames, _configure_players, reusable=False)
+]
+
+
+class BenchmarkRunner:
+    """
+    Run benchmarks on headless games, on a virtual clock so phases are reached instantly
+    """
+    PRESET = "benchmark"
+    # Role setup available for every lobby size
+    SETUPS = {
+        "default": PRESET,
+        "presets": {
+            PRESET: {
+                "description": "3 Mafiosi contre la ville, jusqu'à 1000 joueurs",
+                "compositions": [
+                    {"min_players": 7, "max_players": 1000, "roles": {"Mafioso": 3}, "fill": "Citizen"}
+                ]
+            }
+        }
+    }
+    # Minimum duration of a measured run, in seconds
+    MIN_RUN_TIME = 0.05
+
+    def __init__(self, clock: VirtualClock, event_logger: EventLogger, repeat: int = 5):
+        """
+        Initializer
+        :param clock: virtual clock running the games
+        :param event_logger: games event logs writer
+        :param repeat: number of measured runs of each benchmark
+        """
+        self._clock = clock
+        self._repeat = repeat
+        self._registry = GameRegistry(None, MemoryTransport(), clock, event_logger=event_logger)
+        self._registry.setups.load_config(self.SETUPS)
+        self._games_count = 0
+
+    async def _prepare_game(self, nb_players: int, state) -> tuple:
+        """
+        Start a game and freeze it in a state
+        :param nb_players: number of players
+        :param state: the GameState state
+        :return: tuple (simulation, context of the game creator)
+        """
+        self._games_count += 1
+        simulation = GameSimulation(self._registry, nb_players, 0, "benchmark_{}".format(self._games_count))
+        # Keep the report readable, phases transitions are logged
+        with contextlib.redirect_stdout(io.StringIO()):
+            ctx = await simulation.start(self.PRESET)
+            await simulation.wait_for_state(state)
+        simulation.engine.freeze_game()
+        return simulation, ctx
+
+    async def _release_game(self, simulation: GameSimulation, ctx):
+        with contextlib.redirect_stdout(io.StringIO()):
+            await simulation.engine.stop_game(ctx)
+        self._registry.remove_engine(ctx)
+        # Deliver pending messages
+        await self._clock.sleep(ChannelOutbox.FLUSH_DELAY)
+
+    @staticmethod
+    async def _time_operation(operation, number: int) -> float:
+        """
+        Run an operation several times
+        :param operation: function or coroutine function without parameters
+        :param number: number of calls
+        :return: total duration, in seconds
+        """
+        if asyncio.iscoroutinefunction(operation):
+            start_time = time.perf_counter()
+            for _ in range(number):
+                await operation()
+        else:
+            start_time = time.perf_counter()
+            for _ in range(number):
+                operation()
+        return time.perf_counter() - start_time
+
+    async def run_benchmark(self, benchmark: Benchmark, nb_players: int) -> float:
+        """
+        Measure an operation
+        :param benchmark: the benchmark
+        :param nb_players: number of players of the measured game
+        :return: best duration of an operation, in seconds, the least disturbed by other processes
+        """
+        timings = []
+        if benchmark.reusable:
+            simulation, ctx = await self._prepare_game(nb_players, benchmark.state)
+            operation = benchmark.operation_factory(self._registry, simulation)
+            # Find a number of calls long enough to be measured
+            number = 1
+            while await self._time_operation(operation, number) < self.MIN_RUN_TIME:
+                number *= 2
+            for _ in range(self._repeat):
+                # Flush outboxes between runs, messages would pile up otherwise
+                await self._clock.sleep(ChannelOutbox.FLUSH_DELAY)
+                timings.append(await self._time_operation(operation, number) / number)
+            await self._release_game(simulation, ctx)
+        else:
+            for _ in range(self._repeat):
+                simulation, ctx = await self._prepare_game(nb_players, benchmark.state)
+                operation = benchmark.operation_factory(self._registry, simulation)
+                timings.append(await self._time_operation(operation, 1))
+                await self._release_game(simulation, ctx)
+        return min(timings)
+
+    async def run(self, benchmarks: list, players_counts: list) -> dict:
+        """
+        Run benchmarks for each lobby size
+        :param benchmarks: list of Benchmark
+        :param players_counts: list of lobby sizes
+        :return: dict of operations durations, indexed by benchmark name then by players count (as str)
+        """
+        results = {}
+        for benchmark in benchmarks:
+            for nb_players in players_counts:
+                timing = await self.run_benchmark(benchmark, nb_players)
+                results.setdefault(benchmark.name, {})[str(nb_players)] = timing
+        await self._registry.channel_pool.close()
+        return results
+
+
+def compare_results(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Compare benchmark results with a baseline
+    :param results: current results, see BenchmarkRunner.run
+    :param baseline: baseline results, same format
+    :param tolerance: accepted relative slowdown, 0.2 for 20%
+    :return: list of tuples (benchmark name, players count, time, baseline time or None, regression)
+    """
+    report = []
+    for name, timings in results.items():
+        for nb_players, timing in timings.items():
+            baseline_timing = baseline.get(name, {}).get(nb_players)
+            regression = baseline_timing is not None and timing > baseline_timing * (1 + tolerance)
+            report.append((name, nb_players, timing, baseline_timing, regression))
+    return report
+
+
+def _format_time(seconds: float) -> str:
+    if seconds >= 1e-3:
+        return "{:.2f} ms".format(seconds * 1e3)
+    return "{:.2f} µs".format(seconds * 1e6)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the engine hot paths and compare them with a baseline")
+    parser.add_argument("--players", type=int, nargs="+", default=[10, 50, 200], help="lobby sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="number of measured runs of each benchmark")
+    parser.add_argument("--benchmark", nargs="+", choices=[benchmark.name for benchmark in BENCHMARKS],
+                        help="benchmarks to run, all if not set")
+    parser.add_argument("--baseline", default="benchmark_baseline.json", help="baseline file")
+    parser.add_argument("--save", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="accepted relative slowdown before reporting a regression")
+    args = parser.parse_args()
+
+    benchmarks = [benchmark for benchmark in BENCHMARKS if args.benchmark is None or benchmark.name in args.benchmark]
+    with tempfile.TemporaryDirectory() as log_directory:
+        event_logger = EventLogger(log_directory)
+        clock = VirtualClock()
+        try:
+            results = clock.run(BenchmarkRunner(clock, event_logger, args.repeat).run(benchmarks, args.players))
+        finally:
+            clock.close()
+        event_logger.close()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+
+    regressions = 0
+    print("{:<32}{:>8}{:>14}{:>14}{:>10}".format("benchmark", "players", "time/op", "baseline", "change"))
+    for name, nb_players, timing, baseline_timing, regression in compare_results(results, baseline, args.tolerance):
+        if baseline_timing is None:
+            baseline_str, change_str = "-", "-"
+        else:
+            baseline_str = _format_time(baseline_timing)
+            change_str = "{:+.0%}".format(timing / baseline_timing - 1)
+        print("{:<32}{:>8}{:>14}{:>14}{:>10}{}".format(name, nb_players, _format_time(timing), baseline_str,
+                                                       change_str, "  REGRESSION" if regression else ""))
+        regressions += regression
+
+    if args.save:
+        # Keep baseline entries of benchmarks not run this time
+        for name, timings in results.items():
+            baseline.setdefault(name, {}).update(timings)
+        with open(args.baseline, 'w', encoding='utf-8') as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        print("Baseline saved to {}".format(args.baseline))
+    if regressions > 0:
+        print("{} regression(s) above {:.0%}".format(regressions, args.tolerance))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
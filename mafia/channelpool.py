@@ -0,0 +1,161 @@
+import asyncio
+from mafia.clock import Clock
+from mafia.transport import Transport
+from mafia.misc.utils import Misc
+
+
+class ChannelPool:
+    """
+    Warm pool of private channels shared by all games. Channels of finished games are hidden, cleared and kept for
+    the next players instead of being deleted, and the pool is refilled in background between games: joining a game
+    only changes the permissions of an existing channel.
+    """
+    DEFAULT_SIZE = 10
+    # Delay before a released channel is cleared, so the last messages of its game can be delivered and read
+    RELEASE_DELAY = 10.0
+
+    def __init__(self, transport: Transport, clock: Clock, size: int = DEFAULT_SIZE):
+        """
+        Initializer
+        :param transport: chat service transport
+        :param clock: clock of the release delay
+        :param size: number of free channels kept for each guild
+        """
+        self._transport = transport
+        self._clock = clock
+        self._size = size
+        # Free channels indexed by guild id
+        self._free_channels = {}
+        # Number of channels being created or released, indexed by guild id
+        self._pending = {}
+        # Ids of channels owned by the pool, free or being released
+        self._pooled_ids = set()
+        # Ids of channels given to players and not released yet
+        self._assigned_ids = set()
+        # Running background operations
+        self._tasks = set()
+
+    def _start(self, coroutine):
+        task = self._clock.get_loop().create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _get_missing_count(self, guild_id: int) -> int:
+        return self._size - len(self._free_channels.get(guild_id, [])) - self._pending.get(guild_id, 0)
+
+    def get_free_channels_count(self) -> int:
+        """
+        Get the number of free channels of all guilds
+        :return: number of channels
+        """
+        return sum(len(channels) for channels in self._free_channels.values())
+
+    def is_known(self, channel_id: int) -> bool:
+        """
+        Check if a channel is managed by the pool
+        :param channel_id: channel id
+        :return: True if the channel is free, being released or given to a player
+        """
+        return channel_id in self._pooled_ids or channel_id in self._assigned_ids
+
+    async def acquire(self, ctx, member):
+        """
+        Get a private channel for a member, a free channel if possible, a new one otherwise
+        :param ctx: context
+        :param member: the member allowed to read the channel
+        :return: the channel
+        """
+        free_channels = self._free_channels.get(ctx.guild.id, [])
+        while free_channels:
+            channel = free_channels.pop()
+            self._pooled_ids.discard(channel.id)
+            try:
+                await self._transport.assign_private_channel(channel, member)
+            except Exception as exception:
+                # Channel deleted by hand, try the next one
+                print("Failed to assign private channel {}. Error: {}".format(channel.id, exception))
+            else:
+                self._assigned_ids.add(channel.id)
+                return channel
+        channel = await self._transport.create_private_channel(ctx, Misc.PRIVATE_CHANNEL_NAME, member)
+        self._assigned_ids.add(channel.id)
+        return channel
+
+    def release(self, channels: list, delay: float = RELEASE_DELAY):
+        """
+        Give back channels which are not used anymore, they are cleared in background. Channels beyond the pool size
+        are deleted.
+        :param channels: list of channels
+        :param delay: delay before clearing channels, in seconds
+        """
+        kept_channels = []
+        deleted_channels = []
+        for channel in channels:
+            self._assigned_ids.discard(channel.id)
+            if self._get_missing_count(channel.guild.id) > 0:
+                self._pending[channel.guild.id] = self._pending.get(channel.guild.id, 0) + 1
+                self._pooled_ids.add(channel.id)
+                kept_channels.append(channel)
+            else:
+                deleted_channels.append(channel)
+        if kept_channels or deleted_channels:
+            self._start(self._release_channels(kept_channels, deleted_channels, delay))
+
+    async def _release_channels(self, kept_channels: list, deleted_channels: list, delay: float):
+        if delay > 0:
+            await self._clock.sleep(delay)
+        await self._transport.run_channels_operations([self._clear_channel(channel) for channel in kept_channels] +
+                                                      [self._delete_channel(channel) for channel in deleted_channels])
+
+    async def _clear_channel(self, channel):
+        try:
+            await self._transport.release_private_channel(channel)
+            self._free_channels.setdefault(channel.guild.id, []).append(channel)
+        except Exception as exception:
+            self._pooled_ids.discard(channel.id)
+            print("Failed to release private channel {}. Error: {}".format(channel.id, exception))
+        finally:
+            self._pending[channel.guild.id] -= 1
+
+    async def _delete_channel(self, channel):
+        try:
+            await self._transport.delete_channel(channel)
+        except Exception as exception:
+            print("Failed to delete private channel {}. Error: {}".format(channel.id, exception))
+
+    async def prepare(self, ctx, is_channel_used):
+        """
+        Adopt the private channels unknown to the pool and not used by any game, left by a previous run of the bot,
+        then fill the pool in background
+        :param ctx: context
+        :param is_channel_used: function returning True if a channel id is used by a game
+        """
+        channels = await self._transport.get_private_channels(ctx)
+        self.release([channel for channel in channels
+                      if not is_channel_used(channel.id) and not self.is_known(channel.id)], 0)
+        missing_count = self._get_missing_count(ctx.guild.id)
+        if missing_count > 0:
+            self._pending[ctx.guild.id] = self._pending.get(ctx.guild.id, 0) + missing_count
+            self._start(self._fill(ctx, missing_count))
+
+    async def _fill(self, ctx, count: int):
+        await self._transport.run_channels_operations([self._create_channel(ctx) for _ in range(count)])
+
+    async def _create_channel(self, ctx):
+        try:
+            channel = await self._transport.create_private_channel(ctx, Misc.PRIVATE_CHANNEL_NAME)
+            self._pooled_ids.add(channel.id)
+            self._free_channels.setdefault(ctx.guild.id, []).append(channel)
+        except Exception as exception:
+            print("Failed to create private channel. Error: {}".format(exception))
+        finally:
+            self._pending[ctx.guild.id] -= 1
+
+    async def close(self):
+        """
+        Cancel background operations
+        """
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,119 @@
+import asyncio
+import selectors
+
+
+class Clock:
+    """
+    Clock used for every game delay, based on the monotonic time of an event loop
+    """
+
+    def __init__(self, loop=None):
+        """
+        Initializer
+        :param loop: event loop of the clock, current event loop if None
+        """
+        self._loop = loop if loop is not None else asyncio.get_event_loop()
+
+    def get_loop(self):
+        return self._loop
+
+    def time(self) -> float:
+        """
+        Get the current time
+        :return: time, in seconds
+        """
+        return self._loop.time()
+
+    async def sleep(self, delay: float):
+        """
+        Wait for a delay
+        :param delay: delay, in seconds
+        """
+        await asyncio.sleep(delay)
+
+    def call_at(self, when: float, callback):
+        """
+        Call a function at a given time
+        :param when: time of the call, see time()
+        :param callback: function to call
+        :return: handle used to cancel the call
+        """
+        return self._loop.call_at(when, callback)
+
+    def call_later(self, delay: float, callback):
+        """
+        Call a function after a delay
+        :param delay: delay, in seconds
+        :param callback: function to call
+        :return: handle used to cancel the call
+        """
+        return self._loop.call_later(delay, callback)
+
+
+class _VirtualTimeSelector:
+    """
+    Selector wrapper jumping the virtual time to the next deadline instead of waiting for it
+    """
+
+    def __init__(self, loop, selector):
+        self._loop = loop
+        self._selector = selector
+
+    def select(self, timeout=None):
+        events = self._selector.select(0)
+        if not events and timeout is not None and timeout > 0:
+            # Nothing to do until the next deadline, go straight to it
+            self._loop.advance(timeout)
+        elif not events and timeout is None:
+            # No deadline, wait for real events
+            events = self._selector.select(None)
+        return events
+
+    def __getattr__(self, name):
+        return getattr(self._selector, name)
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop with a virtual time: when no callback is ready, the time jumps to the next scheduled callback
+    """
+
+    def __init__(self):
+        """
+        Initializer
+        """
+        self._virtual_time = 0.0
+        super().__init__(selector=_VirtualTimeSelector(self, selectors.DefaultSelector()))
+
+    def time(self) -> float:
+        return self._virtual_time
+
+    def advance(self, delay: float):
+        """
+        Move the virtual time forward
+        :param delay: delay, in seconds
+        """
+        self._virtual_time += delay
+
+
+class VirtualClock(Clock):
+    """
+    Clock running on a virtual time event loop: games run as fast as the CPU allows
+    """
+
+    def __init__(self):
+        """
+        Initializer
+        """
+        super().__init__(VirtualTimeEventLoop())
+
+    def run(self, coroutine):
+        """
+        Run a coroutine on the virtual time event loop until it is done
+        :param coroutine: the coroutine
+        :return: the coroutine result
+        """
+        return self._loop.run_until_complete(coroutine)
+
+    def close(self):
+        self._loop.close()
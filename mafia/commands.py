@@ -1,11 +1,13 @@
 import asyncio
 import discord
 import re
+import time
 from mafia.house import House
 from mafia.roles.mafia.mafioso import Mafioso
-from mafia.misc.role_util import get_role_class_from_string
+from mafia.misc.role_util import get_role_class_from_string, get_role, ROLES_LIST
 from mafia.gamestate import GameState
-from mafia.misc.utils import Misc, Alignment
+from mafia.misc.utils import Misc, Alignment, NightActionType
+from mafia.dispatcher import Priority
 
 
 class Commands:
@@ -29,6 +31,10 @@ class Commands:
     # Commands used during trial
     CMD_INNOCENT = "-innocent"
     CMD_GUILTY = "-guilty"
+    # Commands used during night
+    CMD_VEST = "-vest"
+    CMD_TARGET = "-target"
+    CMD_SUGGEST = "-suggest"
 
     # Command with multiple behaviors
     CMD_CANCEL = "-cancel"
@@ -46,7 +52,7 @@ class Commands:
     CMDS_STATE_DAY_DISCUSSION = [CMD_PRIVATE_MESSAGE, CMD_SKIP]
     CMDS_STATE_DAY_VOTE = [CMD_VOTE, CMD_VOTES, CMD_PRIVATE_MESSAGE, CMD_SKIP]
     CMDS_STATE_DAY_TRIAL_DELIBERATION = [CMD_INNOCENT, CMD_GUILTY, CMD_CANCEL]
-    CMDS_STATE_NIGHT_DISCUSSION = []
+    CMDS_STATE_NIGHT_DISCUSSION = [CMD_VEST, CMD_TARGET, CMD_SUGGEST, CMD_SKIP, CMD_CANCEL]
 
     NO_CMDS_STATES = [
         GameState.state_wait_for_players,
@@ -54,6 +60,13 @@ class Commands:
         GameState.state_night_sequence
     ]
 
+    CMDS_STATES = {
+        GameState.state_day_discussion: CMDS_STATE_DAY_DISCUSSION,
+        GameState.state_day_vote: CMDS_STATE_DAY_VOTE,
+        GameState.state_day_trial_deliberation: CMDS_STATE_DAY_TRIAL_DELIBERATION,
+        GameState.state_night: CMDS_STATE_NIGHT_DISCUSSION
+    }
+
     def __init__(self, mafia_engine):
         """
         Initializer
@@ -73,32 +86,43 @@ class Commands:
             self.CMD_INNOCENT: self._manage_trial_vote,
             self.CMD_GUILTY: self._manage_trial_vote,
             self.CMD_CANCEL: self._manage_cancel,
+            self.CMD_VEST: self._manage_vest,
+            self.CMD_TARGET: self._manage_target,
+            self.CMD_SUGGEST: self._manage_suggest,
             self.CMD_PLAYERS: self._manage_players,
             self.CMD_MAFIA: self._manage_mafia
         }
 
-    def _manage_last_will(self, message, player):
-        if len(message.content) > 4 and message.content.startswith("-lw "):
+        # Dispatch table of each game state: command word -> command manager
+        self._dispatch_tables = {}
+        for state in GameState.states:
+            if state in self.NO_CMDS_STATES:
+                continue
+            available_cmds = self.CMDS_STATE_ANY + self.CMDS_STATES.get(state, [])
+            self._dispatch_tables[state] = {cmd: self._cmds_managers[cmd] for cmd in available_cmds}
+
+    def _manage_last_will(self, player, cmd, args):
+        if args:
             # Configure a new last will
-            player.set_last_will(message.content[4:])
+            player.set_last_will(args)
         if player.get_last_will() is not None:
             # Display the player last will for information
             player.send_message_to_player("*## Votre dernière volonté : {}*".format(player.get_last_will()))
         else:
             player.send_message_to_player("*## Pas de dernière volonté configurée.*")
 
-    def _manage_death_note(self, message, player):
-        if len(message.content) > 4 and message.content.startswith("-dn "):
+    def _manage_death_note(self, player, cmd, args):
+        if args:
             # Configure a new death note
-            player.set_death_note(message.content[4:])
+            player.set_death_note(args)
         if player.get_death_note() is not None:
             # Display the player death note for information
             player.send_message_to_player("*## Votre death note : {}*".format(player.get_death_note()))
         else:
             player.send_message_to_player("*## Pas de death note configurée.*")
 
-    def _manage_vote(self, message, player):
-        if message.content == '-votes':
+    def _manage_vote(self, player, cmd, args):
+        if cmd == self.CMD_VOTES:
             # Display a list of all votes
             current_votes = self._mafia_engine.get_current_votes()
             if len(current_votes) == 0:
@@ -113,162 +137,340 @@ class Commands:
                         "s" if current_votes[house_id] > 1 else ""
                     )
                 player.send_message_to_player(msg)
+        elif not player.is_player_alive():
+            player.send_message_to_player("*## Les morts ne votent pas.*")
         else:
-            # The player want to vote, display all available votes
-            votable_players = list()
-            list_vote_players = ""
-            for item in self._mafia_engine.players:
-                if item.is_player_alive() and item != player:
-                    list_vote_players += "*## {} - {}*\n".format(item.get_house().get_id(), item.get_nickname())
-                    votable_players.append(item)
-
-            if message.content.startswith('-vote ') and len(message.content) > 6:
-                vote = message.content[6:]
-                if vote.isdigit() and int(vote) in [i.get_house().get_id() for i in votable_players]:
+            if args:
+                vote = args
+                voted_player = self._get_votable_player(vote, player)
+                if voted_player is not None:
                     # Vote OK
                     player.set_vote_id(int(vote))
+                    self._mafia_engine.log_event("vote", house=player.get_house().get_id(), target=int(vote))
                     msg = "```diff\n-> {} a voté contre {}.\n```" \
-                        .format(player.get_nickname()[2:-2],
-                                self._mafia_engine.get_player_from_house_id(int(vote)).get_nickname()[2:-2])
+                        .format(player.get_plain_nickname(), voted_player.get_plain_nickname())
                     self._mafia_engine.send_message_everyone(msg)
+                    # Check if votes can launch a trial
+                    self._mafia_engine.check_votes_for_trial(int(vote))
                 else:
                     # Wrong vote
                     output = "*## Vote impossible. Vous pouvez voter contre un joueur de cette liste (utilisez le numéro) :*\n" \
-                             + list_vote_players
+                             + self._get_votable_players_list(player)
                     player.send_message_to_player(output)
             else:
                 if player.get_vote_id() is None:
-                    output = "*## Votez contre un joueur (utilisez le numéro) :*\n" + list_vote_players
+                    # The player want to vote, display all available votes
+                    output = "*## Votez contre un joueur (utilisez le numéro) :*\n" + self._get_votable_players_list(player)
                     player.send_message_to_player(output)
                 else:
                     player.set_vote_id(None)
+                    self._mafia_engine.log_event("vote", house=player.get_house().get_id(), target=None)
                     self._mafia_engine.send_message_everyone("*{} a annulé son vote.*".format(player.get_nickname()))
-            # Check if votes can launch a trial
-            self._mafia_engine.check_votes_for_trial()
 
-    def _manage_role(self, message, player):
-        if message.content == "-role":
+    def _get_votable_player(self, vote: str, player):
+        """
+        Get the player targeted by a vote
+        :param vote: the vote content, house id of the targeted player
+        :param player: the voting player
+        :return: the targeted player, None if the vote is invalid
+        """
+        if not vote.isdigit():
+            return None
+        try:
+            voted_player = self._mafia_engine.get_player_from_house_id(int(vote))
+        except Exception:
+            return None
+        if not voted_player.is_player_alive() or voted_player == player:
+            return None
+        return voted_player
+
+    def _get_votable_players_list(self, player) -> str:
+        """
+        Get the list of players who can receive a vote, ready to be displayed
+        :param player: the voting player
+        :return: the list as string
+        """
+        list_vote_players = ""
+        for item in self._mafia_engine.players:
+            if item.is_player_alive() and item != player:
+                list_vote_players += "*## {}*\n".format(item.get_display_name())
+        return list_vote_players
+
+    def _manage_role(self, player, cmd, args):
+        if cmd == self.CMD_ROLES:
+            player.send_message_to_player("*Rôles disponibles :*\n{}".format(ROLES_LIST))
+        elif not args:
             player.send_message_to_player("*# Votre rôle :*")
             player.get_role().print_role(player.send_message_embed)
-        elif message.content == "-roles":
-            print("TODO: implement a feature to return all possible roles in the game")
         else:
-            output = re.findall(r"-role (.+)", message.content)
-            if len(output) != 1:
-                player.send_message_to_player("*## Commande invalide de récupération de rôle.*")
+            # Get the role
+            role_class = get_role_class_from_string(args)
+            if role_class is not None:
+                player.send_message_to_player("*Description du rôle {} :*".format(args))
+                get_role(role_class).print_role(player.send_message_embed)
             else:
-                # Get the role
-                role_class = get_role_class_from_string(output[0])
-                if role_class is not None:
-                    player.send_message_to_player("*Description du rôle {} :*".format(output[0]))
-                    role_class().print_role(player.send_message_embed)
-                else:
-                    player.send_message_to_player("*## Rôle demandé inconnu.*")
+                player.send_message_to_player("*## Rôle demandé inconnu.*")
 
-    def _manage_graveyard(self, message, player):
+    def _manage_graveyard(self, player, cmd, args):
         print("TODO: Implement _manage_graveyard")
 
-    def _manage_private_message(self, message, player):
-        output = re.findall(r"^-pm ([\d]+) (.+)$", message.content)
-        if len(output) != 1:
+    def _manage_private_message(self, player, cmd, args):
+        target, _, private_msg = args.partition(" ")
+        if not target.isdigit() or not private_msg:
             player.send_message_to_player("*## Commande de message privé invalide.*")
         else:
-            target_id = int(output[0][0])
-            private_msg = output[0][1]
+            target_id = int(target)
             # Check if target player is not the author player
             if player.get_house().get_id() == target_id:
                 player.send_message_to_player("*## Vous ne pouvez pas vous envoyer à vous-même un message privé.*")
             else:
+                target_player = self._mafia_engine.get_player_from_house_id(target_id)
+                private_output = "**## MESSAGE PRIVE ##** {} - **{}** : {}".format(player.get_house().get_id(),
+                                                                                   player.get_nickname(),
+                                                                                   private_msg)
+                public_output = "**{}** a envoyé un message privé à **{}**.".format(player.get_nickname(),
+                                                                                    target_player.get_nickname())
                 for item in self._mafia_engine.players:
-                    if item.get_house().get_id() in [target_id, player.get_house().get_id()]:
-                        msg = "**## MESSAGE PRIVE ##** {} - **{}** : {}".format(player.get_house().get_id(),
-                                                                                player.get_nickname(),
-                                                                                private_msg)
-                        item.send_message_to_player(msg)
+                    if item == player or item == target_player:
+                        item.send_message_to_player(private_output, Priority.CHAT)
                     else:
-                        msg = "**{}** a envoyé un message privé à **{}**." \
-                            .format(player.get_nickname(),
-                                    self._mafia_engine.get_player_from_house_id(target_id).get_nickname())
-                        item.send_message_to_player(msg)
+                        item.send_message_to_player(public_output, Priority.CHAT)
+                self._mafia_engine.log_event("private_message", house=player.get_house().get_id(), target=target_id,
+                                             content=private_msg)
 
-    def _manage_skip(self, message, player):
-        if message.content == self.CMD_SKIP:
+    def _manage_skip(self, player, cmd, args):
+        if args:
+            # Invalid message content
+            return
+        if self._mafia_engine.get_game_state() == GameState.state_night:
+            if not self._check_night_actor(player):
+                return
+            # Nothing to do this night, the night may end sooner
+            self._mafia_engine.night_resolver.skip(player)
+            self._mafia_engine.log_event("night_skip", house=player.get_house().get_id())
+            player.send_message_to_player("*## Vous ne ferez rien cette nuit. '-cancel' pour annuler.*")
+            self._mafia_engine.check_night_actions()
+        elif not player.is_player_alive():
+            player.send_message_to_player("*## Les morts ne peuvent pas passer la journée.*")
+        else:
             # Increase skip count
             self._mafia_engine.check_day_skip(player)
 
-    def _manage_trial_vote(self, message, player):
+    def _manage_trial_vote(self, player, cmd, args):
         if player == self._mafia_engine.player_trial:
             player.send_message_to_player("*## Vous ne pouvez pas voter pour votre procès.*")
             return
+        if not player.is_player_alive():
+            player.send_message_to_player("*## Les morts ne votent pas.*")
+            return
+        if args:
+            # Invalid message content
+            return
         previous_vote = player.get_trial_vote()
-        if message.content == self.CMD_INNOCENT:
+        if cmd == self.CMD_INNOCENT:
             player.set_trial_vote(Misc.TRIAL_INNOCENT)
             player.send_message_to_player("*## Vous avez voté pour innocenter le joueur.*")
-        elif message.content == self.CMD_GUILTY:
+        else:
             player.set_trial_vote(Misc.TRIAL_GUILTY)
             player.send_message_to_player("*## Vous avez voté pour lyncher le joueur.*")
-        else:
-            # Invalid message content
-            return
+        self._mafia_engine.log_event("trial_vote", house=player.get_house().get_id(), vote=player.get_trial_vote())
 
         # Send message to all players
         if previous_vote is None:
             self._mafia_engine.send_message_everyone("*{} a voté.*".format(player.get_nickname()))
         else:
             self._mafia_engine.send_message_everyone("*{} a changé d'avis pour son vote.*".format(player.get_nickname()))
+        # The verdict doesn't wait for the end of the timer once everyone voted
+        self._mafia_engine.check_trial_votes()
 
-    def _manage_cancel(self, message, player):
-        if message.content == self.CMD_CANCEL:
+    def _manage_cancel(self, player, cmd, args):
+        if not args:
             game_state = self._mafia_engine.get_game_state()
-            if game_state == GameState.state_day_vote:
+            if game_state == GameState.state_day_trial_deliberation:
                 player.reset_trial_vote()
+                self._mafia_engine.log_event("trial_vote", house=player.get_house().get_id(), vote=None)
                 self._mafia_engine.send_message_everyone("*{} a annulé son vote.*".format(player.get_nickname()))
+            elif game_state == GameState.state_night:
+                if self._mafia_engine.night_resolver.cancel(player):
+                    self._mafia_engine.log_event("night_action", house=player.get_house().get_id(), target=None)
+                    player.send_message_to_player("*## Action de nuit annulée.*")
+                    if player.get_role().faction is not None:
+                        self._send_faction_summary(player.get_role().faction)
+                else:
+                    player.send_message_to_player("*## Aucune action de nuit à annuler.*")
+
+    def _send_faction_summary(self, faction):
+        """
+        Send the current choices of a faction and its resulting target to its alive members
+        :param faction: the faction, see Faction
+        """
+        tally = self._mafia_engine.night_resolver.get_tally(faction)
+        output = "*Choix de la faction :*\n"
+        for member, target in tally.get_targets().items():
+            output += "*{} veut tuer {}*\n".format(member.get_nickname(), target.get_nickname())
+        for member, target in tally.get_suggestions().items():
+            output += "*{} suggère {}*\n".format(member.get_nickname(), target.get_nickname())
+        consensus = tally.get_consensus()
+        if consensus is None:
+            output += "*Aucune cible choisie.*"
+        else:
+            output += "*Cible actuelle : {}*".format(consensus.get_display_name())
+        for item in self._mafia_engine.get_players_by_faction(faction):
+            if item.is_player_alive():
+                item.send_message_to_player(output, Priority.CHAT)
+
+    def _submit_night_action(self, player, target):
+        self._mafia_engine.night_resolver.submit(player, target)
+        self._mafia_engine.log_event("night_action", house=player.get_house().get_id(),
+                                     target=target.get_house().get_id())
 
-    def _manage_players(self, message, player):
-        if message.content == self.CMD_PLAYERS:
+    @staticmethod
+    def _check_night_actor(player) -> bool:
+        """
+        Check if a player can act this night, send the reason otherwise
+        :param player: the player
+        :return: True if the player is alive and has a night action available
+        """
+        if not player.is_player_alive():
+            player.send_message_to_player("*## Les morts n'agissent pas la nuit.*")
+            return False
+        if player.get_role().night_action is None or not player.can_use_night_action():
+            player.send_message_to_player("*## Vous n'avez aucune action à effectuer cette nuit.*")
+            return False
+        return True
+
+    def _manage_vest(self, player, cmd, args):
+        if args:
+            # Invalid message content
+            return
+        if not player.is_player_alive():
+            return
+        role = player.get_role()
+        if role.night_action != NightActionType.PROTECT or not role.night_action_self:
+            player.send_message_to_player("*## Votre rôle ne possède pas de gilet pare-balles.*")
+        elif not player.can_use_night_action():
+            player.send_message_to_player("*## Vous avez déjà utilisé votre gilet pare-balles.*")
+        else:
+            self._submit_night_action(player, player)
+            player.send_message_to_player("*## Vous porterez votre gilet pare-balles cette nuit. "
+                                          "'-cancel' pour annuler.*")
+            self._mafia_engine.check_night_actions()
+
+    def _get_night_target(self, target: str, player):
+        """
+        Get the player targeted by a night action
+        :param target: the command content, house id of the targeted player
+        :param player: the acting player
+        :return: the targeted player, None if the target is invalid
+        """
+        if not target.isdigit():
+            return None
+        try:
+            target_player = self._mafia_engine.get_player_from_house_id(int(target))
+        except Exception:
+            return None
+        if not target_player.is_player_alive() or self._is_ally(player, target_player):
+            return None
+        return target_player
+
+    @staticmethod
+    def _is_ally(player, other_player) -> bool:
+        """
+        Check if two players are on the same side: same faction if the player has one, same alignment otherwise
+        :param player: the acting player
+        :param other_player: the other player
+        :return: True if the players are allies
+        """
+        faction = player.get_role().faction
+        if faction is not None:
+            return other_player.get_role().faction == faction
+        return other_player.get_role().alignment == player.get_role().alignment
+
+    def _get_night_targets_list(self, player) -> str:
+        """
+        Get the list of players who can be targeted by a night action, ready to be displayed
+        :param player: the acting player
+        :return: the list as string
+        """
+        list_targets = ""
+        for item in self._mafia_engine.get_alive_players():
+            if not self._is_ally(player, item):
+                list_targets += "*## {}*\n".format(item.get_display_name())
+        return list_targets
+
+    def _manage_target(self, player, cmd, args):
+        if not player.is_player_alive():
+            return
+        if player.get_role().night_action != NightActionType.KILL:
+            player.send_message_to_player("*## Votre rôle ne permet pas de choisir une cible.*")
+            return
+        target_player = self._get_night_target(args, player) if args else None
+        if target_player is None:
+            output = "*## Choisissez une cible dans cette liste (utilisez le numéro) :*\n" \
+                     + self._get_night_targets_list(player)
+            player.send_message_to_player(output)
+        else:
+            self._submit_night_action(player, target_player)
+            if player.get_role().faction is not None:
+                self._send_faction_summary(player.get_role().faction)
+            else:
+                player.send_message_to_player("*## Vous avez choisi de tuer {}. '-cancel' pour annuler.*"
+                                              .format(target_player.get_nickname()))
+            self._mafia_engine.check_night_actions()
+
+    def _manage_suggest(self, player, cmd, args):
+        if not player.is_player_alive():
+            return
+        faction = player.get_role().faction
+        if faction is None:
+            player.send_message_to_player("*## Vous n'avez aucune faction à qui suggérer une cible.*")
+            return
+        target_player = self._get_night_target(args, player) if args else None
+        if target_player is None:
+            output = "*## Suggérez une cible dans cette liste (utilisez le numéro) :*\n" \
+                     + self._get_night_targets_list(player)
+            player.send_message_to_player(output)
+        else:
+            self._mafia_engine.night_resolver.suggest(player, target_player)
+            self._mafia_engine.log_event("night_suggestion", house=player.get_house().get_id(),
+                                         target=target_player.get_house().get_id())
+            self._send_faction_summary(faction)
+
+    def _manage_players(self, player, cmd, args):
+        if not args:
             full_town = ""
             for item in self._mafia_engine.players:
                 if item.is_player_alive():
-                    full_town += "*{} - {}*\n".format(item.get_house().get_id(), item.get_nickname())
+                    full_town += "*{}*\n".format(item.get_display_name())
                 else:
-                    full_town += "*~~{} - {}~~ (Mort)*\n".format(item.get_house().get_id(), item.get_nickname())
+                    full_town += "*~~{}~~ (Mort)*\n".format(item.get_display_name())
             player.send_message_to_player("*Composition des joueurs :*")
             player.send_message_to_player(full_town)
 
-    def _manage_mafia(self, message, player):
-        if message.content == self.CMD_MAFIA and player.get_role().alignment == Alignment.MAFIA:
+    def _manage_mafia(self, player, cmd, args):
+        if not args and player.get_role().alignment == Alignment.MAFIA:
             mafia_players = ""
             for item in self._mafia_engine.players:
                 if item.get_role().alignment == Alignment.MAFIA:
-                    mafia_players += "*{} - {}*\n".format(item.get_house().get_id(), item.get_nickname())
+                    mafia_players += "*{}*\n".format(item.get_display_name())
             player.send_message_to_player("*Autres membres de la Mafia :*\n{}".format(mafia_players))
 
     def manage_command(self, message, player):
-        game_state = self._mafia_engine.get_game_state()
-
-        # Get commands list
-        if game_state in self.NO_CMDS_STATES:
+        # Get available commands based on game state
+        dispatch_table = self._dispatch_tables.get(self._mafia_engine.get_game_state())
+        if dispatch_table is None:
             # No command state, get out
             return
 
-        # Get available commands base on game state
-        available_cmds = self.CMDS_STATE_ANY
-        if game_state == GameState.state_day_discussion:
-            available_cmds += self.CMDS_STATE_DAY_DISCUSSION
-        elif game_state == GameState.state_day_vote:
-            available_cmds += self.CMDS_STATE_DAY_VOTE
-        elif game_state == GameState.state_day_trial_deliberation:
-            available_cmds += self.CMDS_STATE_DAY_TRIAL_DELIBERATION
-        elif game_state == GameState.state_night:
-            available_cmds += self.CMDS_STATE_NIGHT_DISCUSSION
-
-        # Manage commands
-        for cmd in available_cmds:
-            if message.content.startswith(cmd):
-                # Command found, execute it
-                try:
-                    self._cmds_managers[cmd](message, player)
-                except Exception as exception:
-                    print("Failed to execute '{}' with content '{}'. Error: {}".format(cmd, message.content, exception))
-                # Exit the loop, we found the command and managed it
-                break
+        # Split the command word and its arguments
+        cmd, _, args = message.content.partition(" ")
+        cmd_manager = dispatch_table.get(cmd)
+        if cmd_manager is not None:
+            # Command found, execute it
+            start_time = time.perf_counter()
+            try:
+                cmd_manager(player, cmd, args.strip())
+            except Exception as exception:
+                print("Failed to execute '{}' with content '{}'. Error: {}".format(cmd, message.content, exception))
+                self._mafia_engine.metrics.command_errors.inc(cmd)
+            self._mafia_engine.metrics.command_duration.observe(cmd, time.perf_counter() - start_time)
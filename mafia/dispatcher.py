@@ -0,0 +1,305 @@
+import asyncio
+import heapq
+import itertools
+from collections import deque
+from mafia.clock import Clock
+from mafia.metrics import Metrics
+
+
+class Priority:
+    """
+    Outbound messages priorities, lower is sent first
+    """
+    GAME = 0
+    PLAYER = 1
+    TIMER = 2
+    CHAT = 3
+
+    NAMES = {
+        GAME: "game",
+        PLAYER: "player",
+        TIMER: "timer",
+        CHAT: "chat"
+    }
+
+
+class DeliveryStats:
+    """
+    Delivery accounting of a message priority
+    """
+
+    def __init__(self):
+        """
+        Initializer
+        """
+        self.queued = 0
+        self.sent = 0
+        self.failed = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def add_delivery(self, latency: float, success: bool):
+        """
+        Account a delivered (or failed) message
+        :param latency: time between message enqueue and send completion, in seconds
+        :param success: True if the message has been sent
+        """
+        self.queued -= 1
+        if success:
+            self.sent += 1
+        else:
+            self.failed += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def to_dict(self) -> dict:
+        delivered = self.sent + self.failed
+        return {
+            "queued": self.queued,
+            "sent": self.sent,
+            "failed": self.failed,
+            "latency_avg": self.latency_total / delivered if delivered > 0 else 0.0,
+            "latency_max": self.latency_max
+        }
+
+
+class _PrioritySemaphore:
+    """
+    Semaphore giving free slots to the waiter with the highest priority first
+    """
+
+    def __init__(self, value: int, loop):
+        self._value = value
+        self._loop = loop
+        self._waiters = []
+        self._counter = itertools.count()
+
+    def get_in_use(self, max_value: int) -> int:
+        return max_value - self._value
+
+    async def acquire(self, priority: int):
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return
+        waiter = self._loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was given right before the cancellation, give it to the next waiter
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                # Give the slot directly to the waiter
+                waiter.set_result(None)
+                return
+        self._value += 1
+
+
+class _RouteBucket:
+    """
+    Rate limit bucket of a Discord route (messages sent to a channel)
+    """
+
+    def __init__(self, limit: int, period: float, clock: Clock):
+        self._limit = limit
+        self._period = period
+        self._clock = clock
+        self._remaining = limit
+        self._reset_at = 0.0
+
+    async def acquire(self):
+        """
+        Wait until a request can be done on the route without being rate limited
+        """
+        now = self._clock.time()
+        if now >= self._reset_at:
+            self._remaining = self._limit
+            self._reset_at = now + self._period
+        if self._remaining == 0:
+            await self._clock.sleep(self._reset_at - now)
+            self._remaining = self._limit
+            self._reset_at = self._clock.time() + self._period
+        self._remaining -= 1
+
+    def get_reset_at(self) -> float:
+        """
+        Get the end of the current rate limit window
+        :return: clock time of the reset
+        """
+        return self._reset_at
+
+
+class _ChannelQueue:
+    """
+    Outbound queue of a channel, messages are sent in the order they were queued
+    """
+
+    def __init__(self, channel, bucket: _RouteBucket):
+        self.channel = channel
+        self.bucket = bucket
+        self.items = deque()
+        self.worker = None
+
+
+class OutboundDispatcher:
+    """
+    Outbound messages dispatcher shared by all games: per-channel FIFO queues, bounded concurrency given to the
+    channel with the most important message first, per-route rate limits and delivery accounting
+    """
+    MAX_CONCURRENT_SENDS = 8
+
+    def __init__(self, transport, clock: Clock = None, metrics: Metrics = None):
+        """
+        Initializer
+        :param transport: Transport used to send messages
+        :param clock: clock used to send messages, clock of the current event loop if None
+        :param metrics: metrics updated with send latencies, a new one is created if None
+        """
+        self._transport = transport
+        self.clock = clock if clock is not None else Clock()
+        self._metrics = metrics if metrics is not None else Metrics()
+        self._loop = self.clock.get_loop()
+        self._semaphore = _PrioritySemaphore(self.MAX_CONCURRENT_SENDS, self._loop)
+        self._queues = {}
+        # Outboxes buffering messages not queued yet
+        self._pending_outboxes = set()
+        # Rate limit buckets indexed by channel id, kept after the queue of an idle channel until their window ends
+        self._buckets = {}
+        self._stats = {priority: DeliveryStats() for priority in Priority.NAMES}
+
+    def enqueue(self, channel, content: str = None, embed=None, priority: int = Priority.GAME) -> asyncio.Future:
+        """
+        Queue a message to be sent to a channel
+        :param channel: the destination channel
+        :param content: text content of the message
+        :param embed: embed of the message, created by the transport
+        :param priority: message priority, see Priority
+        :return: future resolved with the sent message, or failing with the send error
+        """
+        queue = self._queues.get(channel.id)
+        if queue is None:
+            queue = _ChannelQueue(channel, self._get_bucket(channel.id))
+            self._queues[channel.id] = queue
+        future = self._loop.create_future()
+        queue.items.append((priority, self.clock.time(), content, embed, future))
+        self._stats[priority].queued += 1
+        if queue.worker is None or queue.worker.done():
+            queue.worker = self._loop.create_task(self._run_channel(queue))
+        return future
+
+    async def _run_channel(self, queue: _ChannelQueue):
+        """
+        Send queued messages of a channel, one at a time to keep the channel order
+        :param queue: the channel queue
+        """
+        while queue.items:
+            if queue.bucket is not None:
+                await queue.bucket.acquire()
+            # The channel order is kept, priorities only order the channels waiting for a send slot
+            await self._semaphore.acquire(queue.items[0][0])
+            priority, enqueue_time, content, embed, future = queue.items.popleft()
+            try:
+                message = await self._transport.send(queue.channel, content=content, embed=embed)
+            except Exception as exception:
+                print("Failed to send message to channel {}. Error: {}".format(queue.channel, exception))
+                latency = self.clock.time() - enqueue_time
+                self._stats[priority].add_delivery(latency, False)
+                self._metrics.send_latency.observe(Priority.NAMES[priority], latency)
+                if not future.done():
+                    future.set_exception(exception)
+                    # Failures are accounted here, don't warn about unretrieved exceptions
+                    future.exception()
+            else:
+                latency = self.clock.time() - enqueue_time
+                self._stats[priority].add_delivery(latency, True)
+                self._metrics.send_latency.observe(Priority.NAMES[priority], latency)
+                if not future.done():
+                    future.set_result(message)
+            finally:
+                self._semaphore.release()
+        # The channel is idle, forget it. Its bucket is kept until the end of its window, so a burst sent right
+        # after does not get a full allowance again.
+        if self._queues.get(queue.channel.id) is queue:
+            del self._queues[queue.channel.id]
+            if queue.bucket is not None:
+                self.clock.call_later(max(0.0, queue.bucket.get_reset_at() - self.clock.time()),
+                                      lambda: self._expire_bucket(queue.channel.id))
+
+    def _get_bucket(self, channel_id: int):
+        """
+        Get the rate limit bucket of a channel, created if needed
+        :param channel_id: channel id
+        :return: the _RouteBucket, None if the transport is not rate limited
+        """
+        if self._transport.ROUTE_RATE_LIMIT is None:
+            return None
+        bucket = self._buckets.get(channel_id)
+        if bucket is None:
+            bucket = _RouteBucket(*self._transport.ROUTE_RATE_LIMIT, self.clock)
+            self._buckets[channel_id] = bucket
+        return bucket
+
+    def _expire_bucket(self, channel_id: int):
+        """
+        Forget the bucket of an idle channel once its window is over
+        :param channel_id: channel id
+        """
+        bucket = self._buckets.get(channel_id)
+        if bucket is not None and channel_id not in self._queues and self.clock.time() >= bucket.get_reset_at():
+            del self._buckets[channel_id]
+
+    def add_pending_outbox(self, outbox):
+        """
+        Register an outbox buffering messages, flushed by drain
+        :param outbox: the ChannelOutbox
+        """
+        self._pending_outboxes.add(outbox)
+
+    def remove_pending_outbox(self, outbox):
+        self._pending_outboxes.discard(outbox)
+
+    async def drain(self):
+        """
+        Wait until every message is sent: buffered messages are flushed, then all channel queues are emptied
+        """
+        while True:
+            for outbox in list(self._pending_outboxes):
+                outbox.flush()
+            workers = [queue.worker for queue in self._queues.values() if queue.worker is not None]
+            if not workers:
+                return
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def get_queue_depth(self) -> int:
+        """
+        Get the number of messages waiting to be sent
+        :return: number of queued messages
+        """
+        return sum(stats.queued for stats in self._stats.values())
+
+    def get_in_flight(self) -> int:
+        """
+        Get the number of messages currently being sent
+        :return: number of sends in progress
+        """
+        return self._semaphore.get_in_use(self.MAX_CONCURRENT_SENDS)
+
+    def get_queue_depths(self) -> dict:
+        """
+        Get the number of messages waiting to be sent, per priority
+        :return: dict of queued messages counts indexed by priority name
+        """
+        return {Priority.NAMES[priority]: stats.queued for priority, stats in self._stats.items()}
+
+    def get_stats(self) -> dict:
+        """
+        Get delivery statistics of each priority
+        :return: dict of statistics indexed by priority name
+        """
+        return {Priority.NAMES[priority]: stats.to_dict() for priority, stats in self._stats.items()}
@@ -0,0 +1,155 @@
+import datetime
+import gzip
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from mafia.clock import Clock
+
+
+class GameEventLog:
+    """
+    Append-only event log of a game, one JSON object per line. Events are buffered in memory and written by the
+    logger thread, the log is compressed when closed.
+    """
+    FLUSH_DELAY = 1.0
+
+    def __init__(self, logger, path: str, clock: Clock, elapsed_time: float = 0.0):
+        """
+        Initializer
+        :param logger: the EventLogger owning the log
+        :param path: path of the log file, without compression extension
+        :param clock: clock used to timestamp events
+        :param elapsed_time: time elapsed since the beginning of the game, when an existing log is continued
+        """
+        self._logger = logger
+        self._path = path
+        self._clock = clock
+        self._start_time = clock.time() - elapsed_time
+        # Events waiting to be written: tuples (time, event type, data)
+        self._events = []
+        self._flush_handle = None
+        self._closed = False
+
+    def get_path(self) -> str:
+        """
+        Get the path of the log file, compressed when the log is closed
+        :return: the path
+        """
+        return self._path + ".gz" if self._closed else self._path
+
+    def get_elapsed_time(self) -> float:
+        """
+        Get the time elapsed since the log creation, used to timestamp events
+        :return: elapsed time, in seconds
+        """
+        return self._clock.time() - self._start_time
+
+    def log(self, event_type: str, data: dict):
+        """
+        Add an event to the log, only buffered: serialization and writing are done by the logger thread
+        :param event_type: type of the event
+        :param data: data of the event, JSON serializable, must not be modified afterwards
+        """
+        if self._closed:
+            return
+        self._events.append((self._clock.time() - self._start_time, event_type, data))
+        if self._flush_handle is None:
+            self._flush_handle = self._clock.call_later(self.FLUSH_DELAY, self.flush)
+
+    def flush(self):
+        """
+        Hand buffered events to the logger thread
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._events:
+            events = self._events
+            self._events = []
+            self._logger.submit(self._write, events)
+
+    def close(self):
+        """
+        Write remaining events and compress the log, nothing can be logged afterwards
+        """
+        if not self._closed:
+            self.flush()
+            self._closed = True
+            self._logger.submit(self._compress)
+
+    def _write(self, events: list):
+        lines = []
+        for event_time, event_type, data in events:
+            event = {"t": round(event_time, 6), "event": event_type}
+            event.update(data)
+            lines.append(json.dumps(event, ensure_ascii=False))
+        with open(self._path, 'a', encoding='utf-8') as log_file:
+            log_file.write("\n".join(lines) + "\n")
+
+    def _compress(self):
+        if os.path.exists(self._path):
+            with open(self._path, 'rb') as log_file, gzip.open(self._path + ".gz", 'wb') as compressed_file:
+                shutil.copyfileobj(log_file, compressed_file)
+            os.remove(self._path)
+
+
+class EventLogger:
+    """
+    Create the event logs of games, and write them from a single background thread to keep file accesses out of
+    the event loop
+    """
+    DEFAULT_DIRECTORY = "game_logs"
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY):
+        """
+        Initializer
+        :param directory: directory of the logs, created if needed
+        """
+        self._directory = directory
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="event-log")
+        self._directory_ready = False
+
+    def open_log(self, name: str, clock: Clock) -> GameEventLog:
+        """
+        Create the event log of a new game
+        :param name: name of the game, the creation date is added to the file name
+        :param clock: clock of the game, used to timestamp events
+        :return: the event log
+        """
+        if not self._directory_ready:
+            os.makedirs(self._directory, exist_ok=True)
+            self._directory_ready = True
+        file_name = "{}_{}.jsonl".format(name, datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f"))
+        return GameEventLog(self, os.path.join(self._directory, file_name), clock)
+
+    def continue_log(self, path: str, clock: Clock, elapsed_time: float) -> GameEventLog:
+        """
+        Continue the event log of a resumed game
+        :param path: path of the log file
+        :param clock: clock of the game, used to timestamp events
+        :param elapsed_time: time elapsed since the beginning of the game
+        :return: the event log
+        """
+        return GameEventLog(self, path, clock, elapsed_time)
+
+    def submit(self, function, *args):
+        """
+        Run a file operation in the logger thread, operations are run in submission order
+        :param function: the operation
+        :param args: arguments of the operation
+        """
+        self._executor.submit(self._run, function, *args)
+
+    @staticmethod
+    def _run(function, *args):
+        try:
+            function(*args)
+        except Exception as exception:
+            print("Failed to write event log. Error: {}".format(exception))
+
+    def close(self):
+        """
+        Wait until all submitted operations are done
+        """
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,100 @@
+class FactionTally:
+    """
+    Incremental tally of the night targets of a faction. Targets are grouped by number of members choosing them, so
+    the consensus target is readable in O(1) and each choice is counted in O(1).
+    """
+
+    def __init__(self):
+        """
+        Initializer
+        """
+        # Targets and suggestions of members, indexed by member
+        self._targets = {}
+        self._suggestions = {}
+        # Number of members choosing each target
+        self._counts = {}
+        # Targets indexed by count, then ordered by the time they reached this count
+        self._buckets = [{}]
+        self._max_count = 0
+        # Target of the faction leader, overriding the tally
+        self._leader_target = None
+
+    def _increment(self, target):
+        count = self._counts.get(target, 0)
+        if count > 0:
+            del self._buckets[count][target]
+        count += 1
+        self._counts[target] = count
+        if count == len(self._buckets):
+            self._buckets.append({})
+        self._buckets[count][target] = None
+        if count > self._max_count:
+            self._max_count = count
+
+    def _decrement(self, target):
+        count = self._counts[target]
+        del self._buckets[count][target]
+        count -= 1
+        if count > 0:
+            self._counts[target] = count
+            self._buckets[count][target] = None
+        else:
+            del self._counts[target]
+        if not self._buckets[self._max_count]:
+            self._max_count -= 1
+
+    def set_target(self, member, target, leader: bool = False):
+        """
+        Update the target chosen by a member
+        :param member: the faction member
+        :param target: the targeted player, None to cancel the choice
+        :param leader: True if the member leads the faction, its target overrides the tally
+        """
+        previous_target = self._targets.pop(member, None)
+        if previous_target is not None:
+            self._decrement(previous_target)
+        if target is not None:
+            self._targets[member] = target
+            self._increment(target)
+        if leader:
+            self._leader_target = target
+
+    def set_suggestion(self, member, target):
+        """
+        Update the target suggested by a member, suggestions are displayed to the faction but not counted
+        :param member: the faction member
+        :param target: the suggested player, None to cancel the suggestion
+        """
+        if target is None:
+            self._suggestions.pop(member, None)
+        else:
+            self._suggestions[member] = target
+
+    def get_target(self, member):
+        return self._targets.get(member)
+
+    def get_targets(self) -> dict:
+        """
+        Get the live view of members targets, must not be modified
+        :return: dict of targeted players indexed by member
+        """
+        return self._targets
+
+    def get_suggestions(self) -> dict:
+        """
+        Get the live view of members suggestions, must not be modified
+        :return: dict of suggested players indexed by member
+        """
+        return self._suggestions
+
+    def get_consensus(self):
+        """
+        Get the target of the faction: the leader target if set, else the most chosen target, the first one to reach
+        this count in case of tie
+        :return: the targeted player, None if no target is chosen
+        """
+        if self._leader_target is not None:
+            return self._leader_target
+        if self._max_count == 0:
+            return None
+        return next(iter(self._buckets[self._max_count]))
@@ -1,31 +1,61 @@
-import discord
 import random
-import time
-import names
 import re
 import math
 
-import asyncio
-from statemachine import StateMachine, State
-from threading import Thread, Timer
-from mafia.misc.utils import Alignment, Misc, Timers
+from mafia.misc.utils import Faction, Timers
 from mafia.player import Player
+from mafia.fakeplayer import FakePlayer
 from mafia.commands import Commands
-from mafia.misc.role_util import get_role_class_from_string
 from mafia.gamestate import GameState
-
-# TODO: FOR DEBUG PURPOSES
-from mafia.fakeplayer import FakePlayer
+from mafia.scheduler import Scheduler
+from mafia.dispatcher import OutboundDispatcher, Priority
+from mafia.votetally import VoteTally
+from mafia.misc.setups import Setups
+from mafia.misc.nicknames import get_random_full_name
+from mafia.transport import Transport, DiscordTransport
+from mafia.metrics import Metrics
+from mafia.eventlog import EventLogger
+from mafia.channelpool import ChannelPool
+from mafia.nightresolver import NightResolver
+from mafia.wintracker import WinTracker
 
 
 class MafiaEngine:
 
-    def __init__(self, bot):
+    def __init__(self, bot, registry=None, scheduler: Scheduler = None, dispatcher: OutboundDispatcher = None,
+                 setups: Setups = None, transport: Transport = None, timers=Timers, metrics: Metrics = None,
+                 event_logger: EventLogger = None, channel_pool: ChannelPool = None):
         """
         Initializer
         :param bot: discord Bot reference
+        :param registry: GameRegistry reference, used to route private channels messages to this engine
+        :param scheduler: timer scheduler shared by all games, a new one is created if None
+        :param dispatcher: outbound messages dispatcher shared by all games, a new one is created if None
+        :param setups: role setups shared by all games, loaded from the default file if None
+        :param transport: chat service transport, Discord if None
+        :param timers: phases durations, see Timers
+        :param metrics: metrics shared by all games, a new one is created if None
+        :param event_logger: games event logs writer, a new one is created if None
+        :param channel_pool: private channels pool shared by all games, a new one is created if None
         """
         self._bot = bot
+        self._registry = registry
+        self.transport = transport if transport is not None else DiscordTransport()
+        self.scheduler = scheduler if scheduler is not None else Scheduler()
+        self.dispatcher = dispatcher if dispatcher is not None else OutboundDispatcher(self.transport,
+                                                                                       self.scheduler.clock)
+        self.channel_pool = channel_pool if channel_pool is not None else ChannelPool(self.transport,
+                                                                                     self.scheduler.clock)
+        self.timers = timers
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.event_logger = event_logger if event_logger is not None else EventLogger()
+        self.event_log = None
+        self._event_listeners = []
+        self.setups = setups if setups is not None else Setups()
+        self._setup_preset = None
+        # Random generator of the game, seeded at creation so a game can be replayed
+        self.seed = None
+        self.random = random.Random()
         self._game_state = None
         self.players = []
         self.private_channels = []
@@ -36,56 +66,282 @@ class MafiaEngine:
         self.cultist_players = []
         self.mason_players = []
 
+        # Players indexes
+        self._players_by_channel = {}
+        self._players_by_author = {}
+        self._players_by_house = {}
+        self._players_by_alignment = {}
+        self._players_by_faction = {}
+        self._alive_players = {}
+        self._dead_players = []
+
         self.player_trial = None
-        self._player_skips = list()
+        self.vote_tally = VoteTally()
+        self.night_resolver = NightResolver(self.random, self.get_players_by_faction, self.get_alive_players)
+        self.win_tracker = WinTracker()
 
     def reset_game(self):
+        self.release_private_channels()
+        self.close_event_log()
         self._game_state = None
         self.players = []
+
+        self.mafia_players = []
+        self.triad_players = []
+        self.cultist_players = []
+        self.mason_players = []
+
+        self._players_by_channel = {}
+        self._players_by_author = {}
+        self._players_by_house = {}
+        self._players_by_alignment = {}
+        self._players_by_faction = {}
+        self._alive_players = {}
+        self._dead_players = []
+
+        self.player_trial = None
+        self.vote_tally = VoteTally()
+        self.night_resolver = NightResolver(self.random, self.get_players_by_faction, self.get_alive_players)
+        self.win_tracker = WinTracker()
+
+    def _add_player(self, player: Player):
+        """
+        Add a new player to the game, and route its private channel messages to this engine
+        :param player: the new player
+        """
+        self.players.append(player)
+        self.private_channels.append(player.get_private_channel())
+        self._players_by_channel[player.get_private_channel().id] = player
+        if not player.FAKE:
+            self._players_by_author[player.get_id()] = player
+        self._alive_players[player] = None
+        player.add_death_listener(self._on_player_death)
+        player.set_vote_tally(self.vote_tally)
+        if self._registry is not None:
+            self._registry.register_channel(player.get_private_channel(), self)
+        self.log_event("player_joined", channel=player.get_private_channel().id, author=player.get_id(),
+                       name=player.get_author_name(), fake=player.FAKE)
+
+    def release_private_channels(self):
+        """
+        Stop routing the private channels messages to this engine, and give the channels back to the pool
+        """
+        if self._registry is not None:
+            self._registry.unregister_channels(self)
+        self.channel_pool.release(self.private_channels)
         self.private_channels = []
 
+    def _is_channel_used(self, channel_id: int) -> bool:
+        """
+        Check if a private channel is used by a game
+        :param channel_id: channel id
+        :return: True if a game owns the channel
+        """
+        if self._registry is not None:
+            return self._registry.is_channel_registered(channel_id)
+        return channel_id in self._players_by_channel
+
+    def _on_player_death(self, player: Player):
+        """
+        Called when a player dies, update players indexes
+        :param player: the dead player
+        """
+        self._alive_players.pop(player, None)
+        self._dead_players.append(player)
+        # Dead players votes don't count anymore
+        player.set_vote_id(None)
+        player.reset_trial_vote()
+        self.vote_tally.remove_skip(player)
+        # Only configured players are counted by the win tracker
+        if player.get_role() is not None:
+            self.win_tracker.remove_player(player)
+        house = player.get_house()
+        self.log_event("death", house=house.get_id() if house is not None else None,
+                       role=getattr(player.get_role(), "name", None))
+
+    def to_snapshot(self) -> dict:
+        """
+        Get the game data: state, players, votes and remaining time of the next state
+        :return: dict, JSON serializable
+        """
+        version, internal_state, gauss_next = self.random.getstate()
+        return {
+            "preset": self._setup_preset,
+            "seed": self.seed,
+            "random": [version, list(internal_state), gauss_next],
+            "state": self._game_state.to_snapshot(),
+            "players": [player.to_snapshot() for player in self.players],
+            "dead": [player.get_private_channel().id for player in self._dead_players],
+            "trial": self.player_trial.get_private_channel().id if self.player_trial is not None else None,
+            "night_actions": [[action.player.get_private_channel().id, action.target.get_private_channel().id]
+                              for action in self.night_resolver.get_actions()],
+            "night_skips": [player.get_private_channel().id for player in self.night_resolver.get_skips()],
+            "skips": [player.get_private_channel().id for player in self.players
+                      if self.vote_tally.has_skipped(player)],
+            "event_log": {"path": self.event_log.get_path(), "elapsed": self.event_log.get_elapsed_time()}
+            if self.event_log is not None else None
+        }
+
+    async def restore_snapshot(self, snapshot: dict, guild_id: int):
+        """
+        Resume a game from its snapshot
+        :param snapshot: dict created by to_snapshot
+        :param guild_id: id of the guild hosting the game
+        """
+        self.reset_game()
+        self._setup_preset = snapshot["preset"]
+        self.seed = snapshot["seed"]
+        version, internal_state, gauss_next = snapshot["random"]
+        self.random.setstate((version, tuple(internal_state), gauss_next))
+        self._game_state = GameState(self._bot, self)
+
+        players_by_channel = {}
+        for player_snapshot in snapshot["players"]:
+            channel = await self.transport.get_channel(guild_id, player_snapshot["channel"])
+            author = await self.transport.get_member(guild_id, player_snapshot["author"])
+            if channel is None or author is None:
+                raise Exception("Private channel or member of player {} not found."
+                                .format(player_snapshot["nickname"]))
+            player_class = FakePlayer if player_snapshot["fake"] else Player
+            player = player_class(author, self.dispatcher, self.transport)
+            player.restore_snapshot(player_snapshot, channel)
+            self._add_player(player)
+            players_by_channel[channel.id] = player
+        if all(player.get_house() is not None and player.get_role() is not None for player in self.players):
+            self._index_players_roles()
+
+        # Dead players, in death order
+        for channel_id in snapshot["dead"]:
+            player = players_by_channel[channel_id]
+            self._alive_players.pop(player, None)
+            self._dead_players.append(player)
+        # Votes of alive players, the tally is rebuilt from them
+        for player, player_snapshot in zip(self.players, snapshot["players"]):
+            if player.is_player_alive():
+                player.set_vote_id(player_snapshot["vote"])
+                player.set_trial_vote(player_snapshot["trial_vote"])
+        for channel_id in snapshot["skips"]:
+            self.vote_tally.add_skip(players_by_channel[channel_id])
+        if snapshot["trial"] is not None:
+            self.player_trial = players_by_channel[snapshot["trial"]]
+        for channel_id, target_channel_id in snapshot["night_actions"]:
+            self.night_resolver.submit(players_by_channel[channel_id], players_by_channel[target_channel_id])
+        for channel_id in snapshot.get("night_skips", []):
+            self.night_resolver.skip(players_by_channel[channel_id])
+
+        if snapshot["event_log"] is not None:
+            self.event_log = self.event_logger.continue_log(snapshot["event_log"]["path"], self.scheduler.clock,
+                                                            snapshot["event_log"]["elapsed"])
+        self.log_event("game_resumed", state=snapshot["state"]["state"])
+        self._game_state.restore_snapshot(snapshot["state"])
+
+    def log_event(self, event_type: str, **data):
+        """
+        Add an event to the game event log
+        :param event_type: type of the event
+        :param data: data of the event, JSON serializable
+        """
+        if self.event_log is not None:
+            self.event_log.log(event_type, data)
+        for listener in self._event_listeners:
+            listener(event_type, data)
+
+    def add_event_listener(self, listener):
+        """
+        Register a function called for each game event
+        :param listener: function taking the event type and the event data as parameters
+        """
+        self._event_listeners.append(listener)
+
+    def close_event_log(self):
+        """
+        Close the game event log, it is compressed in background
+        """
+        if self.event_log is not None:
+            self.event_log.close()
+            self.event_log = None
+
     def get_game_state(self):
         if self._game_state is None:
             return None
         return self._game_state.current_state
 
-    def send_message_everyone(self, message):
+    def is_game_running(self) -> bool:
+        """
+        Check if a game is created and not over
+        :return: True from the lobby to the game over excluded
+        """
+        game_state = self.get_game_state()
+        return game_state is not None and game_state != GameState.state_game_over
+
+    def on_game_over(self):
+        """
+        Called when the game is over, before the result is announced: the game must not be resumed anymore
+        """
+        if self._registry is not None:
+            self._registry.delete_engine_snapshot(self)
+
+    def finish_game(self):
+        """
+        Called once the result has been displayed: free the lobby and release the private channels
+        """
+        self._game_state = None
+        self.send_message_everyone("*La partie est terminée, les salons privés vont être libérés.*")
+        if self._registry is not None:
+            self._registry.remove_finished_engine(self)
+        else:
+            self.release_private_channels()
+
+    def send_message_everyone(self, message, priority=Priority.GAME):
         for player in self.players:
-            player.send_message_to_player(message)
+            player.send_message_to_player(message, priority)
 
     def set_player_nickname(self, message):
-        for player in self.players:
-            if message.author.id == player.get_id():
-                # Check name content
-                if re.match(r"^[a-zA-Z0-9 éèçàäëüïöâêûîôù'_-]+$", message.content):
-                    if player.get_nickname() is None:
-                        player.set_nickname(message.content[1:])
-                        self.send_message_everyone("{} a rejoint la partie.".format(player.get_nickname()))
-                    else:
-                        old_nickname = player.get_nickname()
-                        player.set_nickname(message.content[1:])
-                        self.send_message_everyone("{} s'est renommé {}.".format(old_nickname, player.get_nickname()))
-                else:
-                    player.send_message_to_player("*ERROR* - Caractères invalides dans le pseudo.")
+        player = self.get_player_from_message(message)
+        # Check name content
+        if re.match(r"^[a-zA-Z0-9 éèçàäëüïöâêûîôù'_-]+$", message.content):
+            if player.get_nickname() is None:
+                player.set_nickname(message.content[1:])
+                self.send_message_everyone("{} a rejoint la partie.".format(player.get_nickname()))
+            else:
+                old_nickname = player.get_nickname()
+                player.set_nickname(message.content[1:])
+                self.send_message_everyone("{} s'est renommé {}.".format(old_nickname, player.get_nickname()))
+            self.log_event("nickname", channel=message.channel.id, nickname=message.content[1:])
+        else:
+            player.send_message_to_player("*ERROR* - Caractères invalides dans le pseudo.")
 
     def reset_votes(self):
         for player in self.players:
-            player.set_vote(None)
+            player.set_vote_id(None)
+        self.vote_tally.reset_votes()
 
-    def compile_roles(self):
-        # TODO: should be updated !
-        from mafia.roles.town.citizen import Citizen
-        from mafia.roles.mafia.mafioso import Mafioso
-        roles = [Mafioso, Mafioso, Mafioso]
-        roles += [Citizen for i in range(1, (len(self.players) + 1) - 3)]
+    def reset_trial_votes(self):
+        for player in self.players:
+            player.reset_trial_vote()
+        self.vote_tally.reset_trial_votes()
 
+    def compile_roles(self):
+        """
+        Get the shuffled list of roles of the game, based on the setup preset
+        :return: list of role classes
+        """
+        roles = self.setups.get_roles(len(self.players), self._setup_preset)
+        self.random.shuffle(roles)
         return roles
 
+    def get_random_nickname(self) -> str:
+        """
+        Get a random full name, reproducible from the game seed
+        :return: the nickname
+        """
+        return get_random_full_name(self.random)
+
     def configure_players(self):
         # Generate list of house positions based on players count
         player_house_ids = [i for i in range(1, len(self.players) + 1)]
         # Randomize house positions order
-        random.shuffle(player_house_ids)
+        self.random.shuffle(player_house_ids)
 
         # Get list of roles based on configuration
         player_roles = self.compile_roles()
@@ -94,95 +350,173 @@ class MafiaEngine:
         for player in self.players:
             if player.get_nickname() is None:
                 # Force a nickname
-                player.set_nickname(nickname=names.get_full_name())
+                player.set_nickname(nickname=self.get_random_nickname())
             player.set_house(player_house_ids.pop())
             player.set_role(player_roles.pop())
 
-            # Update local variables
-            if player.get_role().alignment == Alignment.MAFIA:
-                self.mafia_players.append(player)
+            self.log_event("role_assigned", channel=player.get_private_channel().id, house=player.get_house().get_id(),
+                           nickname=player.get_nickname(), role=player.get_role().name)
 
         # Sort players by position
         self.players = sorted(self.players, key=lambda k: k.get_house().get_id())
+        self._index_players_roles()
 
-        time.sleep(2.0)
+    def _index_players_roles(self):
+        """
+        Index configured players by house, by alignment and by faction, and count alive players
+        """
+        self._players_by_house = {}
+        self._players_by_alignment = {}
+        self._players_by_faction = {}
+        self.win_tracker = WinTracker()
+        for player in self.players:
+            role = player.get_role()
+            if player.is_player_alive():
+                self.win_tracker.add_player(player)
+            self._players_by_house[player.get_house().get_id()] = player
+            self._players_by_alignment.setdefault(role.alignment, []).append(player)
+            if role.faction is not None:
+                self._players_by_faction.setdefault(role.faction, []).append(player)
+        self.mafia_players = self._players_by_faction.setdefault(Faction.MAFIA, [])
+        self.triad_players = self._players_by_faction.setdefault(Faction.TRIAD, [])
+        self.cultist_players = self._players_by_faction.setdefault(Faction.CULT, [])
+        self.mason_players = self._players_by_faction.setdefault(Faction.MASONS, [])
+
+    def send_players_composition(self):
+        """
+        Send the list of all players and their houses to everyone
+        """
         full_town = ""
         for player in self.players:
-            full_town += "{} - {}\n".format(player.get_house().get_id(), player.get_nickname())
+            full_town += "{}\n".format(player.get_display_name())
         self.send_message_everyone("Composition des joueurs :")
         self.send_message_everyone(full_town)
 
     def player_send_message_to_players(self, message, players):
         sender = self.get_player_from_message(message)
-        output = "{} - {}: {}".format(sender.get_house().get_id(), sender.get_nickname(), message.content)
+        output = "{}: {}".format(sender.get_display_name(), message.content)
         for player in players:
-            player.send_message_to_player(output)
+            player.send_message_to_player(output, Priority.CHAT)
+        self.log_event("chat", house=sender.get_house().get_id(), content=message.content, recipients=len(players))
 
     def get_player_from_message(self, message) -> Player:
-        for player in self.players:
-            if message.author.id == player.get_id() and message.channel == player.get_private_channel():
-                return player
-            elif message.channel == player.get_private_channel() and type(player) is FakePlayer:
-                return player
+        player = self._players_by_channel.get(message.channel.id)
+        if player is not None and (player.FAKE or message.author.id == player.get_id()):
+            return player
         raise Exception("Player not found for message {}. Should be {}.".format(message.content, message.author.name))
 
+    def get_player_from_author_id(self, author_id) -> Player:
+        """
+        Get the (non fake) player of a discord user
+        :param author_id: discord user id
+        :return: the player, None if the user doesn't play
+        """
+        return self._players_by_author.get(author_id)
+
     def get_player_from_house_id(self, house_id) -> Player:
-        for player in self.players:
-            if player.get_house().get_id() == house_id:
-                return player
-        raise Exception("Player not found at house {}.".format(house_id))
+        player = self._players_by_house.get(house_id)
+        if player is None:
+            raise Exception("Player not found at house {}.".format(house_id))
+        return player
+
+    def get_alive_players(self) -> list:
+        """
+        Get alive players, in joining order
+        :return: list of alive players
+        """
+        return list(self._alive_players)
+
+    def get_dead_players(self) -> list:
+        """
+        Get dead players, in death order
+        :return: list of dead players
+        """
+        return list(self._dead_players)
+
+    def get_players_by_alignment(self, alignment) -> list:
+        """
+        Get all players of an alignment
+        :param alignment: the alignment, see Alignment
+        :return: list of players
+        """
+        return self._players_by_alignment.get(alignment, [])
+
+    def get_winner(self):
+        """
+        Get the winner of the game, evaluated in constant time from the alive players counters
+        :return: the winning Alignment, WinTracker.DRAW if nobody survived, None if the game goes on
+        """
+        return self.win_tracker.get_winner()
+
+    def get_players_by_faction(self, faction) -> list:
+        """
+        Get all players of a faction
+        :param faction: the faction, see Faction
+        :return: list of players
+        """
+        return self._players_by_faction.get(faction, [])
 
     def check_day_skip(self, player: Player):
         # Add player to skippers
-        if player not in self._player_skips:
-            self._player_skips.append(player)
+        if self.vote_tally.add_skip(player):
             self.send_message_everyone("*# {} souhaite passer la journée.*".format(player.get_nickname()))
-        if len(self._player_skips) > math.ceil(self.get_nb_alive_players()/2):
-            # Reset count and go to night now !
-            self._player_skips = list()
+            self.log_event("skip", house=player.get_house().get_id())
+        if self.vote_tally.get_skips_count() > math.ceil(self.get_nb_alive_players()/2):
+            # Reset count and end the day now !
+            self.vote_tally.reset_skips()
+            self._game_state.disable_next_state()
+            self._game_state.day_end()
+
+    def check_trial_votes(self):
+        """
+        Go to the verdict as soon as every alive player but the accused one has voted
+        """
+        if self.vote_tally.get_trial_voters_count() >= self.get_nb_alive_players() - 1:
+            self.send_message_everyone("*Tout le monde a voté.*")
+            self._game_state.disable_next_state()
+            self._game_state.day_trial_verdict()
+
+    def check_night_actions(self):
+        """
+        End the night as soon as every player able to act has submitted its action or skipped
+        """
+        if self.night_resolver.is_complete():
+            self.send_message_everyone("*Tout le monde a agi, la nuit se termine.*")
             self._game_state.disable_next_state()
-            self._game_state.night()
+            self._game_state.night_sequence()
 
     def get_current_votes(self) -> dict:
         """
         Get a compilation of all current votes
-        :return: dict containing player house IDs and their corresponding votes
-        """
-        current_votes = {}
-        for item in self.players:
-            player_vote = item.get_vote_id()
-            if player_vote is not None:
-                voted_player = self.get_player_from_house_id(player_vote)
-                if voted_player.get_house().get_id() in current_votes:
-                    current_votes[voted_player.get_house().get_id()] += 1
-                else:
-                    current_votes[voted_player.get_house().get_id()] = 1
-        return current_votes
+        :return: dict containing player house IDs and their corresponding votes, must not be modified
+        """
+        return self.vote_tally.get_current_votes()
 
     def get_nb_alive_players(self) -> int:
         """
         Get the number of current alive players
         :return: number of current alive players
         """
-        alive_players = 0
-        for player in self.players:
-            if player.is_player_alive():
-                alive_players += 1
-        return alive_players
+        return len(self._alive_players)
 
-    def check_votes_for_trial(self):
+    def check_votes_for_trial(self, house_id: int = None):
         """
         Check votes and go to trial if needed.
+        :param house_id: house id of the player who just received a vote, check all players if None
         """
         # Compute minimum votes to go to trial
         alive_players = self.get_nb_alive_players()
         votes_threshold = math.ceil(alive_players/2)
-        # Check for each voted players if required votes are reached
-        current_votes = self.get_current_votes()
-        for house_id in current_votes:
-            if current_votes[house_id] > votes_threshold:
+        # Check if required votes are reached
+        if house_id is not None:
+            house_ids = [house_id]
+        else:
+            house_ids = list(self.vote_tally.get_current_votes())
+        for item in house_ids:
+            if self.vote_tally.get_votes(item) > votes_threshold:
                 # Go to trial !
-                self.player_trial = self.get_player_from_house_id(house_id)
+                self.player_trial = self.get_player_from_house_id(item)
+                self.log_event("trial", house=item, votes=self.vote_tally.get_votes(item))
                 # Stop timer of night transition
                 self._game_state.disable_next_state()
                 # Go to trial !
@@ -190,6 +524,33 @@ class MafiaEngine:
                 # Break the loop to stop check
                 break
 
+    def manage_message(self, message):
+        """
+        Manage a message sent in a private channel, depending on game state
+        :param message: the message
+        """
+        game_state = self.get_game_state()
+        state_name = game_state.identifier if game_state is not None else "none"
+        self.metrics.inbound_messages.inc(state_name)
+        # Raw input of the game, replayed by mafia.replay
+        self.log_event("message", channel=message.channel.id, content=message.content, state=state_name)
+        if game_state == GameState.state_players_nicknames:
+            # Start game, only accept custom nicknames
+            if message.content.startswith('-') and len(message.content) > 1:
+                self.set_player_nickname(message)
+        elif game_state in [GameState.state_day_discussion,
+                            GameState.state_day_vote,
+                            GameState.state_day_trial_deliberation]:
+            self.manage_day_common(message)
+        elif game_state in [GameState.state_day_trial_defense,
+                            GameState.state_day_trial_last_words]:
+            self.manage_day_trial_defense(message)
+        elif game_state == GameState.state_night:
+            self.manage_night(message)
+        elif game_state == GameState.state_game_over:
+            # Everyone can talk once the game is over, dead players included
+            self.manage_day_common(message)
+
     def manage_day_common(self, message):
         player = self.get_player_from_message(message)
         # Manage commands
@@ -221,34 +582,49 @@ class MafiaEngine:
         if message.content.startswith('-'):
             self._cmd_manager.manage_command(message, player)
         else:
-            if player in self.mafia_players:
-                self.player_send_message_to_players(message, self.mafia_players)
+            faction = player.get_role().faction
+            if faction is not None:
+                self.player_send_message_to_players(message, self.get_players_by_faction(faction))
 
     # ##################################################################################################################
-    async def create_game(self, ctx):
+    async def create_game(self, ctx, preset: str = None, seed: int = None):
         """
         Create a new game lobby
         :param ctx: context
+        :param preset: name of the role setup preset, default preset if None
+        :param seed: seed of the game random generator, random if None
         """
         print("MafiaEngine.start_game")
-        if self._game_state is not None:
+        if self.is_game_running():
             await ctx.send("Impossible de lancer une nouvelle partie. Partie déjà en cours.")
+        elif preset is not None and preset not in self.setups.get_presets():
+            await ctx.send("Configuration de rôles inconnue. Configurations disponibles : {}"
+                           .format(", ".join(self.setups.get_presets())))
         else:
             # Display message game start
             await ctx.send("Nouvelle partie de Mafia démarrée par {}. Pour rejoindre, tapez \"$join_game\""
                            .format(ctx.author.name))
+            if self._game_state is not None:
+                # Previous game over, stop its result display
+                self._game_state.stop()
             # Clean variables
             self.reset_game()
+            self._setup_preset = preset
+            self.seed = seed if seed is not None else random.randrange(2 ** 32)
+            self.random.seed(self.seed)
+            self.event_log = self.event_logger.open_log("{}_{}".format(ctx.guild.id, ctx.channel.id),
+                                                       self.scheduler.clock)
+            self.log_event("game_created", guild=ctx.guild.id, channel=ctx.channel.id, author=ctx.author.id,
+                           preset=self.setups.get_default_preset() if preset is None else preset, seed=self.seed,
+                           timers={name: getattr(self.timers, name) for name in dir(self.timers)
+                                   if name.startswith("TIME")})
 
             # Initialize state machine
             self._game_state = GameState(self._bot, self)
 
-            # Clean previous channels
-            private_category = discord.utils.get(ctx.guild.categories, name=Misc.CATEGORY_CHANNEL_MAFIA)
-            # Create the category if it doesn't exist
-            if private_category is not None:
-                for channel in private_category.channels:
-                    await channel.delete()
+            # Adopt previous channels not used by other games, and fill the channel pool for the joining players
+            await self.transport.prepare_private_category(ctx)
+            await self.channel_pool.prepare(ctx, self._is_channel_used)
 
     async def join_game(self, ctx):
         """
@@ -261,36 +637,34 @@ class MafiaEngine:
         elif self._game_state.current_state == GameState.state_wait_for_players:
             await ctx.send("{} a rejoint la partie !".format(ctx.author.name))
 
-            # Create a private channel for this player
-            private_category = discord.utils.get(ctx.guild.categories, name=Misc.CATEGORY_CHANNEL_MAFIA)
-            # Create the category if it doesn't exist
-            if private_category is None:
-                overwrites = {
-                    ctx.guild.default_role: discord.PermissionOverwrite(read_messages=False)
-                }
-                await ctx.guild.create_category(Misc.CATEGORY_CHANNEL_MAFIA, overwrites=overwrites)
+            # Create the private channels category if needed
+            await self.transport.prepare_private_category(ctx)
 
             # Manage new player
-            new_player = Player(ctx)
-            await new_player.init(ctx)
-            self.players.append(new_player)
-            self.private_channels.append(new_player.get_private_channel())
-
-            ############################################################################################################
-            # TODO: DEBUG
-            if ctx.author.name == "Mystery":
-                from mafia.fakeplayer import FakePlayer
-                for i in range(1, 10):
-                    new_player = FakePlayer(ctx)
-                    await new_player.init(ctx)
-                    self.players.append(new_player)
-                    self.private_channels.append(new_player.get_private_channel())
-            # TODO: DEBUG
-            ############################################################################################################
-
+            new_player = Player(ctx.author, self.dispatcher, self.transport)
+            await new_player.init(ctx, self.channel_pool)
+            self._add_player(new_player)
         else:
             await ctx.send("{} - partie en cours, impossible de rejoindre.".format(ctx.author.name))
 
+    async def add_fake_players(self, ctx, nb_players: int) -> list:
+        """
+        Add scripted players to the lobby, their private channels are readable by the context author
+        :param ctx: context
+        :param nb_players: number of fake players to add
+        :return: list of the new FakePlayer
+        """
+        fake_players = []
+        if self._game_state is not None and self._game_state.current_state == GameState.state_wait_for_players:
+            await self.transport.prepare_private_category(ctx)
+            fake_players = [FakePlayer(ctx.author, self.dispatcher, self.transport) for _ in range(nb_players)]
+            # Create the private channels concurrently, players are added in creation order once all are ready
+            await self.transport.run_channels_operations([fake_player.init(ctx, self.channel_pool)
+                                                          for fake_player in fake_players])
+            for fake_player in fake_players:
+                self._add_player(fake_player)
+        return fake_players
+
     async def start_game(self, ctx):
         """
         To launch a game when lobby is not full
@@ -298,17 +672,32 @@ class MafiaEngine:
         """
         if self._game_state is None or self._game_state.current_state != GameState.state_wait_for_players:
             await ctx.send("{} - 'start_game': opération impossible.".format(ctx.author.name))
+        elif not self.setups.has_roles(len(self.players), self._setup_preset):
+            await ctx.send("{} - 'start_game': aucune configuration de rôles pour {} joueurs."
+                           .format(ctx.author.name, len(self.players)))
         else:
             await ctx.send("{} a démarré la partie. Bon jeu !".format(ctx.author.name))
+            self.log_event("game_started", author=ctx.author.id)
             self._game_state.select_names()
 
+    def freeze_game(self):
+        """
+        Cancel the next phase and the running phase operations: the game stays in its current state until stopped
+        """
+        if self._game_state is not None:
+            self._game_state.stop()
+
     async def stop_game(self, ctx):
         """
         Used to stop a game manually
         :param ctx: context
         """
         if self._game_state is not None:
+            # Cancel the next phase
+            self._game_state.stop()
             self._game_state = None
+            self.log_event("game_stopped", author=ctx.author.id)
+            self.close_event_log()
 
             self.send_message_everyone("{} a mis fin à la partie en cours.".format(ctx.author.name))
             await ctx.send("{} a mis fin à la partie en cours.".format(ctx.author.name))
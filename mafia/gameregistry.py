@@ -0,0 +1,275 @@
+from mafia.gameengine import MafiaEngine
+from mafia.gamestate import GameState
+from mafia.scheduler import Scheduler
+from mafia.dispatcher import OutboundDispatcher
+from mafia.misc.setups import Setups
+from mafia.transport import Transport, DiscordTransport
+from mafia.clock import Clock
+from mafia.misc.utils import Timers
+from mafia.metrics import Metrics, Gauge
+from mafia.eventlog import EventLogger
+from mafia.snapshot import SnapshotStore
+from mafia.channelpool import ChannelPool
+
+
+class GameRegistry:
+    """
+    Registry of all running games, used to host many concurrent games in a single bot process
+    """
+    SNAPSHOT_INTERVAL = 10.0
+
+    def __init__(self, bot, transport: Transport = None, clock: Clock = None, timers=Timers,
+                 event_logger: EventLogger = None, snapshot_store: SnapshotStore = None):
+        """
+        Initializer
+        :param bot: discord Bot reference, None to run games without Discord
+        :param transport: chat service transport, Discord if None
+        :param clock: clock used for every game delay, clock of the bot loop if None
+        :param timers: phases durations, see Timers
+        :param event_logger: games event logs writer, logs are written in the default directory if None
+        :param snapshot_store: games snapshots store, snapshots are written in the default directory if None
+        """
+        self._bot = bot
+        self.transport = transport if transport is not None else DiscordTransport(bot)
+        self.clock = clock if clock is not None else Clock(bot.loop)
+        self._timers = timers
+        # Metrics of all games
+        self.metrics = Metrics()
+        # Timer scheduler shared by all games
+        self.scheduler = Scheduler(self.clock)
+        # Outbound messages dispatcher shared by all games
+        self.dispatcher = OutboundDispatcher(self.transport, self.clock, self.metrics)
+        # Event logs writer shared by all games
+        self.event_logger = event_logger if event_logger is not None else EventLogger()
+        # Games snapshots, written periodically once started
+        self.snapshot_store = snapshot_store if snapshot_store is not None else SnapshotStore()
+        self._snapshot_handle = None
+        # Private channels reused by all games
+        self.channel_pool = ChannelPool(self.transport, self.clock)
+        # Role setups shared by all games
+        self.setups = Setups()
+        # Engines indexed by lobby key (guild id, lobby channel id)
+        self._engines = {}
+        # Engines indexed by the id of the private channels they own
+        self._channels = {}
+
+        self.metrics.add(Gauge("mafia_outbound_queue_depth", "Outbound messages waiting to be sent, per priority",
+                               self.dispatcher.get_queue_depths, "priority"))
+        self.metrics.add(Gauge("mafia_outbound_in_flight", "Outbound messages being sent",
+                               self.dispatcher.get_in_flight))
+        self.metrics.add(Gauge("mafia_active_games", "Created games", self.get_active_games_count))
+        self.metrics.add(Gauge("mafia_players", "Players of created games", self.get_players_count))
+        self.metrics.add(Gauge("mafia_free_private_channels", "Private channels ready to be assigned",
+                               self.channel_pool.get_free_channels_count))
+
+    @staticmethod
+    def get_lobby_key(ctx) -> tuple:
+        """
+        Get the key of a lobby from a command context
+        :param ctx: context
+        :return: tuple (guild id, lobby channel id)
+        """
+        return ctx.guild.id, ctx.channel.id
+
+    def get_engine(self, ctx) -> MafiaEngine:
+        """
+        Get the engine of the lobby where a command has been sent
+        :param ctx: context
+        :return: the lobby engine, None if no game was created in this lobby
+        """
+        return self._engines.get(self.get_lobby_key(ctx))
+
+    def get_or_create_engine(self, ctx) -> MafiaEngine:
+        """
+        Get the engine of a lobby, create it if needed
+        :param ctx: context
+        :return: the lobby engine
+        """
+        key = self.get_lobby_key(ctx)
+        engine = self._engines.get(key)
+        if engine is None:
+            engine = MafiaEngine(self._bot, self, self.scheduler, self.dispatcher, self.setups, self.transport,
+                                 self._timers, self.metrics, self.event_logger, self.channel_pool)
+            self._engines[key] = engine
+        return engine
+
+    def remove_engine(self, ctx):
+        """
+        Remove the engine of a lobby, and release all its private channels
+        :param ctx: context
+        """
+        self._remove_engine_key(self.get_lobby_key(ctx))
+
+    def _remove_engine_key(self, key: tuple):
+        engine = self._engines.pop(key, None)
+        if engine is not None:
+            engine.release_private_channels()
+            self.snapshot_store.delete(self.get_snapshot_name(key))
+
+    def _get_engine_key(self, engine: MafiaEngine) -> tuple:
+        """
+        Get the lobby key of a registered engine
+        :param engine: the engine
+        :return: the lobby key, None if the engine is not registered
+        """
+        for key, item in self._engines.items():
+            if item is engine:
+                return key
+        return None
+
+    def delete_engine_snapshot(self, engine: MafiaEngine):
+        """
+        Delete the snapshot of a finished game, so it is never resumed
+        :param engine: the engine
+        """
+        key = self._get_engine_key(engine)
+        if key is not None:
+            self.snapshot_store.delete(self.get_snapshot_name(key))
+
+    def remove_finished_engine(self, engine: MafiaEngine):
+        """
+        Remove the engine of a finished game, a new game can be created in its lobby
+        :param engine: the engine
+        """
+        key = self._get_engine_key(engine)
+        if key is not None:
+            self._remove_engine_key(key)
+
+    def get_engines(self) -> list:
+        """
+        Get all registered engines
+        :return: list of engines
+        """
+        return list(self._engines.values())
+
+    @staticmethod
+    def get_snapshot_name(key: tuple) -> str:
+        """
+        Get the name of the snapshot of a lobby
+        :param key: lobby key
+        :return: snapshot name
+        """
+        return "{}_{}".format(*key)
+
+    def snapshot_games(self):
+        """
+        Snapshot all created games, snapshots are written in background
+        """
+        for key, engine in self._engines.items():
+            if not engine.is_game_running():
+                continue
+            try:
+                snapshot = {"guild": key[0], "channel": key[1], "game": engine.to_snapshot()}
+            except Exception as exception:
+                print("Failed to snapshot game {}. Error: {}".format(key, exception))
+            else:
+                self.snapshot_store.save(self.get_snapshot_name(key), snapshot)
+
+    def _on_snapshot_timer(self):
+        self.snapshot_games()
+        self._snapshot_handle = self.clock.call_later(self.SNAPSHOT_INTERVAL, self._on_snapshot_timer)
+
+    async def resume_games(self) -> int:
+        """
+        Resume games from their snapshots
+        :return: number of resumed games
+        """
+        resumed = 0
+        for name, snapshot in self.snapshot_store.load_all().items():
+            key = (snapshot["guild"], snapshot["channel"])
+            if key in self._engines:
+                continue
+            if snapshot["game"]["state"]["state"] == GameState.state_game_over.identifier:
+                # The result was already announced, nothing to resume
+                self.snapshot_store.delete(name)
+                continue
+            engine = MafiaEngine(self._bot, self, self.scheduler, self.dispatcher, self.setups, self.transport,
+                                 self._timers, self.metrics, self.event_logger, self.channel_pool)
+            try:
+                await engine.restore_snapshot(snapshot["game"], key[0])
+            except Exception as exception:
+                print("Failed to resume game {}. Error: {}".format(name, exception))
+                self.unregister_channels(engine)
+                engine.freeze_game()
+                self.snapshot_store.delete(name)
+            else:
+                self._engines[key] = engine
+                resumed += 1
+        return resumed
+
+    async def start_snapshots(self):
+        """
+        Resume games from their snapshots, then snapshot games periodically. Does nothing if already started.
+        """
+        if self._snapshot_handle is None:
+            resumed = await self.resume_games()
+            if resumed > 0:
+                print("{} game(s) resumed".format(resumed))
+            self._snapshot_handle = self.clock.call_later(self.SNAPSHOT_INTERVAL, self._on_snapshot_timer)
+
+    def stop_snapshots(self):
+        if self._snapshot_handle is not None:
+            self._snapshot_handle.cancel()
+            self._snapshot_handle = None
+
+    def get_active_games_count(self) -> int:
+        """
+        Get the number of created games, from lobby to game over excluded
+        :return: number of games
+        """
+        return sum(1 for engine in self._engines.values() if engine.is_game_running())
+
+    def get_players_count(self) -> int:
+        """
+        Get the number of players of all created games
+        :return: number of players
+        """
+        return sum(len(engine.players) for engine in self._engines.values() if engine.is_game_running())
+
+    def register_channel(self, channel, engine: MafiaEngine):
+        """
+        Route all messages of a private channel to an engine
+        :param channel: the private channel
+        :param engine: the engine owning the channel
+        """
+        self._channels[channel.id] = engine
+
+    def unregister_channels(self, engine: MafiaEngine):
+        """
+        Stop routing messages of all channels owned by an engine
+        :param engine: the engine
+        """
+        for channel in engine.private_channels:
+            if self._channels.get(channel.id) is engine:
+                del self._channels[channel.id]
+
+    def is_channel_registered(self, channel_id: int) -> bool:
+        """
+        Check if a channel is owned by a game
+        :param channel_id: channel id
+        :return: True if a game owns the channel
+        """
+        return channel_id in self._channels
+
+    async def manage_message(self, message) -> bool:
+        """
+        Manage a message if it has been sent in a game private channel
+        :param message: the message
+        :return: True if the message belongs to a game
+        """
+        engine = self._channels.get(message.channel.id)
+        if engine is None:
+            return False
+        # Delete message
+        await self.transport.delete_message(message)
+        # Manage message depending on game state
+        engine.manage_message(message)
+        return True
+
+    def get_engine_from_channel(self, channel_id: int) -> MafiaEngine:
+        """
+        Get the engine owning a private channel
+        :param channel_id: channel id
+        :return: the engine, None if the channel is not owned by a game
+        """
+        return self._channels.get(channel_id)
@@ -1,60 +1,8 @@
-import discord
-import random
-import time
-import names
-import re
-import math
-
 import asyncio
 from statemachine import StateMachine, State
-from threading import Thread
-from mafia.misc.utils import Misc, Timers, Alignment
-
-
-class DelayedOperation(Thread):
-    TIME_MESSAGE_BEFORE_END = 10
-    MSG_TEMPLATE = "*{}: {} secondes restantes...*"
-
-    def __init__(self, timer, operation, title: str = None, send_message_fnc=None):
-        """
-        Initializer
-        :param timer: a duration before operation, in seconds
-        :param operation: a function to execute after the timer
-        :param title: string displayed as timer name
-        :param send_message_fnc: function used to send a message to everyone
-        """
-        super().__init__()
-        self._timer = timer
-        self._operation = operation
-        self._title = title
-        self._send_message_fnc = send_message_fnc
-
-        self._disabled = False
-
-    def run(self):
-        """
-        Run thread
-        """
-        if self._title is not None and \
-                self._send_message_fnc is not None and \
-                self._timer < self.TIME_MESSAGE_BEFORE_END:
-            self._send_message_fnc(self.MSG_TEMPLATE.format(self._title, int(self._timer)))
-        init_time = time.time()
-        while time.time() - init_time < self._timer and not self._disabled:
-            time.sleep(1.0)
-            if self._title is not None and self._send_message_fnc is not None:
-                if int(self._timer - round(time.time() - init_time)) == self.TIME_MESSAGE_BEFORE_END:
-                    self._send_message_fnc(self.MSG_TEMPLATE.format(self._title,
-                                                                    int(self._timer - round(time.time() - init_time))))
-        if not self._disabled:
-            # Execute operation
-            self._operation()
-
-    def disable(self):
-        """
-        Disable task
-        """
-        self._disabled = True
+from mafia.misc.utils import Misc, Alignment, NightActionType
+from mafia.dispatcher import Priority
+from mafia.wintracker import WinTracker
 
 
 class GameState(StateMachine):
@@ -77,6 +25,7 @@ class GameState(StateMachine):
     state_day_end = State('DayEnd')
     state_night = State("Night")
     state_night_sequence = State("NightSequence")
+    state_game_over = State("GameOver")
 
     # Transitions between states
     reset = state_wait_for_players.from_(state_wait_for_players,
@@ -98,25 +47,142 @@ class GameState(StateMachine):
 
     night = state_night.from_(state_day_end)
     night_sequence = state_night.to(state_night_sequence)
+    game_over = state_game_over.from_(state_configure_players, state_day_trial_kill, state_night_sequence)
+
+    # Phase coroutines run again when a game is resumed in these states before its next state is scheduled
+    RESUME_OPERATIONS = {
+        "state_configure_players": "_resume_configure_players_operations",
+        "state_day_trial_launch": "_on_day_trial_launch_operations",
+        "state_day_trial_defense": "_on_day_trial_defense_operations",
+        "state_day_trial_verdict": "_on_day_trial_verdict_operations",
+        "state_day_trial_kill": "_on_day_trial_kill_operation",
+        "state_day_end": "_on_day_end_operations",
+        "state_night": "_on_night_operations",
+        "state_night_sequence": "_on_night_sequence_operations"
+    }
+
+    # Announcement of each game result
+    WINNER_MESSAGES = {
+        Alignment.TOWN: "**La Ville a gagné !**",
+        Alignment.MAFIA: "**La Mafia a gagné !**",
+        Alignment.TRIAD: "**La Triade a gagné !**",
+        WinTracker.DRAW: "**Match nul, personne n'a survécu.**"
+    }
 
     def __init__(self, bot, mafia_engine):
         super().__init__()
         self._bot = bot
         self._mafia_engine = mafia_engine
-        self._loop = asyncio.get_event_loop()
+        self._scheduler = mafia_engine.scheduler
+        self._clock = self._scheduler.clock
+        self._loop = self._clock.get_loop()
+        self._timers = mafia_engine.timers
+        self._metrics = mafia_engine.metrics
+        self._state_start_time = self._clock.time()
         self._current_day = 0
         self._next_state = None
+        self._next_transition = None
+        self._next_title = None
+        self._operation = None
 
     def _send_message(self, message):
         channel = self._bot.get_channel(775453457708482622)
         asyncio.run_coroutine_threadsafe(channel.send(message), self._loop)
 
+    def _start_operation(self, operation):
+        """
+        Run a phase coroutine on the event loop
+        :param operation: the coroutine to run
+        """
+        self._operation = self._loop.create_task(operation)
+        self._operation.add_done_callback(self._on_operation_done)
+
+    @staticmethod
+    def _on_operation_done(task):
+        """
+        Called when a phase coroutine is over
+        :param task: the finished task
+        """
+        if not task.cancelled() and task.exception() is not None:
+            print("Phase operation failed. Error: {}".format(task.exception()))
+
+    def stop(self):
+        """
+        Stop the game: cancel the next state and the running phase coroutine
+        """
+        self.disable_next_state()
+        if self._operation is not None:
+            self._operation.cancel()
+
+    def _send_countdown(self, message):
+        """
+        Send a timer countdown message to everyone
+        :param message: the countdown message
+        """
+        self._mafia_engine.send_message_everyone(message, Priority.TIMER)
+
+    def _schedule_next_state(self, timer, transition: str, title: str = None):
+        """
+        Schedule the transition to the next state
+        :param timer: a duration before the transition, in seconds
+        :param transition: name of the transition
+        :param title: string displayed as timer name, a countdown message is sent when title is set
+        """
+        self._next_transition = transition
+        self._next_title = title
+        self._next_state = self._scheduler.schedule(timer, getattr(self, transition), title,
+                                                    self._send_countdown if title is not None else None)
+
+    def to_snapshot(self) -> dict:
+        """
+        Get the state of the game, remaining time of the next state included
+        :return: dict, JSON serializable
+        """
+        next_state = None
+        if self._next_state is not None and self._next_state.is_pending():
+            next_state = {
+                "transition": self._next_transition,
+                "title": self._next_title,
+                "remaining": self._next_state.get_remaining_time()
+            }
+        return {"state": self.current_state.identifier, "day": self._current_day, "next_state": next_state}
+
+    def restore_snapshot(self, snapshot: dict):
+        """
+        Set the state of the game without running transitions, and resume its timer or phase coroutine
+        :param snapshot: dict created by to_snapshot
+        """
+        self.current_state_value = snapshot["state"]
+        self._current_day = snapshot["day"]
+        self._state_start_time = self._clock.time()
+        next_state = snapshot["next_state"]
+        if next_state is not None:
+            self._schedule_next_state(next_state["remaining"], next_state["transition"], next_state["title"])
+        elif snapshot["state"] in self.RESUME_OPERATIONS:
+            # The phase coroutine was running, run it again
+            self._start_operation(getattr(self, self.RESUME_OPERATIONS[snapshot["state"]])())
+
     def disable_next_state(self):
         """
         Used to disable configured next state
         """
         if self._next_state is not None:
-            self._next_state.disable()
+            self._next_state.cancel()
+
+    def on_exit_state(self, state):
+        """
+        Called when a state is left, account its duration
+        :param state: the left state
+        """
+        self._metrics.phase_duration.observe(state.identifier, self._clock.time() - self._state_start_time)
+
+    def on_enter_state(self, state):
+        """
+        Called when a state is set
+        :param state: the new state
+        """
+        self._state_start_time = self._clock.time()
+        self._mafia_engine.log_event("state", state=state.identifier, day=self._current_day)
 
     def on_reset(self):
         """
@@ -132,33 +198,46 @@ class GameState(StateMachine):
         self._mafia_engine.send_message_everyone(Misc.STATES_STRING_SEPARATOR)
         self._mafia_engine.send_message_everyone("Lancement de la partie. "
                                                  "Configurez un pseudo personnalisé avec la commande '-VOTRE_PSEUDO'.")
-        self._next_state = DelayedOperation(Timers.TIMER_SELECT_NICKNAME,
-                                            self.configure_players,
-                                            "Choix des pseudos",
-                                            self._mafia_engine.send_message_everyone)
-        self._next_state.start()
+        self._schedule_next_state(self._timers.TIMER_SELECT_NICKNAME, "configure_players", "Choix des pseudos")
 
-    def _on_configure_players_operations(self):
+    async def _on_configure_players_operations(self):
         """
-        Function to configure players with precise timing. Include sleeps, must be threaded !
+        Coroutine to configure players with precise timing
         """
         self._mafia_engine.send_message_everyone(Misc.STATES_STRING_SEPARATOR)
-        time.sleep(2.0)
+        await self._clock.sleep(2.0)
         self._mafia_engine.send_message_everyone("Répartition des rôles. Vous êtes...")
-        time.sleep(2.0)
+        await self._clock.sleep(2.0)
         self._mafia_engine.configure_players()
-        time.sleep(3.0)
+        await self._clock.sleep(2.0)
+        self._mafia_engine.send_players_composition()
+        if self._mafia_engine.get_winner() is not None:
+            # Composition already decided
+            self.game_over()
+            return
+        await self._clock.sleep(3.0)
         # Go to first day !
-        next_state = DelayedOperation(3.0, self.day_discussion)
-        next_state.start()
+        self._schedule_next_state(3.0, "day_discussion")
+
+    async def _resume_configure_players_operations(self):
+        """
+        Coroutine to resume players configuration, roles are kept if they were already dispatched
+        """
+        if any(player.get_role() is None for player in self._mafia_engine.players):
+            await self._on_configure_players_operations()
+        else:
+            self._mafia_engine.send_players_composition()
+            if self._mafia_engine.get_winner() is not None:
+                self.game_over()
+            else:
+                self._schedule_next_state(3.0, "day_discussion")
 
     def on_configure_players(self):
         """
         Called when state_configure_players state is set
         """
         print("on_configure_players")
-        operation = Thread(target=self._on_configure_players_operations)
-        operation.start()
+        self._start_operation(self._on_configure_players_operations())
 
     def on_day_discussion(self):
         """
@@ -167,40 +246,34 @@ class GameState(StateMachine):
         print("on_day_discussion")
         # Increase day counter
         self._current_day += 1
+        self._mafia_engine.vote_tally.reset_skips()
         self._mafia_engine.send_message_everyone(Misc.STATES_STRING_SEPARATOR)
         self._mafia_engine.send_message_everyone("**JOUR {}** - Discussion - {} secondes"
-                                                 .format(self._current_day, Timers.TIME_DAY_CHAT))
+                                                 .format(self._current_day, self._timers.TIME_DAY_CHAT))
 
         if self._current_day == 1:
-            next_state = self.day_end
+            next_state = "day_end"
         else:
-            next_state = self.day_vote
-        self._next_state = DelayedOperation(Timers.TIME_DAY_CHAT,
-                                            next_state,
-                                            "Discussion",
-                                            self._mafia_engine.send_message_everyone)
-        self._next_state.start()
+            next_state = "day_vote"
+        self._schedule_next_state(self._timers.TIME_DAY_CHAT, next_state, "Discussion")
 
     def on_day_vote(self):
         """
         Called when state_day_vote state is set
         """
         print("on_day_vote")
+        self._mafia_engine.reset_votes()
         self._mafia_engine.send_message_everyone("*Vous pouvez désormais voter pour démarrer un procès (utilisez '-vote X' pour voter contre quelqu'un).*")
-        self._next_state = DelayedOperation(Timers.TIME_DAY_VOTE,
-                                            self.day_end,
-                                            "Vote",
-                                            self._mafia_engine.send_message_everyone)
-        self._next_state.start()
+        self._schedule_next_state(self._timers.TIME_DAY_VOTE, "day_end", "Vote")
 
-    def _on_day_trial_launch_operations(self):
+    async def _on_day_trial_launch_operations(self):
         """
-        Function to run the trial beginning
+        Coroutine to run the trial beginning
         """
         self._mafia_engine.send_message_everyone("*La ville a décidé d'envoyer {} au procès.*"
                                                  .format(self._mafia_engine.player_trial.get_nickname()))
         self._mafia_engine.send_message_everyone(Misc.STATES_STRING_SEPARATOR)
-        time.sleep(3.0)
+        await self._clock.sleep(3.0)
         self._mafia_engine.send_message_everyone("**Procès de **{}"
                                                  .format(self._mafia_engine.player_trial.get_nickname()))
         # Launch trial defense
@@ -211,60 +284,65 @@ class GameState(StateMachine):
         Called when state_day_trial_launch state is set
         """
         print("on_day_trial_launch")
-        operation = Thread(target=self._on_day_trial_launch_operations)
-        operation.start()
+        self._start_operation(self._on_day_trial_launch_operations())
 
-    def on_day_trial_defense(self):
+    async def _on_day_trial_defense_operations(self):
         """
-        Called when state_day_trial_defense state is set
+        Coroutine to run the trial defense
         """
-        time.sleep(1.0)
+        await self._clock.sleep(1.0)
         msg = "*{}, vous êtes jugé pour conspiration contre la ville. Quelle est votre défense ?* - {} secondes"\
-            .format(self._mafia_engine.player_trial.get_nickname(), Timers.TIME_DAY_TRIAL_DEFENSE)
+            .format(self._mafia_engine.player_trial.get_nickname(), self._timers.TIME_DAY_TRIAL_DEFENSE)
         self._mafia_engine.send_message_everyone(msg)
 
         # Wait and go to trial deliberation
-        self._next_state = DelayedOperation(Timers.TIME_DAY_TRIAL_DEFENSE,
-                                            self.day_trial_deliberation)
-        self._next_state.start()
+        self._schedule_next_state(self._timers.TIME_DAY_TRIAL_DEFENSE, "day_trial_deliberation")
+
+    def on_day_trial_defense(self):
+        """
+        Called when state_day_trial_defense state is set
+        """
+        print("on_day_trial_defense")
+        self._start_operation(self._on_day_trial_defense_operations())
 
     def on_day_trial_deliberation(self):
         """
         Called when state_day_trial_deliberation state is set
         """
+        self._mafia_engine.reset_trial_votes()
         msg = "*La ville doit maintenant déterminer le sort de {}. '-innocent' pour innocent, '-guilty' pour coupable, '-cancel' pour annuler.* - {} secondes"\
-            .format(self._mafia_engine.player_trial.get_nickname(), Timers.TIME_DAY_TRIAL_DELIBERATION)
+            .format(self._mafia_engine.player_trial.get_nickname(), self._timers.TIME_DAY_TRIAL_DELIBERATION)
         self._mafia_engine.send_message_everyone(msg)
 
-        self._next_state = DelayedOperation(Timers.TIME_DAY_TRIAL_DELIBERATION,
-                                            self.day_trial_verdict)
-        self._next_state.start()
+        self._schedule_next_state(self._timers.TIME_DAY_TRIAL_DELIBERATION, "day_trial_verdict")
 
-    def _on_day_trial_verdict_operations(self):
+    async def _on_day_trial_verdict_operations(self):
         """
-        Function to run the trial verdict
+        Coroutine to run the trial verdict
         """
         self._mafia_engine.send_message_everyone("*Fin des délibérations*")
         self._mafia_engine.send_message_everyone(Misc.STATES_STRING_SEPARATOR)
-        time.sleep(2.0)
+        await self._clock.sleep(2.0)
         self._mafia_engine.send_message_everyone("*Le procès est terminé. Les votes vont être comptés.*")
-        time.sleep(2.0)
+        await self._clock.sleep(2.0)
 
         # Compute the verdict
-        guilty = 0
-        innocent = 0
+        guilty = self._mafia_engine.vote_tally.get_guilty_votes()
+        innocent = self._mafia_engine.vote_tally.get_innocent_votes()
         verdict_msg = ""
-        for player in self._mafia_engine.players:
+        for player in self._mafia_engine.get_alive_players():
+            if player == self._mafia_engine.player_trial:
+                continue
             player_vote = player.get_trial_vote()
             if player_vote == Misc.TRIAL_GUILTY:
-                guilty += 1
                 verdict_msg += "*[{} a voté **Coupable**]*\n".format(player.get_nickname())
             elif player_vote == Misc.TRIAL_INNOCENT:
-                innocent += 1
                 verdict_msg += "*[{} a voté **Innocent**]*\n".format(player.get_nickname())
             else:
                 verdict_msg += "*[{} s'est abstenu]*\n".format(player.get_nickname())
 
+        self._mafia_engine.log_event("verdict", house=self._mafia_engine.player_trial.get_house().get_id(),
+                                     guilty=guilty, innocent=innocent, lynched=guilty > innocent)
         if guilty > innocent:
             # Execute the player
             verdict_msg = "*La ville a décidé de lyncher {} par un vote de {} coupable(s) contre {} innocent(s).*\n"\
@@ -278,7 +356,7 @@ class GameState(StateMachine):
                 .format(self._mafia_engine.player_trial.get_nickname(), guilty, innocent) + verdict_msg
             self._mafia_engine.send_message_everyone(verdict_msg)
             self._mafia_engine.player_trial = None
-            time.sleep(2.0)
+            await self._clock.sleep(2.0)
             # Return to day_vote
             self.day_vote()
 
@@ -287,8 +365,7 @@ class GameState(StateMachine):
         Called when state_day_trial_verdict state is set
         """
         print("on_day_trial_verdict")
-        operation = Thread(target=self._on_day_trial_verdict_operations)
-        operation.start()
+        self._start_operation(self._on_day_trial_verdict_operations())
 
     def on_day_trial_last_words(self):
         """
@@ -297,26 +374,28 @@ class GameState(StateMachine):
         print("on_day_trial_last_words")
         self._mafia_engine.send_message_everyone(Misc.STATES_STRING_SEPARATOR)
         self._mafia_engine.send_message_everyone("*Un dernier mot ?*")
-        self._next_state = DelayedOperation(Timers.TIME_DAY_TRIAL_LAST_WORDS, self.day_trial_kill)
-        self._next_state.start()
+        self._schedule_next_state(self._timers.TIME_DAY_TRIAL_LAST_WORDS, "day_trial_kill")
 
-    def _on_day_trial_kill_operation(self):
+    async def _on_day_trial_kill_operation(self):
         """
-        Function to run the trial verdict
+        Coroutine to run the trial verdict
         """
         self._mafia_engine.send_message_everyone(Misc.STATES_STRING_SEPARATOR)
         self._mafia_engine.send_message_everyone("*Exécution de {}...*".format(self._mafia_engine.player_trial.get_nickname()))
-        time.sleep(2.0)
+        await self._clock.sleep(2.0)
         self._mafia_engine.player_trial.set_dead()
         self._mafia_engine.send_message_everyone("*{} est mort.*".format(self._mafia_engine.player_trial.get_nickname()))
-        time.sleep(2.0)
+        await self._clock.sleep(2.0)
         msg = "*{} était **{}**.*".format(self._mafia_engine.player_trial.get_nickname(),
                                           self._mafia_engine.player_trial.get_role().name)
         self._mafia_engine.send_message_everyone(msg)
-        time.sleep(1.0)
+        await self._clock.sleep(1.0)
         self._mafia_engine.send_message_everyone("*## Derniers mots*\n{}".format(self._mafia_engine.player_trial.get_last_will()))
-        time.sleep(2.0)
         self._mafia_engine.player_trial = None
+        if self._mafia_engine.get_winner() is not None:
+            self.game_over()
+            return
+        await self._clock.sleep(2.0)
         self._mafia_engine.send_message_everyone(Misc.STATES_STRING_SEPARATOR)
         self.day_end()
 
@@ -325,71 +404,119 @@ class GameState(StateMachine):
         Called when state_day_trial_kill state is set
         """
         print("on_day_trial_kill")
-        operation = Thread(target=self._on_day_trial_kill_operation)
-        operation.start()
+        self._start_operation(self._on_day_trial_kill_operation())
 
-    def _on_day_end_operations(self):
+    async def _on_day_end_operations(self):
         """
-        Function to run the end of the day
+        Coroutine to run the end of the day
         """
         self._mafia_engine.send_message_everyone("*Fin de la journée, revoyons-nous demain.*")
-        self._next_state = DelayedOperation(Timers.TIME_DAY_END, self.night)
-        self._next_state.start()
+        self._schedule_next_state(self._timers.TIME_DAY_END, "night")
 
     def on_day_end(self):
         """
         Called when state_day_end state is set
         """
         print("on_day_end")
-        operation = Thread(target=self._on_day_end_operations)
-        operation.start()
+        self._start_operation(self._on_day_end_operations())
 
-    def _on_night_operations(self):
+    async def _on_night_operations(self):
         """
-        Function to run the night
+        Coroutine to run the night
         """
         self._mafia_engine.send_message_everyone(Misc.STATES_STRING_SEPARATOR)
         self._mafia_engine.send_message_everyone("**NUIT {}** - {} secondes"
-                                                 .format(self._current_day, Timers.TIME_NIGHT))
+                                                 .format(self._current_day, self._timers.TIME_NIGHT))
         for player in self._mafia_engine.players:
             if player.get_role().alignment == Alignment.MAFIA:
                 # Display he can speak to the mafia
                 player.send_message_to_player("*Vous pouvez discuter avec les autres membres de la Mafia.*")
+            if not player.is_player_alive() or not player.can_use_night_action():
+                continue
+            night_action = player.get_role().night_action
+            if night_action == NightActionType.KILL and player.get_role().faction is not None:
+                player.send_message_to_player("*Choisissez la cible de votre faction avec la commande '-target X', "
+                                              "ou proposez-en une avec '-suggest X'.*")
+            elif night_action == NightActionType.KILL:
+                player.send_message_to_player("*Choisissez votre cible avec la commande '-target X'.*")
+            elif night_action == NightActionType.PROTECT and player.get_role().night_action_self:
+                player.send_message_to_player("*Vous pouvez porter votre gilet pare-balles avec la commande '-vest'.*")
+            if night_action is not None:
+                player.send_message_to_player("*Utilisez '-skip' si vous ne souhaitez rien faire, la nuit se termine "
+                                              "dès que tout le monde a agi.*")
 
         # Wait and go to night resolution !
-        self._next_state = DelayedOperation(Timers.TIME_NIGHT,
-                                            self.night_sequence,
-                                            "Nuit",
-                                            self._mafia_engine.send_message_everyone)
-        self._next_state.start()
+        self._schedule_next_state(self._timers.TIME_NIGHT, "night_sequence", "Nuit")
 
     def on_night(self):
         """
         Called when state_night state is set
         """
         print("on_night")
-        operation = Thread(target=self._on_night_operations)
-        operation.start()
+        # Forget last night before any night command is accepted
+        self._mafia_engine.night_resolver.reset()
+        self._start_operation(self._on_night_operations())
 
-    def _on_night_sequence_operations(self):
+    async def _on_night_sequence_operations(self):
         """
-        Function to run the night sequence operations
+        Coroutine to run the night sequence operations
         """
         self._mafia_engine.send_message_everyone("*Fin de la nuit...*")
         self._mafia_engine.send_message_everyone(Misc.STATES_STRING_SEPARATOR)
         self._mafia_engine.send_message_everyone("**Que s'est-il passé pendant la nuit ?**")
 
-        # TODO...
-        self._next_state = DelayedOperation(3.0, self.day_discussion)
-        self._next_state.start()
+        # Resolve all night actions at once, then announce the outcome
+        result = self._mafia_engine.night_resolver.resolve()
+        for player, message in result.notifications:
+            player.send_message_to_player(message)
+        if not result.deaths:
+            self._mafia_engine.send_message_everyone("*Personne n'est mort cette nuit.*")
+        for player, killer in result.deaths:
+            player.set_dead()
+            msg = "*{} a été retrouvé mort cette nuit. Son rôle : **{}**.*\n*## Derniers mots*\n{}"\
+                .format(player.get_nickname(), player.get_role().name, player.get_last_will())
+            if killer.get_death_note():
+                msg += "\n*## Death note*\n{}".format(killer.get_death_note())
+            self._mafia_engine.send_message_everyone(msg)
+        if self._mafia_engine.get_winner() is not None:
+            self.game_over()
+        else:
+            self._schedule_next_state(3.0, "day_discussion")
 
     def on_night_sequence(self):
         """
         Called when state_night_sequence state is set
         """
         print("on_night_sequence")
-        operation = Thread(target=self._on_night_sequence_operations)
-        operation.start()
+        self._start_operation(self._on_night_sequence_operations())
+
+    async def _on_game_over_operations(self):
+        """
+        Coroutine to announce the winner and reveal all roles
+        """
+        winner = self._mafia_engine.get_winner()
+        self._mafia_engine.log_event("game_over", winner=winner, day=self._current_day)
+        self._mafia_engine.send_message_everyone(Misc.STATES_STRING_SEPARATOR)
+        self._mafia_engine.send_message_everyone("**FIN DE LA PARTIE**")
+        await self._clock.sleep(2.0)
+        self._mafia_engine.send_message_everyone(self.WINNER_MESSAGES[winner])
+        roles = ""
+        for player in self._mafia_engine.players:
+            status = "" if player.is_player_alive() else " (Mort)"
+            roles += "*{} : **{}**{}*\n".format(player.get_display_name(), player.get_role().name, status)
+        self._mafia_engine.send_message_everyone("*Rôles de la partie :*\n{}".format(roles))
+        self._mafia_engine.close_event_log()
+        # Leave time to read the result, then free the lobby
+        await self._clock.sleep(self._timers.TIME_GAME_OVER)
+        self._mafia_engine.finish_game()
+
+    def on_game_over(self):
+        """
+        Called when state_game_over state is set
+        """
+        print("on_game_over")
+        self._mafia_engine.on_game_over()
+        self._start_operation(self._on_game_over_operations())
 
     def get_current_day(self) -> int:
         """
@@ -4,6 +4,8 @@ class House:
     """
     A house where people can live, sleep and go to night to perform some activities
     """
+    __slots__ = ("_id",)
+
     def __init__(self, house_id: int):
         """
         Initializer
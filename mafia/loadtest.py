@@ -0,0 +1,350 @@
+import argparse
+import asyncio
+import random
+import re
+import tempfile
+import time
+from mafia.clock import Clock, VirtualClock
+from mafia.gameregistry import GameRegistry
+from mafia.gamestate import GameState
+from mafia.transport import MemoryTransport, MemoryMessage, DiscordTransport
+from mafia.misc.utils import Timers
+from mafia.eventlog import EventLogger
+
+
+class LoadTimers(Timers):
+    """
+    Short phases, to go through every phase of several days quickly
+    """
+    TIMER_SELECT_NICKNAME = 3
+    TIME_DAY_CHAT = 15
+    TIME_DAY_VOTE = 20
+    TIME_DAY_TRIAL_DEFENSE = 10
+    TIME_DAY_TRIAL_DELIBERATION = 10
+    TIME_DAY_TRIAL_LAST_WORDS = 5
+    TIME_DAY_END = 3
+    TIME_NIGHT = 15
+
+
+class LoadTransport(MemoryTransport):
+    """
+    In-memory transport measuring the delay between a message received by the engine and its delivery to players.
+    Measured messages carry a token, found back in the content of sent messages.
+    """
+    TOKEN_TEMPLATE = "[load:{}]"
+    TOKEN_PATTERN = re.compile(r"\[load:(\d+)\]")
+
+    def __init__(self, clock: Clock, send_delay: float = 0.0, rate_limit: tuple = None):
+        """
+        Initializer
+        :param clock: clock used to measure latencies
+        :param send_delay: simulated duration of a send request, in seconds
+        :param rate_limit: simulated rate limit of a channel, see Transport.ROUTE_RATE_LIMIT
+        """
+        super().__init__()
+        self._clock = clock
+        self._send_delay = send_delay
+        self.ROUTE_RATE_LIMIT = rate_limit
+        # Reception time of measured messages, indexed by token id
+        self._inbound_times = {}
+        self.latencies = []
+
+    def create_token(self) -> str:
+        """
+        Create the token of a measured message, received now
+        :return: the token, to add to the message content
+        """
+        token_id = self.next_id()
+        self._inbound_times[token_id] = self._clock.time()
+        return self.TOKEN_TEMPLATE.format(token_id)
+
+    async def send(self, channel, content: str = None, embed=None):
+        if self._send_delay > 0:
+            await self._clock.sleep(self._send_delay)
+        self.sent_messages += 1
+        if content is not None:
+            now = self._clock.time()
+            for token_id in self.TOKEN_PATTERN.findall(content):
+                inbound_time = self._inbound_times.get(int(token_id))
+                if inbound_time is not None:
+                    self.latencies.append(now - inbound_time)
+        # Sent messages are not kept, memory would grow with the load
+        return MemoryMessage(self.next_id(), self.bot_author, channel, content, embed)
+
+
+class LoadGame:
+    """
+    Game played by scripted FakePlayers sending a realistic mix of messages: chat, votes, private messages,
+    trial votes and night chat
+    """
+
+    def __init__(self, registry: GameRegistry, nb_players: int, rate: float, days: int, rng: random.Random,
+                 name: str = "load", preset: str = None):
+        """
+        Initializer
+        :param registry: registry hosting the game, using a LoadTransport
+        :param nb_players: number of fake players
+        :param rate: messages sent by each alive player, per second
+        :param days: number of played days, the game is stopped at the beginning of the next one
+        :param rng: random generator of the players behavior
+        :param name: name of the simulated guild
+        :param preset: name of the role setup preset, default preset if None
+        """
+        self._registry = registry
+        self._transport = registry.transport
+        self._clock = registry.clock
+        self._nb_players = nb_players
+        self._rate = rate
+        self._days = days
+        self._rng = rng
+        self._preset = preset
+        self._guild = self._transport.create_guild(name)
+        self._lobby = self._transport.create_channel(self._guild, "lobby")
+        self._author = self._transport.create_author("{}_host".format(name))
+        self.engine = None
+        self._day = 0
+        self._scapegoat = None
+
+        self._actions = {
+            GameState.state_day_discussion: self._day_discussion_action,
+            GameState.state_day_vote: self._day_vote_action,
+            GameState.state_day_trial_defense: self._trial_defense_action,
+            GameState.state_day_trial_deliberation: self._trial_deliberation_action,
+            GameState.state_day_trial_last_words: self._chat,
+            GameState.state_night: self._night_action
+        }
+
+        # Inbound messages statistics
+        self.inbound_messages = 0
+        self.inbound_time = 0.0
+
+    async def _send(self, player, content: str, measured: bool = False):
+        """
+        Send a message from a player in its private channel
+        :param player: the player
+        :param content: content of the message
+        :param measured: True to measure the delivery latency of the message
+        """
+        if measured:
+            content = "{} {}".format(content, self._transport.create_token())
+        message = self._transport.create_message(self._author, player.get_private_channel(), content)
+        start_time = time.perf_counter()
+        await self._registry.manage_message(message)
+        self.inbound_time += time.perf_counter() - start_time
+        self.inbound_messages += 1
+
+    def _get_other_player(self, player):
+        others = [item for item in self.engine.get_alive_players() if item != player]
+        return self._rng.choice(others) if others else None
+
+    async def _chat(self, player):
+        await self._send(player, "Discussion", measured=True)
+
+    async def _private_message(self, player):
+        target = self._get_other_player(player)
+        if target is not None:
+            await self._send(player, "-pm {} Message privé".format(target.get_house().get_id()), measured=True)
+
+    async def _day_discussion_action(self, player):
+        if self._rng.random() < 0.8:
+            await self._chat(player)
+        else:
+            await self._private_message(player)
+
+    async def _day_vote_action(self, player):
+        draw = self._rng.random()
+        if draw < 0.5:
+            await self._chat(player)
+        elif draw < 0.9:
+            # Most votes go to the scapegoat of the day, a trial ends up being launched
+            target = self._scapegoat if self._rng.random() < 0.7 else self._get_other_player(player)
+            if target is not None and target != player and target.is_player_alive():
+                await self._send(player, "-vote {}".format(target.get_house().get_id()))
+        else:
+            await self._private_message(player)
+
+    async def _trial_defense_action(self, player):
+        # Only the accused player speaks to the town
+        if self.engine.player_trial is not None and self._rng.random() < 0.5:
+            player = self.engine.player_trial
+        await self._chat(player)
+
+    async def _trial_deliberation_action(self, player):
+        if self._rng.random() < 0.6:
+            await self._send(player, "-guilty" if self._rng.random() < 0.6 else "-innocent")
+        else:
+            await self._chat(player)
+
+    async def _night_action(self, player):
+        mafia_players = [item for item in self.engine.mafia_players if item.is_player_alive()]
+        draw = self._rng.random()
+        if mafia_players and draw < 0.6:
+            # Mafia discussion, relayed to the mafia
+            await self._chat(self._rng.choice(mafia_players))
+        elif mafia_players and draw < 0.8:
+            # Mafia choosing or suggesting the target of the night
+            killer = self._rng.choice(mafia_players)
+            target = self._get_other_player(killer)
+            if target is not None:
+                cmd = "-target" if draw < 0.75 else "-suggest"
+                await self._send(killer, "{} {}".format(cmd, target.get_house().get_id()))
+        elif draw < 0.85:
+            await self._send(player, "-vest")
+        elif draw < 0.9:
+            await self._send(player, "-skip")
+        else:
+            # Town players talking at night, not relayed
+            await self._send(player, "Discussion")
+
+    def _on_state_change(self, state):
+        if state == GameState.state_day_discussion:
+            self._day += 1
+            alive_players = self.engine.get_alive_players()
+            self._scapegoat = self._rng.choice(alive_players) if alive_players else None
+
+    async def run(self):
+        """
+        Play the game
+        """
+        ctx = self._transport.create_context(self._author, self._guild, self._lobby, "$create_game")
+        self.engine = self._registry.get_or_create_engine(ctx)
+        # Roles and houses are drawn from the load test seed too
+        await self.engine.create_game(ctx, self._preset, self._rng.randrange(2 ** 32))
+        await self.engine.add_fake_players(ctx, self._nb_players)
+        await self.engine.start_game(ctx)
+
+        previous_state = None
+        while True:
+            state = self.engine.get_game_state()
+            if state != previous_state:
+                self._on_state_change(state)
+                previous_state = state
+                if state == GameState.state_players_nicknames:
+                    for i, player in enumerate(self.engine.players):
+                        await self._send(player, "-Joueur {}".format(i))
+            if state is None or state == GameState.state_game_over or self._day > self._days:
+                break
+
+            alive_players = self.engine.get_alive_players()
+            action = self._actions.get(state)
+            if action is not None and alive_players:
+                await action(self._rng.choice(alive_players))
+            # Each alive player sends `rate` messages per second
+            await self._clock.sleep(1.0 / (self._rate * max(1, len(alive_players))))
+
+        await self.engine.stop_game(ctx)
+        self._registry.remove_engine(ctx)
+
+
+def percentile(values: list, percent: float) -> float:
+    """
+    Get a percentile of values, nearest rank method
+    :param values: sorted list of values
+    :param percent: the percentile, between 0 and 100
+    :return: the percentile value, 0.0 if there is no value
+    """
+    if not values:
+        return 0.0
+    rank = max(1, int(round(percent / 100.0 * len(values) + 0.5)))
+    return values[min(rank, len(values)) - 1]
+
+
+async def run_load_test(nb_games: int, nb_players: int, rate: float, days: int, seed: int = None,
+                        clock: Clock = None, send_delay: float = 0.0, rate_limit: tuple = None,
+                        event_logger: EventLogger = None, preset: str = None) -> dict:
+    """
+    Run concurrent games of fake players
+    :param nb_games: number of concurrent games
+    :param nb_players: number of fake players per game
+    :param rate: messages sent by each alive player, per second
+    :param days: number of played days
+    :param seed: seed of the players behavior and of the games, random if None
+    :param clock: clock used for every game delay, clock of the running loop if None
+    :param send_delay: simulated duration of a send request, in seconds
+    :param rate_limit: simulated rate limit of a channel, see Transport.ROUTE_RATE_LIMIT
+    :param event_logger: games event logs writer, logs are written in the default directory if None
+    :param preset: name of the role setup preset of the games, default preset if None
+    :return: dict of statistics
+    """
+    clock = clock if clock is not None else Clock(asyncio.get_running_loop())
+    transport = LoadTransport(clock, send_delay, rate_limit)
+    registry = GameRegistry(None, transport, clock, LoadTimers, event_logger)
+    rng = random.Random(seed)
+    games = [LoadGame(registry, nb_players, rate, days, random.Random(rng.random()), "load_{}".format(i),
+                      preset)
+             for i in range(nb_games)]
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*[game.run() for game in games])
+    # Messages still queued are part of the load, their latencies are measured too
+    await registry.dispatcher.drain()
+    duration = time.perf_counter() - start_time
+    await registry.channel_pool.close()
+
+    inbound_messages = sum(game.inbound_messages for game in games)
+    inbound_time = sum(game.inbound_time for game in games)
+    latencies = sorted(transport.latencies)
+    return {
+        "games": nb_games,
+        "players": nb_players,
+        "duration": duration,
+        "inbound_messages": inbound_messages,
+        "inbound_messages_per_second": inbound_messages / duration,
+        "inbound_capacity": inbound_messages / inbound_time if inbound_time > 0 else 0.0,
+        "outbound_messages": transport.sent_messages,
+        "outbound_messages_per_second": transport.sent_messages / duration,
+        "deliveries": len(latencies),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p90": percentile(latencies, 90),
+        "latency_p99": percentile(latencies, 99),
+        "latency_max": latencies[-1] if latencies else 0.0,
+        "dispatcher": registry.dispatcher.get_stats()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the engine with concurrent games of scripted fake players")
+    parser.add_argument("--games", type=int, default=4, help="number of concurrent games")
+    parser.add_argument("--players", type=int, default=15, help="number of fake players per game")
+    parser.add_argument("--rate", type=float, default=0.5, help="messages sent by each alive player, per second")
+    parser.add_argument("--days", type=int, default=2, help="number of played days")
+    parser.add_argument("--seed", type=int, help="seed of the players behavior and of the games")
+    parser.add_argument("--send-delay", type=float, default=0.0,
+                        help="simulated duration of a send request, in seconds")
+    parser.add_argument("--discord-rate-limit", action="store_true",
+                        help="apply the Discord rate limit of channels")
+    parser.add_argument("--virtual", action="store_true",
+                        help="run game delays on a virtual clock, latencies only include simulated delays")
+    parser.add_argument("--log-dir", help="directory of the games event logs, logs are discarded if not set")
+    parser.add_argument("--preset", help="role setup preset of the games, default preset if not set")
+    args = parser.parse_args()
+
+    rate_limit = DiscordTransport.ROUTE_RATE_LIMIT if args.discord_rate_limit else None
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        event_logger = EventLogger(args.log_dir or temporary_directory)
+        if args.virtual:
+            clock = VirtualClock()
+            try:
+                stats = clock.run(run_load_test(args.games, args.players, args.rate, args.days, args.seed, clock,
+                                                args.send_delay, rate_limit, event_logger, args.preset))
+            finally:
+                clock.close()
+        else:
+            stats = asyncio.run(run_load_test(args.games, args.players, args.rate, args.days, args.seed,
+                                              send_delay=args.send_delay, rate_limit=rate_limit,
+                                              event_logger=event_logger, preset=args.preset))
+        event_logger.close()
+
+    print("{games} games of {players} players in {duration:.1f} s".format(**stats))
+    print("Inbound: {inbound_messages} messages, {inbound_messages_per_second:.1f} messages/s "
+          "(engine capacity: {inbound_capacity:.0f} messages/s)".format(**stats))
+    print("Outbound: {outbound_messages} messages, {outbound_messages_per_second:.1f} messages/s".format(**stats))
+    print("Delivery latency over {deliveries} deliveries: p50 {latency_p50:.3f} s, p90 {latency_p90:.3f} s, "
+          "p99 {latency_p99:.3f} s, max {latency_max:.3f} s".format(**stats))
+    for priority, priority_stats in stats["dispatcher"].items():
+        print("  {}: {sent} sent, {failed} failed, average queue latency {latency_avg:.3f} s"
+              .format(priority, **priority_stats))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+import asyncio
+import bisect
+
+
+class _Metric:
+    """
+    Metric with an optional label, rendered in Prometheus text format
+    """
+    TYPE = None
+
+    def __init__(self, name: str, description: str, label: str = None):
+        """
+        Initializer
+        :param name: metric name
+        :param description: help text of the metric
+        :param label: name of the label splitting the metric values, None for a single value
+        """
+        self.name = name
+        self.description = description
+        self.label = label
+
+    def _format_labels(self, label_value, extra: str = None) -> str:
+        labels = []
+        if self.label is not None:
+            value = str(label_value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+            labels.append("{}=\"{}\"".format(self.label, value))
+        if extra is not None:
+            labels.append(extra)
+        return "{{{}}}".format(",".join(labels)) if labels else ""
+
+    def render_samples(self) -> list:
+        """
+        Get the samples of the metric
+        :return: list of lines
+        """
+        raise NotImplementedError()
+
+    def render(self) -> str:
+        lines = ["# HELP {} {}".format(self.name, self.description), "# TYPE {} {}".format(self.name, self.TYPE)]
+        lines += self.render_samples()
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """
+    Value only increasing, like a number of received messages
+    """
+    TYPE = "counter"
+
+    def __init__(self, name: str, description: str, label: str = None):
+        super().__init__(name, description, label)
+        # Values indexed by label value
+        self._values = {}
+
+    def inc(self, label_value=None, amount: float = 1):
+        """
+        Increase the counter
+        :param label_value: value of the label, None if the metric has no label
+        :param amount: increment
+        """
+        self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def get(self, label_value=None) -> float:
+        return self._values.get(label_value, 0)
+
+    def render_samples(self) -> list:
+        return ["{}{} {}".format(self.name, self._format_labels(label_value), value)
+                for label_value, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """
+    Value read when metrics are rendered, like a queue depth
+    """
+    TYPE = "gauge"
+
+    def __init__(self, name: str, description: str, function, label: str = None):
+        """
+        Initializer
+        :param name: metric name
+        :param description: help text of the metric
+        :param function: function returning the value, or a dict of values indexed by label value if label is set
+        :param label: name of the label splitting the metric values, None for a single value
+        """
+        super().__init__(name, description, label)
+        self._function = function
+
+    def render_samples(self) -> list:
+        value = self._function()
+        if self.label is None:
+            return ["{} {}".format(self.name, value)]
+        return ["{}{} {}".format(self.name, self._format_labels(label_value), item_value)
+                for label_value, item_value in value.items()]
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values, like latencies
+    """
+    TYPE = "histogram"
+    # Latencies buckets, in seconds
+    LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                       2.5, 5.0, 10.0)
+
+    def __init__(self, name: str, description: str, label: str = None, buckets: tuple = LATENCY_BUCKETS):
+        """
+        Initializer
+        :param name: metric name
+        :param description: help text of the metric
+        :param label: name of the label splitting the metric values, None for a single value
+        :param buckets: sorted upper bounds of the buckets
+        """
+        super().__init__(name, description, label)
+        self._buckets = tuple(buckets)
+        # Lists [buckets counts, sum, count] indexed by label value
+        self._values = {}
+
+    def observe(self, label_value, value: float):
+        """
+        Add a value to the distribution
+        :param label_value: value of the label, None if the metric has no label
+        :param value: the observed value
+        """
+        item = self._values.get(label_value)
+        if item is None:
+            # One more bucket for values above all bounds
+            item = [[0] * (len(self._buckets) + 1), 0.0, 0]
+            self._values[label_value] = item
+        item[0][bisect.bisect_left(self._buckets, value)] += 1
+        item[1] += value
+        item[2] += 1
+
+    def get_count(self, label_value=None) -> int:
+        item = self._values.get(label_value)
+        return item[2] if item is not None else 0
+
+    def render_samples(self) -> list:
+        lines = []
+        for label_value, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self._buckets, counts):
+                cumulative += bucket_count
+                lines.append("{}_bucket{} {}".format(self.name, self._format_labels(label_value,
+                                                                                     "le=\"{}\"".format(bound)),
+                                                     cumulative))
+            lines.append("{}_bucket{} {}".format(self.name, self._format_labels(label_value, "le=\"+Inf\""), count))
+            lines.append("{}_sum{} {}".format(self.name, self._format_labels(label_value), total))
+            lines.append("{}_count{} {}".format(self.name, self._format_labels(label_value), count))
+        return lines
+
+
+class Metrics:
+    """
+    Metrics of all games hosted by the bot
+    """
+    # Phases durations buckets, in seconds
+    PHASE_BUCKETS = (1.0, 2.5, 5.0, 10.0, 15.0, 30.0, 45.0, 60.0, 90.0, 120.0, 180.0, 300.0)
+
+    def __init__(self):
+        """
+        Initializer
+        """
+        self._metrics = []
+        self.inbound_messages = self.add(Counter("mafia_inbound_messages_total",
+                                                 "Messages received in private channels, per game state", "state"))
+        self.command_duration = self.add(Histogram("mafia_command_duration_seconds",
+                                                   "Processing time of player commands", "command"))
+        self.command_errors = self.add(Counter("mafia_command_errors_total",
+                                               "Player commands which failed", "command"))
+        self.phase_duration = self.add(Histogram("mafia_phase_duration_seconds",
+                                                 "Time spent in each game phase", "phase", self.PHASE_BUCKETS))
+        self.send_latency = self.add(Histogram("mafia_outbound_latency_seconds",
+                                               "Time between an outbound message queueing and its sending",
+                                               "priority"))
+
+    def add(self, metric: _Metric) -> _Metric:
+        """
+        Add a metric to render
+        :param metric: the metric
+        :return: the metric
+        """
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        Render all metrics
+        :return: metrics in Prometheus text format
+        """
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+class MetricsServer:
+    """
+    Minimal HTTP server exposing metrics on /metrics, to be scraped by Prometheus
+    """
+    DEFAULT_HOST = "127.0.0.1"
+    DEFAULT_PORT = 9150
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, metrics: Metrics, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        """
+        Initializer
+        :param metrics: the exposed metrics
+        :param host: listened address, local only by default
+        :param port: listened port
+        """
+        self._metrics = metrics
+        self._host = host
+        self._port = port
+        self._server = None
+
+    async def start(self):
+        """
+        Start listening, does nothing if the server is already started
+        """
+        if self._server is None:
+            self._server = await asyncio.start_server(self._handle_client, self._host, self._port)
+            print("Metrics available on http://{}:{}/metrics".format(self._host, self._port))
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_client(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            # Skip headers
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", self._metrics.render().encode("utf-8")
+            else:
+                status, body = "404 Not Found", b"Not Found\n"
+            writer.write("HTTP/1.1 {}\r\nContent-Type: {}\r\nContent-Length: {}\r\nConnection: close\r\n\r\n"
+                         .format(status, self.CONTENT_TYPE, len(body)).encode("latin-1") + body)
+            await writer.drain()
+        except Exception as exception:
+            print("Failed to serve metrics. Error: {}".format(exception))
+        finally:
+            writer.close()
@@ -0,0 +1,64 @@
+import bisect
+import names
+
+
+class NameDistribution:
+    """
+    Frequency distribution of names, read once from a names package data file
+    """
+
+    def __init__(self, names_file: str):
+        """
+        Initializer
+        :param names_file: path of the distribution file: name, frequency, cumulative frequency and rank per line
+        """
+        self._names = []
+        self._cumulative = []
+        with open(names_file) as name_file:
+            for line in name_file:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                self._names.append(fields[0].capitalize())
+                self._cumulative.append(float(fields[2]))
+
+    def draw(self, rng) -> str:
+        """
+        Draw a name according to its frequency
+        :param rng: random generator used for the draw
+        :return: the name, empty if the distribution is empty
+        """
+        if not self._names:
+            return ""
+        selected = rng.random() * self._cumulative[-1]
+        index = bisect.bisect_right(self._cumulative, selected)
+        return self._names[min(index, len(self._names) - 1)]
+
+
+# Distributions indexed by names package key, loaded once per process
+_DISTRIBUTIONS = {}
+
+
+def _get_distribution(key: str) -> NameDistribution:
+    distribution = _DISTRIBUTIONS.get(key)
+    if distribution is None:
+        distribution = NameDistribution(names.FILES[key])
+        _DISTRIBUTIONS[key] = distribution
+    return distribution
+
+
+def get_random_full_name(rng) -> str:
+    """
+    Get a random full name, drawn like names.get_full_name but with the given random generator
+    :param rng: random generator, seeded to get reproducible names
+    :return: the full name
+    """
+    gender = rng.choice(("male", "female"))
+    try:
+        first_names = _get_distribution("first:{}".format(gender))
+        last_names = _get_distribution("last")
+    except (OSError, KeyError, ValueError) as exception:
+        # Data of the names package not readable, names are not reproducible anymore
+        print("Failed to load names distributions. Error: {}".format(exception))
+        return names.get_full_name(gender)
+    return "{} {}".format(first_names.draw(rng), last_names.draw(rng))
@@ -1,6 +1,32 @@
 from mafia.roles.mafia.mafioso import Mafioso
+from mafia.roles.mafia.godfather import Godfather
 from mafia.roles.town.citizen import Citizen
 
+# All available roles
+ROLE_CLASSES = [
+    Citizen,
+    Mafioso,
+    Godfather
+]
+
+# Shared role instances, with their description already built
+_ROLE_INSTANCES = {role_class: role_class() for role_class in ROLE_CLASSES}
+for _role in _ROLE_INSTANCES.values():
+    _role.get_description()
+# Role classes indexed by normalized name
+_ROLE_CLASSES_BY_NAME = {_role.name.lower(): role_class for role_class, _role in _ROLE_INSTANCES.items()}
+# List of all roles, ready to be displayed
+ROLES_LIST = "\n".join("*- {} ({})*".format(role.name, role.alignment) for role in _ROLE_INSTANCES.values())
+
+
+def normalize_role_name(role_string: str) -> str:
+    """
+    Normalize a role name typed by a player
+    :param role_string: the role name
+    :return: the normalized name
+    """
+    return role_string.strip().lower()
+
 
 def get_role_class_from_string(role_string: str):
     """
@@ -8,8 +34,18 @@ def get_role_class_from_string(role_string: str):
     :param role_string: the role
     :return: the wanted role class, None if not exist
     """
-    try:
-        return eval(role_string.capitalize())
-    except NameError:
-        # Invalid class name
-        return None
+    return _ROLE_CLASSES_BY_NAME.get(normalize_role_name(role_string))
+
+
+def get_role(role_class):
+    """
+    Get the shared instance of a role
+    :param role_class: the role class
+    :return: the role instance, shared by all players with this role
+    """
+    role = _ROLE_INSTANCES.get(role_class)
+    if role is None:
+        # Role not registered, build it once
+        role = role_class()
+        _ROLE_INSTANCES[role_class] = role
+    return role
@@ -0,0 +1,152 @@
+import json
+import os
+from mafia.misc.role_util import get_role_class_from_string, get_role
+from mafia.wintracker import WinTracker
+
+
+class SetupError(Exception):
+    """
+    Raised when a setups configuration is invalid, or when no setup matches a game
+    """
+    pass
+
+
+class Setups:
+    """
+    Role setups loaded from a configuration file: named presets, each one containing compositions for ranges of
+    players count. Compositions are validated and expanded into role lists once, when loaded.
+    """
+    DEFAULT_SETUPS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "setups.json")
+
+    def __init__(self, setups_file: str = DEFAULT_SETUPS_FILE):
+        """
+        Initializer
+        :param setups_file: path of the JSON setups configuration
+        """
+        self._setups_file = setups_file
+        self._default_preset = None
+        self._descriptions = {}
+        # Role lists indexed by preset name, then by players count
+        self._roles = {}
+        self.load()
+
+    def load(self):
+        """
+        Load, validate and expand the setups configuration file
+        """
+        with open(self._setups_file, 'r', encoding='utf-8') as setups_file:
+            config = json.load(setups_file)
+        self.load_config(config)
+
+    def load_config(self, config: dict):
+        """
+        Validate and expand a setups configuration, replacing the current one
+        :param config: setups configuration, same format as the setups file
+        """
+        presets = config.get("presets")
+        if not isinstance(presets, dict) or len(presets) == 0:
+            raise SetupError("No preset defined.")
+        default_preset = config.get("default")
+        if default_preset not in presets:
+            raise SetupError("Default preset '{}' is not defined.".format(default_preset))
+
+        descriptions = {}
+        roles = {}
+        for preset_name, preset in presets.items():
+            descriptions[preset_name] = preset.get("description", "")
+            roles[preset_name] = self._expand_preset(preset_name, preset.get("compositions", []))
+
+        # Everything is valid, use the new configuration
+        self._default_preset = default_preset
+        self._descriptions = descriptions
+        self._roles = roles
+
+    @staticmethod
+    def _expand_preset(preset_name: str, compositions: list) -> dict:
+        """
+        Validate the compositions of a preset and expand them into role lists
+        :param preset_name: name of the preset
+        :param compositions: list of compositions
+        :return: dict of role classes tuples, indexed by players count
+        """
+        roles = {}
+        for composition in compositions:
+            min_players = composition.get("min_players")
+            max_players = composition.get("max_players")
+            if not isinstance(min_players, int) or not isinstance(max_players, int) or min_players > max_players:
+                raise SetupError("Preset '{}': invalid players range {}-{}."
+                                 .format(preset_name, min_players, max_players))
+
+            fixed_roles = []
+            for role_name, count in composition.get("roles", {}).items():
+                role_class = get_role_class_from_string(role_name)
+                if role_class is None:
+                    raise SetupError("Preset '{}': unknown role '{}'.".format(preset_name, role_name))
+                if not isinstance(count, int) or count < 0:
+                    raise SetupError("Preset '{}': invalid count for role '{}'.".format(preset_name, role_name))
+                fixed_roles += [role_class] * count
+            if len(fixed_roles) > min_players:
+                raise SetupError("Preset '{}': {} roles for {} players."
+                                 .format(preset_name, len(fixed_roles), min_players))
+
+            fill_role = get_role_class_from_string(composition.get("fill", ""))
+            if fill_role is None:
+                raise SetupError("Preset '{}': unknown fill role '{}'.".format(preset_name, composition.get("fill")))
+
+            nb_fixed_hostiles = sum(1 for role_class in fixed_roles if Setups._is_hostile(role_class))
+            for nb_players in range(min_players, max_players + 1):
+                if nb_players in roles:
+                    raise SetupError("Preset '{}': several compositions for {} players."
+                                     .format(preset_name, nb_players))
+                # The game would be over as soon as roles are dispatched
+                nb_hostiles = nb_fixed_hostiles
+                if Setups._is_hostile(fill_role):
+                    nb_hostiles += nb_players - len(fixed_roles)
+                if nb_hostiles >= nb_players - nb_hostiles:
+                    raise SetupError("Preset '{}': {} hostile roles for {} players."
+                                     .format(preset_name, nb_hostiles, nb_players))
+                roles[nb_players] = tuple(fixed_roles + [fill_role] * (nb_players - len(fixed_roles)))
+        return roles
+
+    @staticmethod
+    def _is_hostile(role_class) -> bool:
+        """
+        Check if a role must eliminate the other alignments to win
+        :param role_class: the role class
+        :return: True if the role alignment is hostile
+        """
+        return get_role(role_class).alignment in WinTracker.HOSTILE_ALIGNMENTS
+
+    def get_default_preset(self) -> str:
+        return self._default_preset
+
+    def get_presets(self) -> dict:
+        """
+        Get all presets
+        :return: dict of presets descriptions, indexed by preset name
+        """
+        return self._descriptions
+
+    def has_roles(self, nb_players: int, preset: str = None) -> bool:
+        """
+        Check if a preset has a composition for a players count
+        :param nb_players: players count
+        :param preset: preset name, default preset if None
+        :return: True if roles can be dispatched
+        """
+        return nb_players in self._roles.get(preset or self._default_preset, {})
+
+    def get_roles(self, nb_players: int, preset: str = None) -> list:
+        """
+        Get the role list of a game
+        :param nb_players: players count
+        :param preset: preset name, default preset if None
+        :return: list of role classes, not shuffled
+        """
+        preset = preset or self._default_preset
+        if preset not in self._roles:
+            raise SetupError("Unknown preset '{}'.".format(preset))
+        roles = self._roles[preset].get(nb_players)
+        if roles is None:
+            raise SetupError("Preset '{}' has no composition for {} players.".format(preset, nb_players))
+        return list(roles)
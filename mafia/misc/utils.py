@@ -3,6 +3,7 @@ class Misc:
 
     STATES_STRING_SEPARATOR = "----------------------------------------"
     CATEGORY_CHANNEL_MAFIA = "Mafia Private Channels"
+    PRIVATE_CHANNEL_NAME = "mafia-prive"
     TRIAL_INNOCENT = "Innocent"
     TRIAL_GUILTY = "Guilty"
 
@@ -23,6 +24,8 @@ class Timers:
     TIME_DAY_END = 5
     #TIME_NIGHT = 45
     TIME_NIGHT = 45
+    # Time left to read the game result before the private channels are released
+    TIME_GAME_OVER = 30
 
 
 class Colors:
@@ -60,6 +63,19 @@ class Alignment:
     NEUTRAL = "Neutral"
 
 
+class Faction:
+    MAFIA = "Mafia"
+    TRIAD = "Triad"
+    CULT = "Cult"
+    MASONS = "Masons"
+
+
+class NightActionType:
+    BLOCK = "Block"
+    PROTECT = "Protect"
+    KILL = "Kill"
+
+
 class RoleCategory:
     TOWN_INVESTIGATIVE = "Town Investigative"
     TOWN_PROTECTIVE = "Town Protective"
@@ -0,0 +1,244 @@
+import random
+from mafia.factiontally import FactionTally
+from mafia.misc.utils import NightActionType
+
+
+class NightAction:
+    """
+    Night action submitted by a player
+    """
+
+    def __init__(self, player, action_type, target):
+        """
+        Initializer
+        :param player: the acting player
+        :param action_type: NightActionType of the action
+        :param target: the targeted player
+        """
+        self.player = player
+        self.action_type = action_type
+        self.target = target
+
+
+class NightResult:
+    """
+    Outcome of a night: deaths and private notifications, produced together
+    """
+
+    def __init__(self):
+        """
+        Initializer
+        """
+        # Tuples (dead player, killing player) in death order
+        self.deaths = []
+        # Tuples (player, message) of private notifications
+        self.notifications = []
+
+    def notify(self, player, message: str):
+        self.notifications.append((player, message))
+
+
+class NightResolver:
+    """
+    Collect the night actions of a game and resolve them in one pass: actions are bucketed by priority, so blocks are
+    resolved before protections, and protections before kills. Kill targets of faction members are counted in a
+    tally per faction, one member is sent to kill the faction target.
+    """
+    # Resolution order of action types
+    PRIORITIES = {
+        NightActionType.BLOCK: 0,
+        NightActionType.PROTECT: 1,
+        NightActionType.KILL: 2
+    }
+
+    def __init__(self, rng: random.Random, get_faction_players, get_alive_players):
+        """
+        Initializer
+        :param rng: random generator of the game, used to choose the faction killers
+        :param get_faction_players: function returning the players of a faction
+        :param get_alive_players: function returning the alive players
+        """
+        self._random = rng
+        self._get_faction_players = get_faction_players
+        self._get_alive_players = get_alive_players
+        # Actions indexed by acting player, in submission order
+        self._actions = {}
+        # Players choosing to do nothing this night
+        self._skips = set()
+        # Number of players able to act this night, counted once per night
+        self._actors_count = None
+        # Target tallies indexed by faction
+        self._tallies = {}
+
+    @staticmethod
+    def _is_faction_kill(action: NightAction) -> bool:
+        return action.action_type == NightActionType.KILL and action.player.get_role().faction is not None
+
+    def get_tally(self, faction) -> FactionTally:
+        """
+        Get the target tally of a faction, created if needed
+        :param faction: the faction, see Faction
+        :return: the tally
+        """
+        tally = self._tallies.get(faction)
+        if tally is None:
+            tally = FactionTally()
+            self._tallies[faction] = tally
+        return tally
+
+    def submit(self, player, target) -> NightAction:
+        """
+        Submit the night action of a player, replacing its previous one
+        :param player: the acting player, must have a role with a night action
+        :param target: the targeted player
+        :return: the action
+        """
+        # Moved at the end of the submission order
+        self._actions.pop(player, None)
+        self._skips.discard(player)
+        action = NightAction(player, player.get_role().night_action, target)
+        self._actions[player] = action
+        if self._is_faction_kill(action):
+            role = player.get_role()
+            self.get_tally(role.faction).set_target(player, target, role.faction_leader)
+        return action
+
+    def suggest(self, player, target):
+        """
+        Suggest a target to the faction of a player, the suggestion is not counted in the tally
+        :param player: the suggesting player, must belong to a faction
+        :param target: the suggested player, None to cancel the suggestion
+        """
+        self.get_tally(player.get_role().faction).set_suggestion(player, target)
+
+    def skip(self, player):
+        """
+        Record that a player does nothing this night, replacing its action
+        :param player: the player, must have a role with a night action
+        """
+        self.cancel(player)
+        self._skips.add(player)
+
+    def cancel(self, player) -> bool:
+        """
+        Cancel the night action or the skip of a player
+        :param player: the acting player
+        :return: True if the player had submitted an action or skipped
+        """
+        if player in self._skips:
+            self._skips.discard(player)
+            return True
+        action = self._actions.pop(player, None)
+        if action is None:
+            return False
+        if self._is_faction_kill(action):
+            role = player.get_role()
+            self.get_tally(role.faction).set_target(player, None, role.faction_leader)
+        return True
+
+    def get_action(self, player) -> NightAction:
+        return self._actions.get(player)
+
+    def get_skips(self) -> set:
+        """
+        Get the live view of players doing nothing this night, must not be modified
+        :return: set of players
+        """
+        return self._skips
+
+    def is_complete(self) -> bool:
+        """
+        Check if every alive player able to act this night has submitted an action or skipped
+        :return: True if no action is expected anymore
+        """
+        if self._actors_count is None:
+            self._actors_count = sum(1 for player in self._get_alive_players()
+                                     if player.get_role().night_action is not None and player.can_use_night_action())
+        return len(self._actions) + len(self._skips) >= self._actors_count
+
+    def get_actions(self) -> list:
+        """
+        Get submitted actions, in submission order
+        :return: list of NightAction
+        """
+        return list(self._actions.values())
+
+    def reset(self):
+        self._actions = {}
+        self._tallies = {}
+        self._skips = set()
+        self._actors_count = None
+
+    def _get_faction_killer(self, faction, blocked: set):
+        """
+        Choose the member sent to kill the faction target: a random killer of the faction, its leader if no other
+        killer can act
+        :param faction: the faction
+        :param blocked: players blocked this night
+        :return: the killing player, None if no member can act
+        """
+        killers = []
+        leaders = []
+        for player in self._get_faction_players(faction):
+            role = player.get_role()
+            if role.night_action == NightActionType.KILL and player.is_player_alive() and player not in blocked:
+                (leaders if role.faction_leader else killers).append(player)
+        if killers:
+            return self._random.choice(killers)
+        return leaders[0] if leaders else None
+
+    def _get_kills(self, actions: list, blocked: set) -> list:
+        """
+        Get the attacks of the night: one per faction, one per independent killer
+        :param actions: kill actions of alive players
+        :param blocked: players blocked this night
+        :return: list of tuples (attacker, target)
+        """
+        kills = []
+        for action in actions:
+            if action.player.get_role().faction is None and action.player not in blocked:
+                kills.append((action.player, action.target))
+        for faction, tally in self._tallies.items():
+            target = tally.get_consensus()
+            if target is not None:
+                killer = self._get_faction_killer(faction, blocked)
+                if killer is not None:
+                    kills.append((killer, target))
+        return kills
+
+    def resolve(self) -> NightResult:
+        """
+        Resolve all submitted actions, then forget them. Uses of limited abilities are consumed.
+        :return: the NightResult
+        """
+        buckets = [[] for _ in self.PRIORITIES]
+        for action in self._actions.values():
+            if action.player.is_player_alive():
+                buckets[self.PRIORITIES[action.action_type]].append(action)
+        result = NightResult()
+
+        blocked = set()
+        for action in buckets[self.PRIORITIES[NightActionType.BLOCK]]:
+            if action.player not in blocked:
+                blocked.add(action.target)
+                result.notify(action.target, "*Quelqu'un vous a occupé toute la nuit, vous n'avez pas pu agir.*")
+
+        protected = set()
+        for action in buckets[self.PRIORITIES[NightActionType.PROTECT]]:
+            if action.player not in blocked:
+                action.player.use_night_action()
+                protected.add(action.target)
+
+        dead = set()
+        for attacker, target in self._get_kills(buckets[self.PRIORITIES[NightActionType.KILL]], blocked):
+            if target in dead or not target.is_player_alive():
+                continue
+            if target in protected:
+                result.notify(target, "*Quelqu'un vous a attaqué cette nuit, mais vous avez survécu !*")
+                result.notify(attacker, "*Votre cible a survécu à l'attaque !*")
+            else:
+                dead.add(target)
+                result.deaths.append((target, attacker))
+                result.notify(target, "*Vous avez été tué cette nuit !*")
+        self.reset()
+        return result
@@ -0,0 +1,121 @@
+from mafia.dispatcher import OutboundDispatcher, Priority
+
+
+class ChannelOutbox:
+    """
+    Outbound buffer of a channel: messages produced within a short flush window are merged into a single message.
+    A window is sent in the order it was produced, with the priority of its most important message: priorities only
+    order the windows of different channels in the dispatcher.
+    """
+    FLUSH_DELAY = 0.5
+    MAX_MESSAGE_LENGTH = 2000
+    SEPARATOR = "\n"
+
+    def __init__(self, channel, dispatcher: OutboundDispatcher):
+        """
+        Initializer
+        :param channel: the channel where messages are sent
+        :param dispatcher: dispatcher used to send merged messages, its clock is used to flush messages
+        """
+        self._channel = channel
+        self._dispatcher = dispatcher
+        self._clock = dispatcher.clock
+        # Messages waiting for the flush, in production order. str for text messages or discord.Embed
+        self._pending = []
+        # Priority of the buffered window, the most important one of its messages
+        self._priority = None
+        self._flush_handle = None
+
+    def send(self, message: str, priority: int = Priority.PLAYER):
+        """
+        Buffer a text message
+        :param message: the message
+        :param priority: message priority, see Priority
+        """
+        self._push(message, priority)
+
+    def send_embed(self, embed, priority: int = Priority.GAME):
+        """
+        Buffer an embed message, sent after all previously buffered messages
+        :param embed: the discord.Embed to send
+        :param priority: message priority, see Priority
+        """
+        self._push(embed, priority)
+
+    def _push(self, item, priority: int):
+        self._pending.append(item)
+        if self._priority is None or priority < self._priority:
+            self._priority = priority
+        if self._flush_handle is None:
+            self._flush_handle = self._clock.call_later(self.FLUSH_DELAY, self.flush)
+            self._dispatcher.add_pending_outbox(self)
+
+    def flush(self):
+        """
+        Merge all buffered messages and queue them in the dispatcher, in production order
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+            self._dispatcher.remove_pending_outbox(self)
+        pending = self._pending
+        priority = self._priority
+        self._pending = []
+        self._priority = None
+        for content, embed in self.merge_messages(pending):
+            self._dispatcher.enqueue(self._channel, content=content, embed=embed, priority=priority)
+
+    def get_pending_count(self) -> int:
+        """
+        Get the number of messages waiting for the flush
+        :return: number of buffered messages
+        """
+        return len(self._pending)
+
+    @classmethod
+    def merge_messages(cls, messages: list) -> list:
+        """
+        Merge consecutive text messages, without exceeding the maximum message length
+        :param messages: list of str or discord.Embed
+        :return: list of tuples (content, embed) to send
+        """
+        payloads = []
+        content = None
+        for message in messages:
+            if not isinstance(message, str):
+                # Embeds are sent alone
+                if content is not None:
+                    payloads.append((content, None))
+                    content = None
+                payloads.append((None, message))
+                continue
+            for part in cls._split_message(message):
+                if content is None:
+                    content = part
+                elif len(content) + len(cls.SEPARATOR) + len(part) <= cls.MAX_MESSAGE_LENGTH:
+                    content += cls.SEPARATOR + part
+                else:
+                    payloads.append((content, None))
+                    content = part
+        if content is not None:
+            payloads.append((content, None))
+        return payloads
+
+    @classmethod
+    def _split_message(cls, message: str) -> list:
+        """
+        Split a message too long to be sent, on line breaks when possible
+        :param message: the message
+        :return: list of parts not exceeding the maximum message length
+        """
+        parts = []
+        while len(message) > cls.MAX_MESSAGE_LENGTH:
+            index = message.rfind(cls.SEPARATOR, 0, cls.MAX_MESSAGE_LENGTH)
+            if index <= 0:
+                parts.append(message[:cls.MAX_MESSAGE_LENGTH])
+                message = message[cls.MAX_MESSAGE_LENGTH:]
+            else:
+                parts.append(message[:index])
+                message = message[index + len(cls.SEPARATOR):]
+        parts.append(message)
+        return parts
@@ -1,23 +1,40 @@
-import asyncio
-import discord
 from mafia.misc.utils import Misc, Colors
 from mafia.house import House
+from mafia.outbox import ChannelOutbox
+from mafia.dispatcher import Priority
 from mafia.roles.mafia.mafioso import Mafioso
+from mafia.roles.mafia.godfather import Godfather
+from mafia.misc.role_util import get_role, get_role_class_from_string
 
 
 class Player:
     """
-    Player class
+    Player class. Players are slotted: many games run in the same process. The role is a shared instance, state of the
+    role specific to the player is kept here.
     """
-    ALLOWED_DEATH_NOTE_ROLES = [Mafioso]
+    ALLOWED_DEATH_NOTE_ROLES = (Mafioso, Godfather)
+    FAKE = False
 
-    def __init__(self, ctx):
+    __slots__ = ("_author", "_dispatcher", "_transport", "_player_channel", "_outbox", "_nickname", "_bold_nickname",
+                 "_display_name", "_role", "_house", "_last_will", "_death_note", "_alive", "_vote_id", "_trial_vote",
+                 "_death_listeners", "_vote_tally", "_night_action_uses")
+
+    def __init__(self, author, dispatcher, transport):
         """
         Initializer
+        :param author: the user playing
+        :param dispatcher: OutboundDispatcher used to send messages to the player
+        :param transport: Transport used to create the player private channel
         """
-        self._author = ctx.author
+        self._author = author
+        self._dispatcher = dispatcher
+        self._transport = transport
         self._player_channel = None
+        self._outbox = None
         self._nickname = None
+        # Rendered forms of the nickname, built when the nickname or the house changes
+        self._bold_nickname = None
+        self._display_name = None
         self._role = None
         self._house = None
         self._last_will = ""
@@ -25,60 +42,150 @@ class Player:
         self._alive = True
         self._vote_id = None
         self._trial_vote = None
+        self._death_listeners = []
+        self._vote_tally = None
+        # Remaining uses of the role night ability, None if unlimited
+        self._night_action_uses = None
 
-        self._loop = asyncio.get_event_loop()
-
-    async def init(self, ctx):
-        private_category = discord.utils.get(ctx.guild.categories, name=Misc.CATEGORY_CHANNEL_MAFIA)
-        player_channel_name = 'private_{}'.format(self._author.name).lower().replace(" ", "-")
-        overwrites = {
-            ctx.guild.default_role: discord.PermissionOverwrite(read_messages=False),
-            ctx.message.author: discord.PermissionOverwrite(read_messages=True)
-        }
-        await ctx.guild.create_text_channel(player_channel_name, category=private_category, overwrites=overwrites)
-        self._player_channel = discord.utils.get(ctx.guild.channels, name=player_channel_name)
+    async def init(self, ctx, channel_pool):
+        """
+        Get the player private channel and welcome the player
+        :param ctx: context
+        :param channel_pool: ChannelPool providing the private channel
+        """
+        self._player_channel = await channel_pool.acquire(ctx, ctx.message.author)
+        self._outbox = ChannelOutbox(self._player_channel, self._dispatcher)
 
-        await self._player_channel.send("Bienvenue de la partie {}. "
-                                        "En attente des autres joueurs...".format(self._author.name))
+        await self._transport.send(self._player_channel,
+                                   "Bienvenue de la partie {}. "
+                                   "En attente des autres joueurs...".format(self._author.name))
 
-    def send_message_to_player(self, message):
-        asyncio.run_coroutine_threadsafe(self._player_channel.send(message), self._loop)
+    def to_snapshot(self) -> dict:
+        """
+        Get the player data
+        :return: dict, JSON serializable
+        """
+        return {
+            "author": self._author.id,
+            "fake": self.FAKE,
+            "channel": self._player_channel.id,
+            "nickname": self._nickname,
+            "house": self._house.get_id() if self._house is not None else None,
+            "role": self._role.name if self._role is not None else None,
+            "alive": self._alive,
+            "last_will": self._last_will,
+            "death_note": self._death_note,
+            "vote": self._vote_id,
+            "trial_vote": self._trial_vote,
+            "night_uses": self._night_action_uses
+        }
 
-    def send_message_embed(self, title=discord.Embed.Empty,
-                           description=discord.Embed.Empty,
-                           color=Colors.DEFAULT):
-        embed = discord.Embed(title=title,
-                              description=description,
-                              colour=color)
-        asyncio.run_coroutine_threadsafe(self._player_channel.send(embed=embed), self._loop)
+    def restore_snapshot(self, snapshot: dict, channel):
+        """
+        Restore the player data, except votes which must be set once the vote tally is configured
+        :param snapshot: dict created by to_snapshot
+        :param channel: the player private channel
+        """
+        self._player_channel = channel
+        self._outbox = ChannelOutbox(channel, self._dispatcher)
+        self._nickname = snapshot["nickname"]
+        self._house = House(snapshot["house"]) if snapshot["house"] is not None else None
+        self._update_names()
+        self._role = get_role(get_role_class_from_string(snapshot["role"])) if snapshot["role"] is not None else None
+        self._alive = snapshot["alive"]
+        self._last_will = snapshot["last_will"]
+        self._death_note = snapshot["death_note"]
+        self._night_action_uses = snapshot["night_uses"]
+
+    def send_message_to_player(self, message, priority=Priority.PLAYER):
+        self._outbox.send(message, priority)
+
+    def send_message_embed(self, title=None,
+                           description=None,
+                           color=Colors.DEFAULT,
+                           priority=Priority.GAME):
+        embed = self._transport.create_embed(title=title,
+                                             description=description,
+                                             color=color)
+        self._outbox.send_embed(embed, priority)
 
     def get_id(self):
         return self._author.id
 
+    def get_author_name(self) -> str:
+        return self._author.name
+
     def set_nickname(self, nickname: str):
         """
         Configure a custom nickname for the game
         :param nickname: custom nickname
         """
         self._nickname = nickname
+        self._update_names()
 
-    def get_nickname(self) -> str:
+    def _update_names(self):
+        """
+        Render the nickname forms once, instead of formatting them for each message
+        """
         if self._nickname is None:
-            return None
-        return "**{}**".format(self._nickname)
+            self._bold_nickname = None
+            self._display_name = None
+            return
+        self._bold_nickname = "**{}**".format(self._nickname)
+        if self._house is not None:
+            self._display_name = "{} - {}".format(self._house.get_id(), self._bold_nickname)
+        else:
+            self._display_name = None
+
+    def get_nickname(self) -> str:
+        """
+        Get the nickname, in bold
+        :return: the nickname, None if not configured
+        """
+        return self._bold_nickname
+
+    def get_plain_nickname(self) -> str:
+        """
+        Get the nickname without formatting, for code blocks
+        :return: the nickname, None if not configured
+        """
+        return self._nickname
+
+    def get_display_name(self) -> str:
+        """
+        Get the house id and the nickname, as displayed in players lists and chat
+        :return: the display name, None if the nickname or the house is not configured
+        """
+        return self._display_name
 
     def get_private_channel(self):
         return self._player_channel
 
     def set_role(self, role):
-        self._role = role()
+        self._role = get_role(role)
+        self._night_action_uses = self._role.night_action_uses
         self._role.print_role(self.send_message_embed)
 
     def get_role(self):
         return self._role
 
+    def can_use_night_action(self) -> bool:
+        """
+        Check if the player can still use its role night ability
+        :return: True if the role has a night ability with remaining uses
+        """
+        return self._role.night_action is not None and self._night_action_uses != 0
+
+    def use_night_action(self):
+        """
+        Consume one use of the role night ability
+        """
+        if self._night_action_uses is not None:
+            self._night_action_uses -= 1
+
     def set_house(self, house_id):
         self._house = House(house_id)
+        self._update_names()
 
     def get_house(self) -> House:
         return self._house
@@ -90,7 +197,8 @@ class Player:
         return self._last_will
 
     def set_death_note(self, death_note: str):
-        if self._role in self.ALLOWED_DEATH_NOTE_ROLES:
+        # Roles are shared instances, check their class
+        if isinstance(self._role, self.ALLOWED_DEATH_NOTE_ROLES):
             self._death_note = death_note
         else:
             self.send_message_to_player("*## Vous ne pouvez pas configurer de death note.*")
@@ -102,22 +210,43 @@ class Player:
         return self._alive
 
     def set_dead(self):
+        if not self._alive:
+            return
         self._alive = False
+        for listener in self._death_listeners:
+            listener(self)
+
+    def add_death_listener(self, listener):
+        """
+        Register a function called when the player dies
+        :param listener: function taking the dead player as parameter
+        """
+        self._death_listeners.append(listener)
+
+    def set_vote_tally(self, vote_tally):
+        """
+        Configure the tally updated by the player votes
+        :param vote_tally: VoteTally of the game
+        """
+        self._vote_tally = vote_tally
 
     def set_vote_id(self, vote_id: int):
+        if self._vote_tally is not None:
+            self._vote_tally.update_vote(self._vote_id, vote_id)
         self._vote_id = vote_id
 
     def get_vote_id(self) -> int:
         return self._vote_id
 
     def set_trial_vote(self, vote):
-        if vote in [Misc.TRIAL_GUILTY, Misc.TRIAL_INNOCENT]:
-            self._trial_vote = vote
-        else:
-            self._trial_vote = None
+        if vote not in [Misc.TRIAL_GUILTY, Misc.TRIAL_INNOCENT]:
+            vote = None
+        if self._vote_tally is not None:
+            self._vote_tally.update_trial_vote(self._trial_vote, vote)
+        self._trial_vote = vote
 
     def get_trial_vote(self):
         return self._trial_vote
 
     def reset_trial_vote(self):
-        self._trial_vote = None
+        self.set_trial_vote(None)
@@ -0,0 +1,304 @@
+import argparse
+import asyncio
+import contextlib
+import cProfile
+import gzip
+import io
+import json
+import pstats
+import tempfile
+import time
+from mafia.clock import Clock, VirtualClock
+from mafia.gameregistry import GameRegistry
+from mafia.transport import MemoryTransport
+from mafia.misc.utils import Timers
+from mafia.misc.setups import Setups
+from mafia.eventlog import EventLogger
+
+
+def read_event_log(path: str) -> list:
+    """
+    Read a game event log, compressed or not
+    :param path: path of the log file
+    :return: list of events, dicts
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, 'rt', encoding='utf-8') as log_file:
+        return [json.loads(line) for line in log_file if line.strip()]
+
+
+class GameReplay:
+    """
+    Replay the recorded inputs of a game through the engine: lobby commands and private channels messages are sent
+    to a game created with the recorded seed and timers. Inputs are sent at their recorded delay since the last
+    state change, so the processing delays of the recorded game do not shift them to another state. The replayed
+    game is compared with the recorded one, differences are reported as divergences.
+    """
+    # Maximum game time waited for a recorded state change, in seconds
+    STATE_TIMEOUT = 600.0
+
+    def __init__(self, registry: GameRegistry, events: list):
+        """
+        Initializer
+        :param registry: registry hosting the replayed game, using a MemoryTransport
+        :param events: events of the recorded game, see read_event_log
+        """
+        if not events or events[0]["event"] != "game_created" or "seed" not in events[0]:
+            raise ValueError("The event log does not start with the creation of a seeded game.")
+        self._registry = registry
+        self._transport = registry.transport
+        self._clock = registry.clock
+        self._events = events
+        self._guild = self._transport.create_guild("replay")
+        self._lobby = self._transport.create_channel(self._guild, "lobby")
+        self.engine = None
+        # States entered by the replayed game, tuples (state, time)
+        self._states = []
+        self._state_changed = asyncio.Event()
+        # Recorded and replay times of the last state change, origin of the next inputs
+        self._anchor_time = None
+        self._anchor_recorded_time = 0.0
+        self._recorded_states = 0
+        # Replay authors indexed by recorded author id
+        self._authors = {}
+        # Replay players and their authors, indexed by recorded private channel id
+        self._players = {}
+        self._players_authors = {}
+        # Recorded roles, tuples (house, role) indexed by recorded private channel id
+        self._recorded_roles = {}
+        # Recorded deaths, tuples (house, role) in death order
+        self._recorded_deaths = []
+        self.divergences = []
+        self.replayed_events = 0
+
+        self._handlers = {
+            "player_joined": self._on_player_joined,
+            "game_started": self._on_game_started,
+            "message": self._on_message,
+            "game_stopped": self._on_game_stopped,
+            "game_resumed": self._on_game_resumed,
+            "role_assigned": self._on_role_assigned,
+            "death": self._on_death
+        }
+
+    @staticmethod
+    def get_timers(events: list):
+        """
+        Get the phases durations of a recorded game
+        :param events: events of the recorded game
+        :return: Timers subclass
+        """
+        return type("ReplayTimers", (Timers,), events[0].get("timers", {}))
+
+    def _get_author(self, author_id: int, name: str = None):
+        author = self._authors.get(author_id)
+        if author is None:
+            author = self._transport.create_author(name if name is not None else "author_{}".format(author_id))
+            self._authors[author_id] = author
+        return author
+
+    def _create_context(self, author_id: int, content: str):
+        return self._transport.create_context(self._get_author(author_id), self._guild, self._lobby, content)
+
+    def _add_divergence(self, event: dict, description: str):
+        self.divergences.append("t={:.3f} {}: {}".format(event["t"], event["event"], description))
+
+    async def _on_player_joined(self, event: dict):
+        author = self._get_author(event["author"], event["name"])
+        index = len(self._players)
+        # Players may already be there: logs of older versions add fake players when a debug account joins
+        if index >= len(self.engine.players):
+            ctx = self._create_context(event["author"], "$join_game")
+            if event["fake"]:
+                await self.engine.add_fake_players(ctx, 1)
+            else:
+                await self.engine.join_game(ctx)
+        if index >= len(self.engine.players):
+            self._add_divergence(event, "player not added")
+            return
+        self._players[event["channel"]] = self.engine.players[index]
+        self._players_authors[event["channel"]] = author
+
+    def _on_replay_event(self, event_type: str, data: dict):
+        if event_type == "state":
+            self._states.append((data["state"], self._clock.time()))
+            self._state_changed.set()
+
+    async def _wait_for_state(self, event: dict) -> bool:
+        """
+        Wait until the replayed game enters as many states as the recorded one
+        :param event: the recorded state event
+        :return: False if the state is not reached in time
+        """
+        self._recorded_states += 1
+        deadline = self._clock.time() + self.STATE_TIMEOUT
+        while len(self._states) < self._recorded_states:
+            self._state_changed.clear()
+            try:
+                await asyncio.wait_for(self._state_changed.wait(), deadline - self._clock.time())
+            except asyncio.TimeoutError:
+                self._add_divergence(event, "state {} never reached".format(event["state"]))
+                return False
+        state, state_time = self._states[self._recorded_states - 1]
+        if state != event["state"]:
+            self._add_divergence(event, "{} entered instead of {}".format(state, event["state"]))
+        self._anchor_time = state_time
+        self._anchor_recorded_time = event["t"]
+        return True
+
+    async def _on_game_started(self, event: dict):
+        await self.engine.start_game(self._create_context(event["author"], "$start_game"))
+
+    async def _on_message(self, event: dict):
+        player = self._players.get(event["channel"])
+        if player is None:
+            self._add_divergence(event, "unknown private channel {}".format(event["channel"]))
+            return
+        game_state = self.engine.get_game_state()
+        state_name = game_state.identifier if game_state is not None else "none"
+        if state_name != event["state"]:
+            self._add_divergence(event, "received in {} instead of {}".format(state_name, event["state"]))
+        message = self._transport.create_message(self._players_authors[event["channel"]],
+                                                 player.get_private_channel(), event["content"])
+        await self._registry.manage_message(message)
+
+    async def _on_game_stopped(self, event: dict):
+        ctx = self._create_context(event["author"], "$stop_game")
+        await self.engine.stop_game(ctx)
+        self._registry.remove_engine(ctx)
+
+    async def _on_game_resumed(self, event: dict):
+        self._add_divergence(event, "game resumed from a snapshot, inputs received during the restart are lost")
+
+    async def _on_role_assigned(self, event: dict):
+        self._recorded_roles[event["channel"]] = (event["house"], event["role"])
+
+    async def _on_death(self, event: dict):
+        self._recorded_deaths.append((event["house"], event["role"]))
+
+    def _compare_results(self):
+        """
+        Compare the roles and deaths of the replayed game with the recorded ones
+        """
+        for channel_id, recorded_role in self._recorded_roles.items():
+            player = self._players.get(channel_id)
+            if player is None or player.get_house() is None or player.get_role() is None:
+                self.divergences.append("role_assigned: player of channel {} not configured".format(channel_id))
+                continue
+            role = (player.get_house().get_id(), player.get_role().name)
+            if role != recorded_role:
+                self.divergences.append("role_assigned: {} instead of {}".format(role, recorded_role))
+        deaths = [(player.get_house().get_id(), player.get_role().name) for player in self.engine.get_dead_players()]
+        if deaths != self._recorded_deaths:
+            self.divergences.append("death: {} instead of {}".format(deaths, self._recorded_deaths))
+
+    async def run(self) -> float:
+        """
+        Replay the game
+        :return: duration of the replayed game, in game time
+        """
+        created = self._events[0]
+        self._get_author(created["author"])
+        ctx = self._create_context(created["author"], "$create_game")
+        self.engine = self._registry.get_or_create_engine(ctx)
+        self.engine.add_event_listener(self._on_replay_event)
+        await self.engine.create_game(ctx, created["preset"], created["seed"])
+        if self.engine.event_log is None:
+            raise ValueError("Preset '{}' of the recorded game is not available.".format(created["preset"]))
+        # Same time origin as the recorded log
+        start_time = self._clock.time() - self.engine.event_log.get_elapsed_time()
+        self._anchor_time = start_time
+        self.replayed_events = 1
+
+        for event in self._events[1:]:
+            if event["event"] == "state":
+                if not await self._wait_for_state(event):
+                    break
+            else:
+                delay = self._anchor_time + event["t"] - self._anchor_recorded_time - self._clock.time()
+                if delay > 0:
+                    await self._clock.sleep(delay)
+                handler = self._handlers.get(event["event"])
+                if handler is not None:
+                    await handler(event)
+            self.replayed_events += 1
+
+        # Recorded log of a game still running, or of a crashed process
+        self.engine.freeze_game()
+        self._compare_results()
+        return self._clock.time() - start_time
+
+
+async def replay_game(events: list, clock: Clock = None, setups: Setups = None,
+                      event_logger: EventLogger = None) -> dict:
+    """
+    Replay a recorded game
+    :param events: events of the recorded game, see read_event_log
+    :param clock: clock used for every game delay, clock of the running loop if None
+    :param setups: role setups, loaded from the default file if None
+    :param event_logger: event logs writer of the replayed game, logs are written in the default directory if None
+    :return: dict of statistics
+    """
+    clock = clock if clock is not None else Clock(asyncio.get_running_loop())
+    registry = GameRegistry(None, MemoryTransport(), clock, GameReplay.get_timers(events), event_logger)
+    if setups is not None:
+        registry.setups = setups
+    replay = GameReplay(registry, events)
+
+    start_time = time.perf_counter()
+    game_time = await replay.run()
+    await registry.dispatcher.drain()
+    await registry.channel_pool.close()
+    return {
+        "events": replay.replayed_events,
+        "game_time": game_time,
+        "duration": time.perf_counter() - start_time,
+        "divergences": replay.divergences
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded game through the engine")
+    parser.add_argument("log", help="event log of the game, compressed or not")
+    parser.add_argument("--realtime", action="store_true",
+                        help="wait for the real game delays instead of running them on a virtual clock")
+    parser.add_argument("--setups", help="role setups file of the recorded game, default file if not set")
+    parser.add_argument("--profile", action="store_true", help="profile the replay and print the hottest functions")
+    parser.add_argument("--verbose", action="store_true", help="print the engine output")
+    parser.add_argument("--log-dir", help="directory of the replayed game event log, discarded if not set")
+    args = parser.parse_args()
+
+    events = read_event_log(args.log)
+    setups = Setups(args.setups) if args.setups is not None else None
+    profiler = cProfile.Profile() if args.profile else None
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        event_logger = EventLogger(args.log_dir or temporary_directory)
+        if profiler is not None:
+            profiler.enable()
+        with output:
+            if args.realtime:
+                stats = asyncio.run(replay_game(events, setups=setups, event_logger=event_logger))
+            else:
+                clock = VirtualClock()
+                try:
+                    stats = clock.run(replay_game(events, clock, setups, event_logger))
+                finally:
+                    clock.close()
+        if profiler is not None:
+            profiler.disable()
+        event_logger.close()
+
+    print("{events} events replayed, {game_time:.0f} s of game time in {duration:.2f} s".format(**stats))
+    if stats["divergences"]:
+        print("{} divergence(s):".format(len(stats["divergences"])))
+        for divergence in stats["divergences"]:
+            print("  {}".format(divergence))
+    else:
+        print("No divergence")
+    if profiler is not None:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+
+if __name__ == '__main__':
+    main()
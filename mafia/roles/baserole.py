@@ -21,12 +21,35 @@ class BaseRole:
         self.investigation_sheriff = None
         self.investigation_investigator = None
         self.unique_role = False
+        # Faction sharing a night chat and a night target, None if the role acts alone
+        self.faction = None
+        # True if the role leads its faction: its night target overrides the faction tally
+        self.faction_leader = False
+        # Night ability: NightActionType, None if the role has no night action
+        self.night_action = None
+        # Number of nights the ability can be used, None if unlimited
+        self.night_action_uses = None
+        # True if the ability can only target the player using it
+        self.night_action_self = False
+        # True if the Town wins a one against one duel with the Mafia while this role is alive
+        self.wins_duel_tie = False
 
-    def _get_description(self) -> str:
+        self._description = None
+
+    def get_description(self) -> str:
         """
-        Get a full role description
+        Get a full role description, built once
         :return: a string containing the full role description, ready to be printed/displayed
         """
+        if self._description is None:
+            self._description = self._build_description()
+        return self._description
+
+    def _build_description(self) -> str:
+        """
+        Build a full role description
+        :return: a string containing the full role description
+        """
         categories = ", ".join([category.split()[1] for category in self.categories])
         description = "**Alignement** : {} ({})".format(self.alignment, categories)
         description += "\n**En bref** : {}\n".format(self.summary)
@@ -42,5 +65,5 @@ class BaseRole:
         :param send_message_embed: function to send an embed message
         """
         send_message_embed(title=self.name,
-                           description=self._get_description(),
+                           description=self.get_description(),
                            color=self.color)
@@ -0,0 +1,30 @@
+from mafia.roles.mafia.mafiarole import MafiaRole
+from mafia.misc.utils import RoleCategory, InvestigationSheriff, InvestigationInvestigator, NightActionType
+
+
+class Godfather(MafiaRole):
+    """
+    Mafia role: Godfather
+    """
+
+    def __init__(self):
+        """
+        Initializer
+        """
+        super().__init__()
+        self.name = "Godfather"
+        self.categories = [RoleCategory.MAFIA_KILLING]
+        self.summary = "Le chef de la famille criminelle."
+        self.abilities += ["Décidez qui la Mafia va tuer chaque nuit (commande '-target X')"]
+        self.special_attributes += ["Votre cible surcharge les votes des Mafiosi",
+                                    "Un Mafioso aléatoire est envoyé tuer votre cible, vous tuez vous-même s'il n'en "
+                                    "reste aucun",
+                                    "Vous apparaissez non suspect lors des enquêtes du Sheriff"]
+        self.unique_role = True
+
+        self.night_action = NightActionType.KILL
+        self.faction_leader = True
+
+        self.investigation_sheriff = InvestigationSheriff.NOT_SUSPICIOUS
+        self.investigation_investigator = [InvestigationInvestigator.MURDER,
+                                           InvestigationInvestigator.TRESPASSING]
@@ -1,5 +1,5 @@
 from mafia.roles.baserole import BaseRole
-from mafia.misc.utils import Alignment, Colors
+from mafia.misc.utils import Alignment, Colors, Faction
 
 
 class MafiaRole(BaseRole):
@@ -13,6 +13,7 @@ class MafiaRole(BaseRole):
         """
         super().__init__()
         self.alignment = Alignment.MAFIA
+        self.faction = Faction.MAFIA
         self.color = Colors.MAFIA_COLOR
         self.goal = "Tuer tous les membres de la ville et tous vos opposants."
 
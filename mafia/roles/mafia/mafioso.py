@@ -1,5 +1,5 @@
 from mafia.roles.mafia.mafiarole import MafiaRole
-from mafia.misc.utils import RoleCategory, InvestigationSheriff, InvestigationInvestigator
+from mafia.misc.utils import RoleCategory, InvestigationSheriff, InvestigationInvestigator, NightActionType
 
 
 class Mafioso(MafiaRole):
@@ -20,6 +20,8 @@ class Mafioso(MafiaRole):
                                     "Vous devez voter pour tuer tant que la Mafia est en vie (commande '-target X')",
                                     "Un Mafioso aléatoire sera envoyé pour tuer la cible choisie par la Mafia"]
 
+        self.night_action = NightActionType.KILL
+
         self.investigation_sheriff = InvestigationSheriff.MAFIA
         self.investigation_investigator = [InvestigationInvestigator.MURDER,
                                            InvestigationInvestigator.TRESPASSING]
@@ -1,5 +1,5 @@
 from mafia.roles.town.townrole import TownRole
-from mafia.misc.utils import RoleCategory, InvestigationSheriff, InvestigationInvestigator
+from mafia.misc.utils import RoleCategory, InvestigationSheriff, InvestigationInvestigator, NightActionType
 
 
 class Citizen(TownRole):
@@ -19,5 +19,10 @@ class Citizen(TownRole):
         self.special_attributes = ["Vous pouvez utiliser le gilet pare-balles une fois uniquement",
                                    "Dans le cas d'un duel à égalité entre la Mafia et la Ville, si vous êtes en vie, la Ville gagnera"]
 
+        self.night_action = NightActionType.PROTECT
+        self.night_action_uses = 1
+        self.night_action_self = True
+        self.wins_duel_tie = True
+
         self.investigation_sheriff = InvestigationSheriff.NOT_SUSPICIOUS
         self.investigation_investigator = [InvestigationInvestigator.NO_CRIME]
@@ -0,0 +1,148 @@
+import asyncio
+from mafia.clock import Clock
+
+
+class DelayedOperation:
+    """
+    Handle of an operation scheduled on the event loop, used to cancel it
+    """
+
+    def __init__(self, scheduler, deadline: float, operation, title: str = None, send_message_fnc=None):
+        """
+        Initializer
+        :param scheduler: the scheduler owning this operation
+        :param deadline: clock time at which the operation must be executed
+        :param operation: a function to execute at the deadline
+        :param title: string displayed as timer name
+        :param send_message_fnc: function used to send a message to everyone
+        """
+        self._scheduler = scheduler
+        self._deadline = deadline
+        self._operation = operation
+        self._title = title
+        self._send_message_fnc = send_message_fnc
+
+        self._handles = []
+        self._cancelled = False
+        self._done = False
+
+    def get_deadline(self) -> float:
+        """
+        Get the clock time at which the operation will be executed
+        :return: deadline
+        """
+        return self._deadline
+
+    def get_remaining_time(self) -> float:
+        """
+        Get the time remaining before the operation is executed
+        :return: remaining time, in seconds
+        """
+        return max(0.0, self._deadline - self._scheduler.time())
+
+    def is_pending(self) -> bool:
+        """
+        Check if the operation is still waiting to be executed
+        :return: True if the operation is neither executed nor cancelled
+        """
+        return not self._cancelled and not self._done
+
+    def cancel(self):
+        """
+        Cancel the operation. Can be called from any thread.
+        """
+        self._cancelled = True
+        self._scheduler.call_in_loop(self._cancel_handles)
+
+    def _cancel_handles(self):
+        """
+        Cancel loop handles, must be called from the loop
+        """
+        for handle in self._handles:
+            handle.cancel()
+        self._handles = []
+
+    def _arm(self):
+        """
+        Register the operation and its countdown message on the loop, must be called from the loop
+        """
+        if self._cancelled:
+            return
+        clock = self._scheduler.clock
+        if self._title is not None and self._send_message_fnc is not None:
+            message_time = self._deadline - Scheduler.TIME_MESSAGE_BEFORE_END
+            if message_time <= clock.time():
+                self._send_countdown()
+            else:
+                self._handles.append(clock.call_at(message_time, self._send_countdown))
+        self._handles.append(clock.call_at(self._deadline, self._run))
+
+    def _send_countdown(self):
+        """
+        Send the remaining time message
+        """
+        if not self._cancelled:
+            self._send_message_fnc(Scheduler.MSG_TEMPLATE.format(self._title, round(self.get_remaining_time())))
+
+    def _run(self):
+        """
+        Execute the operation
+        """
+        if self._cancelled:
+            return
+        self._done = True
+        self._handles = []
+        self._operation()
+
+
+class Scheduler:
+    """
+    Single timer scheduler running on the bot event loop, shared by all games
+    """
+    TIME_MESSAGE_BEFORE_END = 10
+    MSG_TEMPLATE = "*{}: {} secondes restantes...*"
+
+    def __init__(self, clock: Clock = None):
+        """
+        Initializer
+        :param clock: clock used to run operations, clock of the current event loop if None
+        """
+        self.clock = clock if clock is not None else Clock()
+        self._loop = self.clock.get_loop()
+
+    def get_loop(self):
+        return self._loop
+
+    def time(self) -> float:
+        """
+        Get the current monotonic time of the clock
+        :return: time, in seconds
+        """
+        return self.clock.time()
+
+    def call_in_loop(self, callback):
+        """
+        Call a function from the loop thread, immediately if already in the loop
+        :param callback: function to call
+        """
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            callback()
+        else:
+            self._loop.call_soon_threadsafe(callback)
+
+    def schedule(self, timer, operation, title: str = None, send_message_fnc=None) -> DelayedOperation:
+        """
+        Schedule an operation, can be called from any thread
+        :param timer: a duration before operation, in seconds
+        :param operation: a function to execute after the timer
+        :param title: string displayed as timer name, a countdown message is sent when title is set
+        :param send_message_fnc: function used to send the countdown message
+        :return: handle of the scheduled operation
+        """
+        delayed_operation = DelayedOperation(self, self.time() + timer, operation, title, send_message_fnc)
+        self.call_in_loop(delayed_operation._arm)
+        return delayed_operation
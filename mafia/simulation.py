@@ -0,0 +1,188 @@
+import argparse
+import asyncio
+import tempfile
+import time
+from mafia.clock import Clock, VirtualClock
+from mafia.gameregistry import GameRegistry
+from mafia.gamestate import GameState
+from mafia.transport import MemoryTransport
+from mafia.eventlog import EventLogger
+
+
+class GameSimulation:
+    """
+    Headless game played by scripted players through the in-memory transport, from game creation to the end of
+    the first night sequence
+    """
+    CHAT_MESSAGES_PER_PHASE = 3
+    POLL_DELAY = 0.1
+
+    def __init__(self, registry: GameRegistry, nb_players: int, chat_messages: int = CHAT_MESSAGES_PER_PHASE,
+                 name: str = "simulation"):
+        """
+        Initializer
+        :param registry: registry hosting the game, using a MemoryTransport
+        :param nb_players: number of players
+        :param chat_messages: number of chat messages sent by each player during chat phases
+        :param name: name of the simulated guild
+        """
+        self._registry = registry
+        self._transport = registry.transport
+        self._chat_messages = chat_messages
+        self._guild = self._transport.create_guild(name)
+        self._lobby = self._transport.create_channel(self._guild, "lobby")
+        self._authors = [self._transport.create_author("joueur_{}".format(i)) for i in range(nb_players)]
+        self._authors_by_player = {}
+        self.engine = None
+
+        # Inbound messages statistics
+        self.inbound_messages = 0
+        self.inbound_time = 0.0
+
+    def _create_context(self, author, content: str):
+        return self._transport.create_context(author, self._guild, self._lobby, content)
+
+    def create_player_message(self, player, content: str):
+        """
+        Create a message sent by a player in its private channel
+        :param player: the player
+        :param content: content of the message
+        :return: the message
+        """
+        return self._transport.create_message(self._authors_by_player[player], player.get_private_channel(), content)
+
+    async def send_player_message(self, player, content: str):
+        """
+        Send a message from a player in its private channel, and measure its processing time
+        :param player: the player
+        :param content: content of the message
+        """
+        message = self.create_player_message(player, content)
+        start_time = time.perf_counter()
+        await self._registry.manage_message(message)
+        self.inbound_time += time.perf_counter() - start_time
+        self.inbound_messages += 1
+
+    async def wait_for_state(self, state):
+        """
+        Wait until the game reaches a state
+        :param state: the GameState state
+        """
+        while self.engine.get_game_state() != state:
+            await asyncio.sleep(self.POLL_DELAY)
+
+    async def _chat(self, players):
+        for i in range(self._chat_messages):
+            for player in players:
+                await self.send_player_message(player, "Message {} de {}".format(i, player.get_nickname()))
+
+    async def start(self, preset: str = None, seed: int = None):
+        """
+        Create the lobby, join it with every player and start the game
+        :param preset: name of the role setup preset, default preset if None
+        :param seed: seed of the game random generator, random if None
+        :return: context of the game creator
+        """
+        ctx = self._create_context(self._authors[0], "$create_game")
+        self.engine = self._registry.get_or_create_engine(ctx)
+        await self.engine.create_game(ctx, preset, seed)
+        for author in self._authors:
+            await self.engine.join_game(self._create_context(author, "$join_game"))
+            self._authors_by_player[self.engine.get_player_from_author_id(author.id)] = author
+        await self.engine.start_game(ctx)
+        return ctx
+
+    async def run(self):
+        """
+        Play the game
+        """
+        ctx = await self.start()
+
+        # Choose nicknames
+        await self.wait_for_state(GameState.state_players_nicknames)
+        for i, player in enumerate(self.engine.players):
+            await self.send_player_message(player, "-Joueur {}".format(i))
+
+        # First day
+        await self.wait_for_state(GameState.state_day_discussion)
+        await self._chat(self.engine.get_alive_players())
+
+        # First night
+        await self.wait_for_state(GameState.state_night)
+        await self._chat(self.engine.mafia_players)
+        await self.wait_for_state(GameState.state_night_sequence)
+        await self.wait_for_state(GameState.state_day_discussion)
+
+        # Game over
+        await self.engine.stop_game(ctx)
+        self._registry.remove_engine(ctx)
+
+
+async def run_simulations(nb_games: int, nb_players: int, chat_messages: int, clock: Clock = None,
+                          event_logger: EventLogger = None) -> dict:
+    """
+    Run concurrent headless games
+    :param nb_games: number of concurrent games
+    :param nb_players: number of players per game
+    :param chat_messages: number of chat messages sent by each player during chat phases
+    :param clock: clock used for every game delay, clock of the running loop if None
+    :param event_logger: games event logs writer, logs are written in the default directory if None
+    :return: dict of statistics
+    """
+    clock = clock if clock is not None else Clock(asyncio.get_running_loop())
+    transport = MemoryTransport()
+    registry = GameRegistry(None, transport, clock, event_logger=event_logger)
+    simulations = [GameSimulation(registry, nb_players, chat_messages, "simulation_{}".format(i))
+                   for i in range(nb_games)]
+
+    start_time = time.perf_counter()
+    start_game_time = clock.time()
+    await asyncio.gather(*[simulation.run() for simulation in simulations])
+    await registry.dispatcher.drain()
+    duration = time.perf_counter() - start_time
+    await registry.channel_pool.close()
+
+    inbound_messages = sum(simulation.inbound_messages for simulation in simulations)
+    inbound_time = sum(simulation.inbound_time for simulation in simulations)
+    return {
+        "games": nb_games,
+        "players": nb_players,
+        "duration": duration,
+        "game_time": clock.time() - start_game_time,
+        "games_per_second": nb_games / duration,
+        "inbound_messages": inbound_messages,
+        "inbound_messages_per_second": inbound_messages / inbound_time if inbound_time > 0 else 0.0,
+        "outbound_messages": transport.sent_messages
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless Mafia games to measure the engine throughput")
+    parser.add_argument("--games", type=int, default=1, help="number of concurrent games")
+    parser.add_argument("--players", type=int, default=10, help="number of players per game")
+    parser.add_argument("--chat", type=int, default=GameSimulation.CHAT_MESSAGES_PER_PHASE,
+                        help="chat messages sent by each player during chat phases")
+    parser.add_argument("--realtime", action="store_true",
+                        help="wait for the real game delays instead of running them on a virtual clock")
+    parser.add_argument("--log-dir", help="directory of the games event logs, logs are discarded if not set")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        event_logger = EventLogger(args.log_dir or temporary_directory)
+        if args.realtime:
+            stats = asyncio.run(run_simulations(args.games, args.players, args.chat, event_logger=event_logger))
+        else:
+            clock = VirtualClock()
+            try:
+                stats = clock.run(run_simulations(args.games, args.players, args.chat, clock, event_logger))
+            finally:
+                clock.close()
+        event_logger.close()
+    print("{games} games of {players} players in {duration:.2f} s: {games_per_second:.3f} games/s".format(**stats))
+    print("{game_time:.0f} s of game time".format(**stats))
+    print("{inbound_messages} inbound messages: {inbound_messages_per_second:.0f} messages/s".format(**stats))
+    print("{outbound_messages} outbound messages".format(**stats))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SnapshotStore:
+    """
+    Store of games snapshots, one JSON file per game. Files are written from a single background thread, and
+    replaced atomically so a crash never leaves a partial snapshot.
+    """
+    DEFAULT_DIRECTORY = "game_snapshots"
+    EXTENSION = ".json"
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY):
+        """
+        Initializer
+        :param directory: directory of the snapshots, created if needed
+        """
+        self._directory = directory
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot")
+
+    def _get_path(self, name: str) -> str:
+        return os.path.join(self._directory, name + self.EXTENSION)
+
+    def save(self, name: str, snapshot: dict):
+        """
+        Write a snapshot in background, replacing the previous one with the same name
+        :param name: name of the snapshot
+        :param snapshot: the snapshot, JSON serializable, must not be modified afterwards
+        """
+        self._executor.submit(self._run, self._write, name, snapshot)
+
+    def delete(self, name: str):
+        """
+        Delete a snapshot in background
+        :param name: name of the snapshot
+        """
+        self._executor.submit(self._run, self._remove, name)
+
+    def load_all(self) -> dict:
+        """
+        Read all snapshots, invalid files are ignored
+        :return: dict of snapshots indexed by name
+        """
+        snapshots = {}
+        if not os.path.isdir(self._directory):
+            return snapshots
+        for file_name in sorted(os.listdir(self._directory)):
+            if not file_name.endswith(self.EXTENSION):
+                continue
+            name = file_name[:-len(self.EXTENSION)]
+            try:
+                with open(self._get_path(name), 'r', encoding='utf-8') as snapshot_file:
+                    snapshots[name] = json.load(snapshot_file)
+            except (OSError, ValueError) as exception:
+                print("Failed to read snapshot {}. Error: {}".format(name, exception))
+        return snapshots
+
+    def wait(self):
+        """
+        Wait until all submitted writes are done
+        """
+        self._executor.submit(lambda: None).result()
+
+    @staticmethod
+    def _run(function, *args):
+        try:
+            function(*args)
+        except Exception as exception:
+            print("Failed to write snapshot. Error: {}".format(exception))
+
+    def _write(self, name: str, snapshot: dict):
+        os.makedirs(self._directory, exist_ok=True)
+        path = self._get_path(name)
+        temporary_path = path + ".tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as snapshot_file:
+            json.dump(snapshot, snapshot_file, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temporary_path, path)
+
+    def _remove(self, name: str):
+        path = self._get_path(name)
+        if os.path.exists(path):
+            os.remove(path)
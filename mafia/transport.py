@@ -0,0 +1,393 @@
+import asyncio
+import itertools
+import discord
+from mafia.misc.utils import Misc
+
+
+class Transport:
+    """
+    Interface between the game engine and the chat service hosting the games
+    """
+    # Rate limit of messages sent to a channel: (messages count, period in seconds), None if not limited
+    ROUTE_RATE_LIMIT = None
+    # Maximum number of channels created or deleted at the same time
+    CHANNELS_CONCURRENCY = 5
+
+    async def run_channels_operations(self, operations: list) -> list:
+        """
+        Run channels creations or deletions concurrently, at most CHANNELS_CONCURRENCY at a time
+        :param operations: list of coroutines
+        :return: list of results, in operations order
+        """
+        semaphore = asyncio.Semaphore(self.CHANNELS_CONCURRENCY)
+
+        async def run(operation):
+            async with semaphore:
+                return await operation
+        return await asyncio.gather(*[run(operation) for operation in operations])
+
+    async def prepare_private_category(self, ctx):
+        """
+        Create the category of private channels if it doesn't exist
+        :param ctx: context
+        """
+        raise NotImplementedError()
+
+    async def get_private_channels(self, ctx) -> list:
+        """
+        Get all channels of the private channels category
+        :param ctx: context
+        :return: list of channels
+        """
+        raise NotImplementedError()
+
+    async def create_private_channel(self, ctx, name: str, member=None):
+        """
+        Create a private channel only readable by a member
+        :param ctx: context
+        :param name: name of the channel
+        :param member: the member allowed to read the channel, None to hide the channel from everyone
+        :return: the created channel
+        """
+        raise NotImplementedError()
+
+    async def assign_private_channel(self, channel, member):
+        """
+        Give an unused private channel to a member: only this member can read it
+        :param channel: the channel
+        :param member: the member allowed to read the channel
+        """
+        raise NotImplementedError()
+
+    async def release_private_channel(self, channel):
+        """
+        Hide a private channel from everyone and clear its history, so it can be assigned again
+        :param channel: the channel
+        """
+        raise NotImplementedError()
+
+    async def delete_channel(self, channel):
+        """
+        Delete a channel
+        :param channel: the channel
+        """
+        raise NotImplementedError()
+
+    async def send(self, channel, content: str = None, embed=None):
+        """
+        Send a message to a channel
+        :param channel: the channel
+        :param content: text content of the message
+        :param embed: embed of the message, created by create_embed
+        :return: the sent message
+        """
+        raise NotImplementedError()
+
+    def create_embed(self, title: str = None, description: str = None, color: int = 0):
+        """
+        Create an embed message
+        :param title: title of the embed
+        :param description: description of the embed
+        :param color: color of the embed
+        :return: the embed, to be sent with send
+        """
+        raise NotImplementedError()
+
+    async def delete_message(self, message):
+        """
+        Delete a message received in a private channel
+        :param message: the message
+        """
+        raise NotImplementedError()
+
+    async def get_channel(self, guild_id: int, channel_id: int):
+        """
+        Get an existing channel, used to resume games
+        :param guild_id: id of the guild of the channel
+        :param channel_id: id of the channel
+        :return: the channel, None if it doesn't exist anymore
+        """
+        raise NotImplementedError()
+
+    async def get_member(self, guild_id: int, member_id: int):
+        """
+        Get a member of a guild, used to resume games
+        :param guild_id: id of the guild
+        :param member_id: id of the member
+        :return: the member, None if the member left the guild
+        """
+        raise NotImplementedError()
+
+
+class DiscordTransport(Transport):
+    """
+    Transport using a Discord guild
+    """
+    # Discord allows 5 messages every 5 seconds per channel
+    ROUTE_RATE_LIMIT = (5, 5.0)
+
+    def __init__(self, bot=None):
+        """
+        Initializer
+        :param bot: discord Bot reference, used to find channels and members of resumed games
+        """
+        self._bot = bot
+        # Locks of the private category creation, indexed by guild id: players can join concurrently
+        self._category_locks = {}
+
+    async def prepare_private_category(self, ctx):
+        async with self._category_locks.setdefault(ctx.guild.id, asyncio.Lock()):
+            private_category = discord.utils.get(ctx.guild.categories, name=Misc.CATEGORY_CHANNEL_MAFIA)
+            # Create the category if it doesn't exist
+            if private_category is None:
+                overwrites = {
+                    ctx.guild.default_role: discord.PermissionOverwrite(read_messages=False)
+                }
+                await ctx.guild.create_category(Misc.CATEGORY_CHANNEL_MAFIA, overwrites=overwrites)
+
+    async def get_private_channels(self, ctx) -> list:
+        private_category = discord.utils.get(ctx.guild.categories, name=Misc.CATEGORY_CHANNEL_MAFIA)
+        return list(private_category.channels) if private_category is not None else []
+
+    @staticmethod
+    def _get_private_overwrites(guild, member) -> dict:
+        overwrites = {
+            guild.default_role: discord.PermissionOverwrite(read_messages=False)
+        }
+        if member is not None:
+            overwrites[member] = discord.PermissionOverwrite(read_messages=True)
+        return overwrites
+
+    async def create_private_channel(self, ctx, name: str, member=None):
+        private_category = discord.utils.get(ctx.guild.categories, name=Misc.CATEGORY_CHANNEL_MAFIA)
+        return await ctx.guild.create_text_channel(name, category=private_category,
+                                                   overwrites=self._get_private_overwrites(ctx.guild, member))
+
+    async def assign_private_channel(self, channel, member):
+        await channel.edit(overwrites=self._get_private_overwrites(channel.guild, member))
+
+    async def release_private_channel(self, channel):
+        await channel.edit(overwrites=self._get_private_overwrites(channel.guild, None))
+        await channel.purge(limit=None)
+
+    async def delete_channel(self, channel):
+        await channel.delete()
+
+    async def send(self, channel, content: str = None, embed=None):
+        return await channel.send(content=content, embed=embed)
+
+    def create_embed(self, title: str = None, description: str = None, color: int = 0):
+        return discord.Embed(title=title if title is not None else discord.Embed.Empty,
+                             description=description if description is not None else discord.Embed.Empty,
+                             colour=color)
+
+    async def delete_message(self, message):
+        await message.delete()
+
+    async def get_channel(self, guild_id: int, channel_id: int):
+        guild = self._bot.get_guild(guild_id)
+        return guild.get_channel(channel_id) if guild is not None else None
+
+    async def get_member(self, guild_id: int, member_id: int):
+        guild = self._bot.get_guild(guild_id)
+        if guild is None:
+            return None
+        member = guild.get_member(member_id)
+        if member is None:
+            # Not in the members cache
+            try:
+                member = await guild.fetch_member(member_id)
+            except discord.HTTPException:
+                return None
+        return member
+
+
+class MemoryAuthor:
+    """
+    In-memory user
+    """
+
+    def __init__(self, author_id: int, name: str):
+        self.id = author_id
+        self.name = name
+
+
+class MemoryGuild:
+    """
+    In-memory guild
+    """
+
+    def __init__(self, guild_id: int, name: str):
+        self.id = guild_id
+        self.name = name
+
+
+class MemoryEmbed:
+    """
+    In-memory embed message
+    """
+
+    def __init__(self, title: str = None, description: str = None, color: int = 0):
+        self.title = title
+        self.description = description
+        self.colour = color
+
+
+class MemoryMessage:
+    """
+    In-memory message
+    """
+
+    def __init__(self, message_id: int, author: MemoryAuthor, channel, content: str = None, embed=None):
+        self.id = message_id
+        self.author = author
+        self.channel = channel
+        self.content = content
+        self.embed = embed
+
+    async def delete(self):
+        pass
+
+
+class MemoryChannel:
+    """
+    In-memory text channel, keeping all messages sent to it
+    """
+
+    def __init__(self, transport, channel_id: int, name: str, guild: MemoryGuild):
+        self._transport = transport
+        self.id = channel_id
+        self.name = name
+        self.guild = guild
+        self.messages = []
+        # Member allowed to read the channel, None for public or hidden channels
+        self.member = None
+
+    async def send(self, content: str = None, embed=None):
+        return await self._transport.send(self, content=content, embed=embed)
+
+    async def delete(self):
+        self._transport.remove_channel(self)
+
+
+class MemoryContext:
+    """
+    In-memory command context
+    """
+
+    def __init__(self, transport, author: MemoryAuthor, guild: MemoryGuild, channel: MemoryChannel,
+                 content: str = ""):
+        self.author = author
+        self.guild = guild
+        self.channel = channel
+        self.message = MemoryMessage(transport.next_id(), author, channel, content)
+
+    async def send(self, content: str):
+        return await self.channel.send(content)
+
+
+class MemoryTransport(Transport):
+    """
+    Transport keeping everything in memory, used to run games without any Discord connection
+    """
+
+    def __init__(self, bot_author: MemoryAuthor = None):
+        """
+        Initializer
+        :param bot_author: author of messages sent by the bot
+        """
+        self._ids = itertools.count(1)
+        self.bot_author = bot_author if bot_author is not None else MemoryAuthor(self.next_id(), "MafiaBot")
+        # Private channels indexed by guild id
+        self._private_channels = {}
+        # Channels and authors indexed by id
+        self._channels = {}
+        self._authors = {}
+        self.sent_messages = 0
+
+    def next_id(self) -> int:
+        """
+        Get a new unique id
+        :return: the id
+        """
+        return next(self._ids)
+
+    def create_guild(self, name: str = "guild") -> MemoryGuild:
+        return MemoryGuild(self.next_id(), name)
+
+    def create_author(self, name: str) -> MemoryAuthor:
+        author = MemoryAuthor(self.next_id(), name)
+        self._authors[author.id] = author
+        return author
+
+    def create_channel(self, guild: MemoryGuild, name: str) -> MemoryChannel:
+        channel = MemoryChannel(self, self.next_id(), name, guild)
+        self._channels[channel.id] = channel
+        return channel
+
+    def create_context(self, author: MemoryAuthor, guild: MemoryGuild, channel: MemoryChannel,
+                       content: str = "") -> MemoryContext:
+        """
+        Create the context of a bot command
+        :param author: author of the command
+        :param guild: guild where the command is sent
+        :param channel: channel where the command is sent
+        :param content: content of the command message
+        :return: the context
+        """
+        return MemoryContext(self, author, guild, channel, content)
+
+    def create_message(self, author: MemoryAuthor, channel: MemoryChannel, content: str) -> MemoryMessage:
+        """
+        Create a message sent by a user
+        :param author: author of the message
+        :param channel: channel where the message is sent
+        :param content: content of the message
+        :return: the message
+        """
+        return MemoryMessage(self.next_id(), author, channel, content)
+
+    def remove_channel(self, channel: MemoryChannel):
+        self._private_channels.get(channel.guild.id, {}).pop(channel.id, None)
+        self._channels.pop(channel.id, None)
+
+    async def prepare_private_category(self, ctx):
+        self._private_channels.setdefault(ctx.guild.id, {})
+
+    async def get_private_channels(self, ctx) -> list:
+        return list(self._private_channels.get(ctx.guild.id, {}).values())
+
+    async def create_private_channel(self, ctx, name: str, member=None):
+        channel = self.create_channel(ctx.guild, name)
+        channel.member = member
+        self._private_channels.setdefault(ctx.guild.id, {})[channel.id] = channel
+        return channel
+
+    async def assign_private_channel(self, channel, member):
+        channel.member = member
+
+    async def release_private_channel(self, channel):
+        channel.member = None
+        channel.messages.clear()
+
+    async def delete_channel(self, channel):
+        await channel.delete()
+
+    async def send(self, channel, content: str = None, embed=None):
+        message = MemoryMessage(self.next_id(), self.bot_author, channel, content, embed)
+        channel.messages.append(message)
+        self.sent_messages += 1
+        return message
+
+    def create_embed(self, title: str = None, description: str = None, color: int = 0):
+        return MemoryEmbed(title, description, color)
+
+    async def delete_message(self, message):
+        await message.delete()
+
+    async def get_channel(self, guild_id: int, channel_id: int):
+        channel = self._channels.get(channel_id)
+        return channel if channel is not None and channel.guild.id == guild_id else None
+
+    async def get_member(self, guild_id: int, member_id: int):
+        return self._authors.get(member_id)
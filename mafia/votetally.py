@@ -0,0 +1,98 @@
+from mafia.misc.utils import Misc
+
+
+class VoteTally:
+    """
+    Incremental tally of day votes, trial votes and day skips of a game
+    """
+
+    def __init__(self):
+        """
+        Initializer
+        """
+        self._votes = {}
+        self._trial_votes = {Misc.TRIAL_GUILTY: 0, Misc.TRIAL_INNOCENT: 0}
+        self._skips = set()
+
+    def update_vote(self, old_house_id: int, new_house_id: int):
+        """
+        Update the tally when a player changes its vote
+        :param old_house_id: house id of the previously voted player, None if no previous vote
+        :param new_house_id: house id of the newly voted player, None to cancel the vote
+        """
+        if old_house_id is not None:
+            count = self._votes[old_house_id] - 1
+            if count == 0:
+                del self._votes[old_house_id]
+            else:
+                self._votes[old_house_id] = count
+        if new_house_id is not None:
+            self._votes[new_house_id] = self._votes.get(new_house_id, 0) + 1
+
+    def get_votes(self, house_id: int) -> int:
+        """
+        Get the number of votes against a player
+        :param house_id: house id of the player
+        :return: number of votes
+        """
+        return self._votes.get(house_id, 0)
+
+    def get_current_votes(self) -> dict:
+        """
+        Get the live view of all current votes, must not be modified
+        :return: dict containing player house IDs and their corresponding votes
+        """
+        return self._votes
+
+    def reset_votes(self):
+        self._votes = {}
+
+    def update_trial_vote(self, old_vote, new_vote):
+        """
+        Update the tally when a player changes its trial vote
+        :param old_vote: previous trial vote, None if the player didn't vote
+        :param new_vote: new trial vote, None to cancel the vote
+        """
+        if old_vote is not None:
+            self._trial_votes[old_vote] -= 1
+        if new_vote is not None:
+            self._trial_votes[new_vote] += 1
+
+    def get_guilty_votes(self) -> int:
+        return self._trial_votes[Misc.TRIAL_GUILTY]
+
+    def get_innocent_votes(self) -> int:
+        return self._trial_votes[Misc.TRIAL_INNOCENT]
+
+    def get_trial_voters_count(self) -> int:
+        """
+        Get the number of players who voted during the trial
+        :return: number of trial voters
+        """
+        return self._trial_votes[Misc.TRIAL_GUILTY] + self._trial_votes[Misc.TRIAL_INNOCENT]
+
+    def reset_trial_votes(self):
+        self._trial_votes = {Misc.TRIAL_GUILTY: 0, Misc.TRIAL_INNOCENT: 0}
+
+    def add_skip(self, player) -> bool:
+        """
+        Add a player wanting to skip the day
+        :param player: the player
+        :return: True if the player didn't already ask to skip
+        """
+        if player in self._skips:
+            return False
+        self._skips.add(player)
+        return True
+
+    def has_skipped(self, player) -> bool:
+        return player in self._skips
+
+    def remove_skip(self, player):
+        self._skips.discard(player)
+
+    def get_skips_count(self) -> int:
+        return len(self._skips)
+
+    def reset_skips(self):
+        self._skips = set()
@@ -0,0 +1,69 @@
+from mafia.misc.utils import Alignment
+
+
+class WinTracker:
+    """
+    Alive players counters of a game, indexed by alignment. Counters are updated at each death, so win conditions
+    are evaluated in O(1) without scanning players.
+    """
+    # Alignments which must eliminate every other alignment to win, the Town wins when none of them is alive
+    HOSTILE_ALIGNMENTS = [Alignment.MAFIA, Alignment.TRIAD]
+    # Result of a game without any survivor
+    DRAW = "Draw"
+
+    def __init__(self):
+        """
+        Initializer
+        """
+        self._alive = {}
+        self._alive_total = 0
+        # Alive players making the Town win a Mafia/Town duel, see BaseRole.wins_duel_tie
+        self._duel_winners = 0
+
+    def add_player(self, player):
+        """
+        Count an alive player
+        :param player: the player, its role must be set
+        """
+        role = player.get_role()
+        self._alive[role.alignment] = self._alive.get(role.alignment, 0) + 1
+        self._alive_total += 1
+        if role.wins_duel_tie:
+            self._duel_winners += 1
+
+    def remove_player(self, player):
+        """
+        Stop counting a dead player
+        :param player: the player, its role must be set
+        """
+        role = player.get_role()
+        self._alive[role.alignment] -= 1
+        self._alive_total -= 1
+        if role.wins_duel_tie:
+            self._duel_winners -= 1
+
+    def get_alive_count(self, alignment) -> int:
+        return self._alive.get(alignment, 0)
+
+    def get_winner(self):
+        """
+        Evaluate the win conditions
+        :return: the winning Alignment, DRAW if nobody is alive, None if the game goes on
+        """
+        if self._alive_total == 0:
+            return self.DRAW
+        hostile_alive = [alignment for alignment in self.HOSTILE_ALIGNMENTS if self._alive.get(alignment, 0) > 0]
+        if not hostile_alive:
+            return Alignment.TOWN
+        if len(hostile_alive) > 1:
+            return None
+        alignment = hostile_alive[0]
+        count = self._alive[alignment]
+        others = self._alive_total - count
+        if alignment == Alignment.MAFIA and count == 1 and others == 1 and self._duel_winners == 1:
+            # Mafia/Town duel won by the Town
+            return Alignment.TOWN
+        # The faction controls the vote, the others cannot lynch it anymore
+        if count >= others:
+            return alignment
+        return None
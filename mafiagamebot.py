@@ -1,13 +1,19 @@
 from discord.ext import commands
-from mafia.gameengine import MafiaEngine, GameState
+from mafia.gameregistry import GameRegistry
+from mafia.metrics import MetricsServer
 
 bot = commands.Bot(command_prefix='$')
-bot.mafia_engine = MafiaEngine(bot)
+bot.mafia_registry = GameRegistry(bot)
+metrics_server = MetricsServer(bot.mafia_registry.metrics)
 
 
 @bot.event
 async def on_ready():
     print('Connected to server as {0.user}'.format(bot))
+    # Expose games metrics on a local port
+    await metrics_server.start()
+    # Resume games interrupted by a restart, and keep snapshots of running games
+    await bot.mafia_registry.start_snapshots()
 
 
 @bot.event
@@ -16,26 +22,8 @@ async def on_message(message):
     if message.author == bot.user:
         return
 
-    # Manage messages depending on game state
-    if message.channel in bot.mafia_engine.private_channels:
-        # Delete message
-        await message.delete()
-
-        # Manage message depending on game state
-        game_state = bot.mafia_engine.get_game_state()
-        if game_state == GameState.state_players_nicknames:
-            # Start game, only accept custom nicknames
-            if message.content.startswith('-') and len(message.content) > 1:
-                bot.mafia_engine.set_player_nickname(message)
-        elif game_state in [GameState.state_day_discussion,
-                            GameState.state_day_vote,
-                            GameState.state_day_trial_deliberation]:
-            bot.mafia_engine.manage_day_common(message)
-        elif game_state in [GameState.state_day_trial_defense,
-                            GameState.state_day_trial_last_words]:
-            bot.mafia_engine.manage_day_trial_defense(message)
-        elif game_state == GameState.state_night:
-            bot.mafia_engine.manage_night(message)
+    # Manage messages sent in a game private channel
+    await bot.mafia_registry.manage_message(message)
 
     # To process commands sent to bot
     await bot.process_commands(message)
@@ -45,11 +33,11 @@ async def on_message(message):
 # BOT commands to manage games
 ########################################################################################################################
 @bot.command()
-async def create_game(ctx):
+async def create_game(ctx, preset=None, seed: int = None):
     # Delete message
     await ctx.message.delete()
     # Start a new game !
-    await bot.mafia_engine.create_game(ctx)
+    await bot.mafia_registry.get_or_create_engine(ctx).create_game(ctx, preset, seed)
 
 
 @bot.command()
@@ -57,7 +45,11 @@ async def join_game(ctx):
     # Delete message
     await ctx.message.delete()
     # Join a new game
-    await bot.mafia_engine.join_game(ctx)
+    mafia_engine = bot.mafia_registry.get_engine(ctx)
+    if mafia_engine is None:
+        await ctx.send("{} - pas de partie en cours, impossible de rejoindre.".format(ctx.author.name))
+    else:
+        await mafia_engine.join_game(ctx)
 
 
 @bot.command()
@@ -65,7 +57,21 @@ async def start_game(ctx):
     # Delete message
     await ctx.message.delete()
     # Start the game
-    await bot.mafia_engine.start_game(ctx)
+    mafia_engine = bot.mafia_registry.get_engine(ctx)
+    if mafia_engine is None:
+        await ctx.send("{} - 'start_game': opération impossible.".format(ctx.author.name))
+    else:
+        await mafia_engine.start_game(ctx)
+
+
+@bot.command()
+async def add_fake_players(ctx, nb_players: int = 9):
+    # Delete message
+    await ctx.message.delete()
+    # Fill the lobby with scripted players
+    mafia_engine = bot.mafia_registry.get_engine(ctx)
+    if mafia_engine is None or not await mafia_engine.add_fake_players(ctx, nb_players):
+        await ctx.send("{} - 'add_fake_players': opération impossible.".format(ctx.author.name))
 
 
 @bot.command()
@@ -73,7 +79,10 @@ async def stop_game(ctx):
     # Delete message
     await ctx.message.delete()
     # Stop the game !
-    await bot.mafia_engine.stop_game(ctx)
+    mafia_engine = bot.mafia_registry.get_engine(ctx)
+    if mafia_engine is not None:
+        await mafia_engine.stop_game(ctx)
+        bot.mafia_registry.remove_engine(ctx)
 
 
 # FOR DEBUG !
@@ -82,7 +91,9 @@ async def debug_game_state(ctx):
     # Delete message
     await ctx.message.delete()
     # Stop the game !
-    await ctx.message.channel.send("Current state: {}".format(bot.mafia_engine.get_game_state()))
+    mafia_engine = bot.mafia_registry.get_engine(ctx)
+    game_state = mafia_engine.get_game_state() if mafia_engine is not None else None
+    await ctx.message.channel.send("Current state: {}".format(game_state))
 
 my_string = """
 Ma super belle description
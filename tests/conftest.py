@@ -0,0 +1,129 @@
+import os
+import sys
+import pytest
+
+# Tests import the mafia package from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mafia.clock import VirtualClock
+from mafia.gameregistry import GameRegistry
+from mafia.gamestate import GameState
+from mafia.transport import MemoryTransport
+from mafia.eventlog import EventLogger
+from mafia.snapshot import SnapshotStore
+from mafia.simulation import GameSimulation
+
+
+# Mafiosi against Citizens, so each test knows the roles of the game
+TEST_SETUPS = {
+    "default": "test",
+    "presets": {
+        "test": {
+            "description": "1 Mafioso contre la ville",
+            "compositions": [
+                {"min_players": 3, "max_players": 10, "roles": {"Mafioso": 1}, "fill": "Citizen"}
+            ]
+        },
+        "faction": {
+            "description": "2 Mafiosi contre la ville",
+            "compositions": [
+                {"min_players": 5, "max_players": 10, "roles": {"Mafioso": 2}, "fill": "Citizen"}
+            ]
+        }
+    }
+}
+
+
+class GameHarness(GameSimulation):
+    """
+    Game of scripted players on a virtual clock, driven step by step by a test
+    """
+
+    def __init__(self, clock: VirtualClock, event_logger: EventLogger, snapshot_store: SnapshotStore,
+                 nb_players: int):
+        self._event_logger = event_logger
+        registry = self._create_registry(MemoryTransport(), clock, snapshot_store)
+        super().__init__(registry, nb_players)
+        self.registry = registry
+        self.clock = clock
+
+    def _create_registry(self, transport: MemoryTransport, clock: VirtualClock,
+                         snapshot_store: SnapshotStore) -> GameRegistry:
+        registry = GameRegistry(None, transport, clock, event_logger=self._event_logger,
+                                snapshot_store=snapshot_store)
+        registry.setups.load_config(TEST_SETUPS)
+        return registry
+
+    async def start_first_night(self, preset: str = None):
+        """
+        Start the game, choose nicknames and wait for the first night
+        :param preset: name of the role setup preset, see TEST_SETUPS
+        :return: context of the game creator
+        """
+        ctx = await self.start(preset, seed=1)
+        await self.wait_for_state(GameState.state_players_nicknames)
+        for i, player in enumerate(self.engine.players):
+            await self.send_player_message(player, "-Joueur {}".format(i))
+        await self.wait_for_state(GameState.state_night)
+        return ctx
+
+    async def restart(self) -> GameRegistry:
+        """
+        Resume the saved games in a new registry sharing the transport, as after a bot restart
+        :return: the new registry, its games must be frozen by the test
+        """
+        self.registry.snapshot_store.wait()
+        registry = self._create_registry(self.registry.transport, self.clock, self.registry.snapshot_store)
+        await registry.resume_games()
+        return registry
+
+    async def get_received_messages(self, player) -> list:
+        """
+        Get the text messages delivered to a player, once every pending message is sent
+        :param player: the player
+        :return: list of message contents
+        """
+        await self._registry.dispatcher.drain()
+        return [message.content for message in player.get_private_channel().messages if message.content]
+
+    async def close(self):
+        self.engine.freeze_game()
+        await self._registry.dispatcher.drain()
+        await self._registry.channel_pool.close()
+
+
+@pytest.fixture
+def virtual_clock():
+    """
+    Virtual clock running test coroutines, closed after the test
+    """
+    clock = VirtualClock()
+    yield clock
+    clock.close()
+
+
+@pytest.fixture
+def run_game(tmp_path):
+    """
+    Run a test coroutine on a game harness
+    :return: function taking a coroutine function called with the harness, and the number of players
+    """
+    event_logger = EventLogger(str(tmp_path))
+
+    def run(test, nb_players: int = 4):
+        clock = VirtualClock()
+        game = GameHarness(clock, event_logger, SnapshotStore(str(tmp_path / "snapshots")), nb_players)
+
+        async def scenario():
+            try:
+                await test(game)
+            finally:
+                await game.close()
+
+        try:
+            clock.run(scenario())
+        finally:
+            clock.close()
+
+    yield run
+    event_logger.close()
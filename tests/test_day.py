@@ -0,0 +1,41 @@
+from mafia.gamestate import GameState
+from mafia.roles.mafia.mafioso import Mafioso
+
+
+async def _kill_citizen_first_night(game):
+    """
+    Play the first night, the Mafioso kills a Citizen
+    :return: tuple (dead Citizen, alive Citizen)
+    """
+    await game.start_first_night()
+    mafioso = game.engine.mafia_players[0]
+    citizens = [player for player in game.engine.players if not isinstance(player.get_role(), Mafioso)]
+    await game.send_player_message(mafioso, "-target {}".format(citizens[0].get_house().get_id()))
+    await game.wait_for_state(GameState.state_day_discussion)
+    assert not citizens[0].is_player_alive()
+    return citizens[0], citizens[1]
+
+
+def test_dead_player_cannot_skip(run_game):
+    async def scenario(game):
+        dead, _ = await _kill_citizen_first_night(game)
+        await game.send_player_message(dead, "-skip")
+        assert game.engine.vote_tally.get_skips_count() == 0
+        assert not game.engine.vote_tally.has_skipped(dead)
+        messages = await game.get_received_messages(dead)
+        assert any("Les morts ne peuvent pas passer la journée" in message for message in messages)
+
+    run_game(scenario)
+
+
+def test_dead_player_cannot_vote(run_game):
+    async def scenario(game):
+        dead, alive = await _kill_citizen_first_night(game)
+        await game.wait_for_state(GameState.state_day_vote)
+        await game.send_player_message(dead, "-vote {}".format(alive.get_house().get_id()))
+        assert dead.get_vote_id() is None
+        assert game.engine.vote_tally.get_votes(alive.get_house().get_id()) == 0
+        messages = await game.get_received_messages(dead)
+        assert any("Les morts ne votent pas" in message for message in messages)
+
+    run_game(scenario)
@@ -0,0 +1,46 @@
+from mafia.dispatcher import OutboundDispatcher, Priority
+from mafia.outbox import ChannelOutbox
+from mafia.transport import MemoryTransport
+
+
+def _create_dispatcher(clock, rate_limit: tuple = None):
+    """
+    Create a dispatcher sending to a memory channel
+    :param rate_limit: rate limit of the channel, see Transport.ROUTE_RATE_LIMIT
+    :return: tuple (OutboundDispatcher, channel)
+    """
+    transport = MemoryTransport()
+    transport.ROUTE_RATE_LIMIT = rate_limit
+    channel = transport.create_channel(transport.create_guild(), "test")
+    return OutboundDispatcher(transport, clock), channel
+
+
+def test_channel_windows_are_sent_in_order(virtual_clock):
+    async def scenario():
+        dispatcher, channel = _create_dispatcher(virtual_clock)
+        outbox = ChannelOutbox(channel, dispatcher)
+        outbox.send("chat", Priority.CHAT)
+        outbox.flush()
+        # A later window is not sent first, even when more important
+        outbox.send("game", Priority.GAME)
+        outbox.flush()
+        await dispatcher.drain()
+        assert [message.content for message in channel.messages] == ["chat", "game"]
+
+    virtual_clock.run(scenario())
+
+
+def test_route_bucket_is_kept_after_idle_queue(virtual_clock):
+    async def scenario():
+        dispatcher, channel = _create_dispatcher(virtual_clock, (5, 5.0))
+        for i in range(5):
+            dispatcher.enqueue(channel, "message {}".format(i))
+        await dispatcher.drain()
+        assert virtual_clock.time() < 5.0
+        # The channel queue was idle and recreated, its allowance is not reset
+        future = dispatcher.enqueue(channel, "message 5")
+        await future
+        assert virtual_clock.time() >= 5.0
+        assert len(channel.messages) == 6
+
+    virtual_clock.run(scenario())
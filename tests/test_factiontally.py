@@ -0,0 +1,63 @@
+from mafia.factiontally import FactionTally
+
+
+def test_consensus_is_most_chosen_target():
+    tally = FactionTally()
+    assert tally.get_consensus() is None
+    tally.set_target("first", "town_1")
+    tally.set_target("second", "town_2")
+    tally.set_target("third", "town_2")
+    assert tally.get_consensus() == "town_2"
+    # Changing a choice moves the target between counts
+    tally.set_target("third", "town_1")
+    assert tally.get_target("third") == "town_1"
+    assert tally.get_consensus() == "town_1"
+
+
+def test_tie_keeps_first_target_to_reach_count():
+    tally = FactionTally()
+    tally.set_target("first", "town_1")
+    tally.set_target("second", "town_2")
+    assert tally.get_consensus() == "town_1"
+    tally.set_target("third", "town_2")
+    tally.set_target("fourth", "town_1")
+    assert tally.get_consensus() == "town_2"
+
+
+def test_cancel_drops_target_out_of_its_count():
+    tally = FactionTally()
+    tally.set_target("first", "town_1")
+    tally.set_target("second", "town_1")
+    tally.set_target("third", "town_2")
+    assert tally.get_consensus() == "town_1"
+    tally.set_target("second", None)
+    # Back to one choice, after the target already chosen once
+    assert tally.get_consensus() == "town_2"
+    tally.set_target("third", None)
+    assert tally.get_consensus() == "town_1"
+    tally.set_target("first", None)
+    assert tally.get_consensus() is None
+    assert tally.get_targets() == {}
+
+
+def test_suggestion_is_not_counted():
+    tally = FactionTally()
+    tally.set_suggestion("first", "town_1")
+    assert tally.get_consensus() is None
+    tally.set_target("second", "town_2")
+    tally.set_suggestion("third", "town_1")
+    assert tally.get_consensus() == "town_2"
+    assert tally.get_suggestions() == {"first": "town_1", "third": "town_1"}
+    tally.set_suggestion("first", None)
+    assert tally.get_suggestions() == {"third": "town_1"}
+
+
+def test_leader_target_overrides_tally():
+    tally = FactionTally()
+    tally.set_target("first", "town_1")
+    tally.set_target("second", "town_1")
+    tally.set_target("leader", "town_2", leader=True)
+    assert tally.get_consensus() == "town_2"
+    # Without the leader choice, the tally decides again
+    tally.set_target("leader", None, leader=True)
+    assert tally.get_consensus() == "town_1"
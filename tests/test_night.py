@@ -0,0 +1,29 @@
+from mafia.gamestate import GameState
+from mafia.roles.mafia.mafioso import Mafioso
+
+
+def test_mafioso_kill_shows_death_note(run_game):
+    async def scenario(game):
+        await game.start_first_night()
+        mafioso = game.engine.mafia_players[0]
+        target = next(player for player in game.engine.players if not isinstance(player.get_role(), Mafioso))
+        await game.send_player_message(mafioso, "-dn Justice est faite")
+        await game.send_player_message(mafioso, "-target {}".format(target.get_house().get_id()))
+        assert mafioso.get_death_note() == "Justice est faite"
+
+        await game.wait_for_state(GameState.state_day_discussion)
+        assert not target.is_player_alive()
+        messages = await game.get_received_messages(target)
+        assert any("## Death note*\nJustice est faite" in message for message in messages)
+
+    run_game(scenario)
+
+
+def test_citizen_cannot_set_death_note(run_game):
+    async def scenario(game):
+        await game.start_first_night()
+        citizen = next(player for player in game.engine.players if not isinstance(player.get_role(), Mafioso))
+        await game.send_player_message(citizen, "-dn Rien")
+        assert citizen.get_death_note() is None
+
+    run_game(scenario)
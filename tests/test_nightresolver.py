@@ -0,0 +1,94 @@
+import random
+from mafia.gamestate import GameState
+from mafia.misc.utils import NightActionType
+from mafia.nightresolver import NightResolver
+from mafia.roles.mafia.godfather import Godfather
+from mafia.roles.mafia.mafioso import Mafioso
+from mafia.roles.town.citizen import Citizen
+from mafia.roles.town.townrole import TownRole
+
+
+class _Blocker(TownRole):
+    """
+    Town role blocking its target, no such role is playable yet
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.name = "Blocker"
+        self.night_action = NightActionType.BLOCK
+
+
+async def _create_resolver(game, roles: list):
+    """
+    Start the game, then give a role to each player and resolve their actions in a new resolver
+    :param roles: list of role classes, one per player
+    :return: tuple (NightResolver, players in roles order)
+    """
+    await game.start_first_night()
+    players = game.engine.players[:len(roles)]
+    for player, role in zip(players, roles):
+        player.set_role(role)
+    resolver = NightResolver(random.Random(1),
+                             lambda faction: [player for player in players if player.get_role().faction == faction],
+                             lambda: players)
+    return resolver, players
+
+
+def test_vest_stops_kill(run_game):
+    async def scenario(game):
+        resolver, (mafioso, citizen, _) = await _create_resolver(game, [Mafioso, Citizen, Citizen])
+        resolver.submit(citizen, citizen)
+        resolver.submit(mafioso, citizen)
+        result = resolver.resolve()
+        assert result.deaths == []
+        assert (citizen, "*Quelqu'un vous a attaqué cette nuit, mais vous avez survécu !*") in result.notifications
+        assert not citizen.can_use_night_action()
+
+    run_game(scenario, nb_players=3)
+
+
+def test_blocked_killer_is_not_picked(run_game):
+    async def scenario(game):
+        resolver, (godfather, mafioso, blocker, citizen, _) = \
+            await _create_resolver(game, [Godfather, Mafioso, _Blocker, Citizen, Citizen])
+        resolver.submit(blocker, mafioso)
+        resolver.submit(mafioso, citizen)
+        result = resolver.resolve()
+        # The Mafioso is the only other killer, the Godfather leads the attack instead
+        assert result.deaths == [(citizen, godfather)]
+
+    run_game(scenario, nb_players=5)
+
+
+def test_faction_kills_once_per_night(run_game):
+    async def scenario(game):
+        resolver, (first_mafioso, second_mafioso, first_citizen, second_citizen, _) = \
+            await _create_resolver(game, [Mafioso, Mafioso, Citizen, Citizen, Citizen])
+        resolver.submit(first_mafioso, first_citizen)
+        resolver.submit(second_mafioso, second_citizen)
+        result = resolver.resolve()
+        assert len(result.deaths) == 1
+        assert result.deaths[0][0] in (first_citizen, second_citizen)
+        assert result.deaths[0][1] in (first_mafioso, second_mafioso)
+
+    run_game(scenario, nb_players=5)
+
+
+def test_vest_cannot_be_reused(run_game):
+    async def scenario(game):
+        await game.start_first_night()
+        mafioso = game.engine.mafia_players[0]
+        citizen = next(player for player in game.engine.players if not isinstance(player.get_role(), Mafioso))
+        await game.send_player_message(citizen, "-vest")
+        await game.send_player_message(mafioso, "-target {}".format(citizen.get_house().get_id()))
+        await game.wait_for_state(GameState.state_day_discussion)
+        assert citizen.is_player_alive()
+
+        await game.wait_for_state(GameState.state_night)
+        await game.send_player_message(citizen, "-vest")
+        assert game.engine.night_resolver.get_action(citizen) is None
+        messages = await game.get_received_messages(citizen)
+        assert any("Vous avez déjà utilisé votre gilet pare-balles" in message for message in messages)
+
+    run_game(scenario)
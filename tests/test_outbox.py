@@ -0,0 +1,31 @@
+from mafia.outbox import ChannelOutbox
+from mafia.transport import MemoryEmbed
+
+
+def test_short_messages_are_merged():
+    assert ChannelOutbox.merge_messages(["first", "second"]) == [("first\nsecond", None)]
+
+
+def test_merged_message_is_split_at_max_length():
+    first = "a" * 1500
+    second = "b" * 1500
+    assert ChannelOutbox.merge_messages([first, second]) == [(first, None), (second, None)]
+
+
+def test_long_message_is_split_on_line_breaks():
+    lines = ["{:03d}".format(i) + "x" * 96 for i in range(50)]
+    payloads = ChannelOutbox.merge_messages(["\n".join(lines)])
+    assert all(len(content) <= ChannelOutbox.MAX_MESSAGE_LENGTH for content, _ in payloads)
+    assert "\n".join(content for content, _ in payloads) == "\n".join(lines)
+    assert payloads[0][0].split("\n")[-1] == lines[19]
+
+
+def test_long_line_is_cut():
+    payloads = ChannelOutbox.merge_messages(["a" * 4500])
+    assert [len(content) for content, _ in payloads] == [2000, 2000, 500]
+
+
+def test_embed_is_sent_alone():
+    embed = MemoryEmbed("title", "description", 0)
+    assert ChannelOutbox.merge_messages(["first", embed, "second"]) == \
+        [("first", None), (None, embed), ("second", None)]
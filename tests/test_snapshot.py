@@ -0,0 +1,67 @@
+from mafia.gamestate import GameState
+from mafia.misc.utils import Faction
+from mafia.roles.mafia.mafioso import Mafioso
+
+
+def _get_houses(night_result) -> tuple:
+    """
+    Describe a night result by houses, to compare results of different engines
+    :return: tuple (deaths, notifications)
+    """
+    deaths = [(player.get_house().get_id(), killer.get_house().get_id()) for player, killer in night_result.deaths]
+    notifications = [(player.get_house().get_id(), message) for player, message in night_result.notifications]
+    return deaths, notifications
+
+
+def test_night_resolves_the_same_after_restart(run_game):
+    async def scenario(game):
+        await game.start_first_night("faction")
+        first_mafioso, second_mafioso = game.engine.mafia_players
+        citizens = [player for player in game.engine.players if not isinstance(player.get_role(), Mafioso)]
+        await game.send_player_message(first_mafioso, "-target {}".format(citizens[1].get_house().get_id()))
+        await game.send_player_message(second_mafioso, "-target {}".format(citizens[0].get_house().get_id()))
+        await game.send_player_message(citizens[0], "-vest")
+        await game.send_player_message(citizens[2], "-skip")
+        game.registry.snapshot_games()
+
+        registry = await game.restart()
+        try:
+            engine = registry.get_engines()[0]
+            assert engine.get_game_state() == GameState.state_night
+            resolver = engine.night_resolver
+            assert resolver.get_tally(Faction.MAFIA).get_consensus().get_house().get_id() == \
+                game.engine.night_resolver.get_tally(Faction.MAFIA).get_consensus().get_house().get_id()
+            assert [player.get_house().get_id() for player in resolver.get_skips()] == \
+                [citizens[2].get_house().get_id()]
+            deaths, notifications = _get_houses(resolver.resolve())
+            assert [house for house, _ in deaths] == [citizens[1].get_house().get_id()]
+            assert (deaths, notifications) == _get_houses(game.engine.night_resolver.resolve())
+        finally:
+            for engine in registry.get_engines():
+                engine.freeze_game()
+            await registry.dispatcher.drain()
+
+    run_game(scenario, nb_players=6)
+
+
+def test_game_over_is_not_resumed(run_game):
+    async def scenario(game):
+        ctx = await game.start_first_night()
+        mafioso = game.engine.mafia_players[0]
+        citizen = next(player for player in game.engine.players if not isinstance(player.get_role(), Mafioso))
+        await game.send_player_message(mafioso, "-target {}".format(citizen.get_house().get_id()))
+        await game.wait_for_state(GameState.state_game_over)
+        game.registry.snapshot_games()
+        game.registry.snapshot_store.wait()
+        assert game.registry.snapshot_store.load_all() == {}
+
+        # Snapshot written right before the game over, by a previous version or a crash
+        key = game.registry.get_lobby_key(ctx)
+        game.registry.snapshot_store.save(game.registry.get_snapshot_name(key),
+                                          {"guild": key[0], "channel": key[1], "game": game.engine.to_snapshot()})
+        registry = await game.restart()
+        assert registry.get_engines() == []
+        registry.snapshot_store.wait()
+        assert registry.snapshot_store.load_all() == {}
+
+    run_game(scenario, nb_players=3)
@@ -0,0 +1,68 @@
+from mafia.gamestate import GameState
+from mafia.misc.utils import Misc
+from mafia.roles.mafia.mafioso import Mafioso
+from mafia.votetally import VoteTally
+
+
+def test_change_and_cancel_vote():
+    tally = VoteTally()
+    tally.update_vote(None, 1)
+    tally.update_vote(None, 1)
+    tally.update_vote(None, 2)
+    assert tally.get_votes(1) == 2
+    tally.update_vote(1, 2)
+    assert tally.get_votes(1) == 1
+    assert tally.get_votes(2) == 2
+    tally.update_vote(1, None)
+    # Houses without votes are forgotten
+    assert tally.get_current_votes() == {2: 2}
+    tally.reset_votes()
+    assert tally.get_votes(2) == 0
+
+
+def test_trial_votes_count():
+    tally = VoteTally()
+    tally.update_trial_vote(None, Misc.TRIAL_GUILTY)
+    tally.update_trial_vote(None, Misc.TRIAL_GUILTY)
+    tally.update_trial_vote(None, Misc.TRIAL_INNOCENT)
+    tally.update_trial_vote(Misc.TRIAL_GUILTY, Misc.TRIAL_INNOCENT)
+    assert tally.get_guilty_votes() == 1
+    assert tally.get_innocent_votes() == 2
+    tally.update_trial_vote(Misc.TRIAL_INNOCENT, None)
+    assert tally.get_trial_voters_count() == 2
+    tally.reset_trial_votes()
+    assert tally.get_trial_voters_count() == 0
+
+
+def test_skips_are_counted_once():
+    tally = VoteTally()
+    assert tally.add_skip("first")
+    assert not tally.add_skip("first")
+    assert tally.add_skip("second")
+    tally.remove_skip("first")
+    assert not tally.has_skipped("first")
+    assert tally.get_skips_count() == 1
+
+
+def test_skip_threshold_follows_alive_players(run_game):
+    async def scenario(game):
+        await game.start_first_night()
+        mafioso = game.engine.mafia_players[0]
+        citizens = [player for player in game.engine.players if not isinstance(player.get_role(), Mafioso)]
+        await game.send_player_message(mafioso, "-target {}".format(citizens[0].get_house().get_id()))
+        await game.wait_for_state(GameState.state_day_discussion)
+
+        # 6 alive players, more than 3 skips are needed
+        for player in citizens[1:4]:
+            await game.send_player_message(player, "-skip")
+        assert game.engine.get_game_state() == GameState.state_day_discussion
+        # The skip of a dead player doesn't count anymore
+        citizens[1].set_dead()
+        assert game.engine.vote_tally.get_skips_count() == 2
+        # 5 alive players, still more than 3 skips
+        await game.send_player_message(citizens[4], "-skip")
+        assert game.engine.get_game_state() == GameState.state_day_discussion
+        await game.send_player_message(citizens[5], "-skip")
+        assert game.engine.get_game_state() == GameState.state_day_end
+
+    run_game(scenario, nb_players=7)
@@ -0,0 +1,87 @@
+from mafia.gamestate import GameState
+from mafia.misc.utils import Alignment, Timers
+from mafia.roles.mafia.godfather import Godfather
+from mafia.roles.mafia.mafioso import Mafioso
+from mafia.roles.town.citizen import Citizen
+from mafia.wintracker import WinTracker
+
+
+async def _track_players(game, roles: list):
+    """
+    Start the game, then give a role to each player and count them in a new tracker
+    :param roles: list of role classes, one per player
+    :return: tuple (WinTracker, players in roles order)
+    """
+    await game.start_first_night()
+    tracker = WinTracker()
+    players = game.engine.players[:len(roles)]
+    for player, role in zip(players, roles):
+        player.set_role(role)
+        tracker.add_player(player)
+    return tracker, players
+
+
+def test_town_wins_without_hostile_alive(run_game):
+    async def scenario(game):
+        tracker, (mafioso, citizen, _) = await _track_players(game, [Mafioso, Citizen, Citizen])
+        assert tracker.get_winner() is None
+        tracker.remove_player(mafioso)
+        assert tracker.get_alive_count(Alignment.MAFIA) == 0
+        assert tracker.get_winner() == Alignment.TOWN
+
+    run_game(scenario, nb_players=3)
+
+
+def test_hostile_wins_at_parity(run_game):
+    async def scenario(game):
+        tracker, (_, _, citizen, _, _) = await _track_players(game, [Godfather, Mafioso, Citizen, Citizen, Citizen])
+        assert tracker.get_winner() is None
+        tracker.remove_player(citizen)
+        assert tracker.get_alive_count(Alignment.TOWN) == 2
+        assert tracker.get_winner() == Alignment.MAFIA
+
+    run_game(scenario, nb_players=5)
+
+
+def test_citizen_wins_mafia_duel(run_game):
+    async def scenario(game):
+        tracker, (godfather, mafioso, citizen, _) = await _track_players(game, [Godfather, Mafioso, Citizen, Citizen])
+        # 2 against 2, the Mafia controls the vote
+        assert tracker.get_winner() == Alignment.MAFIA
+        tracker.remove_player(godfather)
+        tracker.remove_player(citizen)
+        # 1 against 1, the Citizen wins the duel
+        assert tracker.get_winner() == Alignment.TOWN
+
+    run_game(scenario, nb_players=4)
+
+
+def test_draw_without_survivors(run_game):
+    async def scenario(game):
+        tracker, players = await _track_players(game, [Mafioso, Citizen, Citizen])
+        for player in players:
+            tracker.remove_player(player)
+        assert tracker.get_winner() == WinTracker.DRAW
+
+    run_game(scenario, nb_players=3)
+
+
+def test_game_over_after_mafia_duel(run_game):
+    async def scenario(game):
+        await game.start_first_night()
+        mafioso = game.engine.mafia_players[0]
+        citizen = next(player for player in game.engine.players if not isinstance(player.get_role(), Mafioso))
+        await game.send_player_message(mafioso, "-target {}".format(citizen.get_house().get_id()))
+        await game.wait_for_state(GameState.state_game_over)
+        assert game.engine.get_winner() == Alignment.TOWN
+        assert game.registry.get_active_games_count() == 0
+        await game.clock.sleep(2.0)
+        messages = await game.get_received_messages(mafioso)
+        assert any("La Ville a gagné" in message for message in messages)
+
+        # The lobby is freed once the result has been displayed
+        await game.clock.sleep(Timers.TIME_GAME_OVER)
+        assert game.engine.get_game_state() is None
+        assert game.registry.get_engines() == []
+
+    run_game(scenario, nb_players=3)